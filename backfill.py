@@ -0,0 +1,41 @@
+import argparse
+import logging
+import sys
+
+from scrapper.models.overclockers_models import CrawlState
+from scrapper.scrap_to_db import BACKFILL_STATE, Crawler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Load forum topics history to database with resumable crawl')
+    parser.add_argument('--start', type=int, default=1, help='first listing page number')
+    parser.add_argument('--end', type=int, required=True, help='last listing page number')
+    parser.add_argument('--window', type=int, default=20, help='number of listing pages crawled at once')
+    parser.add_argument('--chunk-size', type=int, default=50, help='number of topics written at once')
+    parser.add_argument('--restart', action='store_true', help='drop saved checkpoint and start from the first page')
+    return parser.parse_args()
+
+
+def main() -> int:
+    """
+    Run backfill and return exit status: 1 if backfill stopped on failed pages, 0 otherwise.
+    """
+    args = parse_args()
+
+    crawler = Crawler()
+    try:
+        if args.restart:
+            CrawlState.objects.clear_checkpoint(BACKFILL_STATE)  # pylint: disable=no-member
+
+        results = crawler.backfill(args.start, args.end, window=args.window, chunk_size=args.chunk_size)
+    finally:
+        crawler.close()
+
+    crawler.print_report(results)
+    # cron and entrypoint see backfill that has to be resumed as failed
+    return 1 if crawler.backfill_stopped_window else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    sys.exit(main())
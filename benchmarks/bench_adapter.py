@@ -0,0 +1,53 @@
+# pylint: disable=no-self-use
+# pylint: disable=no-member
+# pylint: disable=too-few-public-methods
+
+import random
+
+import pytest
+
+from scrapper.engine.base import TopicMetaInfo
+from scrapper.models.adapters import TopicsToDBAdapter
+from scrapper.models.overclockers_models import Topic
+
+from .corpus import LATEST_POST_TIMESTAMP
+
+pytest.importorskip('pytest_benchmark')
+
+DOMAIN = 'https://forum.overclockers.ua'
+
+
+def create_topics(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    topics = []
+    for topic_id in range(1000000, 1000000 + count):
+        topic = TopicMetaInfo(
+            url=f'{DOMAIN}/viewtopic.php?f=26&t={topic_id}',
+            title='Видеокарта GeForce GTX 1060 6GB',
+            author=f'User{rng.randint(1, count // 4)}',
+            author_profile_link=f'{DOMAIN}/memberlist.php?mode=viewprofile&u={rng.randint(1, 1000)}',
+            posts_count=rng.randint(0, 30),
+            views_count=rng.randint(10, 3000),
+            last_post_timestamp=LATEST_POST_TIMESTAMP,
+            topic_id=topic_id,
+            location_raw='Украина, Киев',
+            location='киев',
+            topic_content='Продается в отличном состоянии' * 20
+        )
+        topics.append(topic)
+    return topics
+
+
+@pytest.mark.usefixtures('mocked_db_connection')
+class TestAdapterBenchmarks:
+
+    @pytest.mark.parametrize('chunk_size', [50, 500])
+    def test_import_topics_to_db(self, benchmark, measure_allocations, chunk_size):
+        adapter = TopicsToDBAdapter()
+        topics = create_topics(chunk_size)
+        measure_allocations(adapter.import_topics_to_db, topics)
+
+        result = benchmark(adapter.import_topics_to_db, topics)
+
+        assert result.matched_count == chunk_size
+        assert Topic.objects.count() == chunk_size
@@ -0,0 +1,56 @@
+# pylint: disable=no-self-use
+# pylint: disable=redefined-outer-name
+
+import pytest
+
+from scrapper.utils.spelling.checker import (
+    correct_location, load_ru_location_index, load_ru_ua_location_names, location_cache, lookup_location,
+    validate_location
+)
+
+from . import corpus
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.fixture(scope='module')
+def location_typos():
+    return corpus.location_typos(list(load_ru_ua_location_names()))
+
+
+def validate_locations(locations):
+    return [validate_location(location) for location in locations]
+
+
+class TestLocationsBenchmarks:
+
+    def test_correct_location(self, benchmark, measure_allocations, location_typos):
+        measure_allocations(lambda: [correct_location(location) for location in location_typos])
+
+        result = benchmark(lambda: [correct_location(location) for location in location_typos])
+
+        assert any(result)
+
+    def test_validate_location_cold_cache(self, benchmark, location_typos):
+        def validate():
+            location_cache.clear()
+            return validate_locations(location_typos)
+
+        result = benchmark(validate)
+
+        assert any(result)
+
+    def test_validate_location_warm_cache(self, benchmark, location_typos):
+        validate_locations(location_typos)
+
+        result = benchmark(validate_locations, location_typos)
+
+        assert any(result)
+        assert location_cache.hits > location_cache.misses
+
+    def test_lookup_location(self, benchmark, location_typos):
+        index = load_ru_location_index()
+
+        result = benchmark(lambda: [lookup_location(location, index) for location in location_typos])
+
+        assert any(result)
@@ -0,0 +1,70 @@
+# pylint: disable=no-self-use
+
+import pytest
+from selectolax.parser import HTMLParser
+
+from scrapper.engine.base import TopicMetaInfo
+from scrapper.engine.over_parser import OverclockersParser
+
+pytest.importorskip('pytest_benchmark')
+
+DOMAIN = 'https://forum.overclockers.ua'
+TOPIC_URL = f'{DOMAIN}/viewtopic.php?f=26&t=1234567890'
+
+
+def parse_topics_lists(parser, pages):
+    return [parser.parse_topics_list(page) for page in pages]
+
+
+def parse_topics_contents(parse, pages):
+    return [parse(page, TOPIC_URL) for page in pages]
+
+
+def parse_topic_content_full(page_content, url):
+    # parse of the whole page, as it is done when first post markers are not found
+    root = HTMLParser(page_content)
+    content = root.css_first(OverclockersParser.TOPIC_CONTENT_SELECTOR).text()
+    return content, bool(root.css_first(OverclockersParser.TOPIC_CLOSED_SELECTOR)), url
+
+
+class TestParserBenchmarks:
+
+    def test_parse_topics_list(self, benchmark, measure_allocations, listing_pages):
+        parser = OverclockersParser(domain=DOMAIN)
+        measure_allocations(parse_topics_lists, parser, listing_pages)
+
+        result = benchmark(parse_topics_lists, parser, listing_pages)
+
+        assert all(result)
+
+    def test_parse_topic_content(self, benchmark, measure_allocations, topic_pages):
+        measure_allocations(parse_topics_contents, OverclockersParser.parse_topic_content, topic_pages)
+
+        result = benchmark(parse_topics_contents, OverclockersParser.parse_topic_content, topic_pages)
+
+        assert all(topic.content for topic in result)
+
+    def test_parse_topic_content_full_page(self, benchmark, topic_pages):
+        result = benchmark(parse_topics_contents, parse_topic_content_full, topic_pages)
+
+        assert all(content for content, _, _ in result)
+
+    def test_topic_from_listing(self, benchmark, measure_allocations):
+        def create_topics():
+            return [
+                TopicMetaInfo.from_listing(
+                    domain=DOMAIN,
+                    url=f'./viewtopic.php?f=26&t={topic_id}&sid=0123456789abcdef',
+                    title='[Украина, Киев] Видеокарта GeForce GTX 1060 6GB',
+                    author=' User1 ',
+                    author_profile_link='./memberlist.php?mode=viewprofile&u=12345&sid=0123456789abcdef',
+                    posts_count='3 ',
+                    views_count='100 ',
+                    last_post_timestamp='2021-08-29T15:17:40+00:00'
+                ) for topic_id in range(1000)
+            ]
+        measure_allocations(create_topics)
+
+        result = benchmark(create_topics)
+
+        assert len(result) == 1000
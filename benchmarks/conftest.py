@@ -0,0 +1,56 @@
+"""
+Benchmarks of parsing, location validation and database import, run with pytest-benchmark:
+
+    python -m pytest benchmarks -o python_files='bench_*.py' --benchmark-autosave
+
+and compared with the saved baseline (failing on mean regression above 10%):
+
+    python -m pytest benchmarks -o python_files='bench_*.py' --benchmark-compare \
+        --benchmark-compare-fail=mean:10%
+
+Database is mocked with mongomock, so benchmarks run offline.
+"""
+# pylint: disable=redefined-outer-name
+
+import tracemalloc
+
+from mongoengine import connect, disconnect
+import pytest
+
+from . import corpus
+
+
+@pytest.fixture(scope='session')
+def listing_pages():
+    return corpus.listing_pages()
+
+
+@pytest.fixture(scope='session')
+def topic_pages():
+    return corpus.topic_pages()
+
+
+@pytest.fixture
+def measure_allocations(benchmark):
+    """
+    Run function once under tracemalloc and add peak and retained allocated
+    bytes to benchmark extra info (see benchmark JSON report).
+    """
+    def inner(func, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            result = func(*args, **kwargs)
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info['peak_allocated_bytes'] = peak
+        benchmark.extra_info['retained_bytes'] = retained
+        return result
+    return inner
+
+
+@pytest.fixture
+def mocked_db_connection():
+    connect('benchmark', host='mongomock://localhost')
+    yield None
+    disconnect()
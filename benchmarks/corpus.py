@@ -0,0 +1,191 @@
+"""
+Pages and location names the benchmarks are driven by. Pages recorded from the forum
+(see record.py) are used when BENCHMARK_CORPUS_PATH is set, synthetic pages that
+follow forum markup otherwise.
+"""
+from datetime import datetime, timedelta, timezone
+import glob
+import os
+import random
+from typing import List, Optional
+
+CORPUS_PATH_VARIABLE = 'BENCHMARK_CORPUS_PATH'
+LISTING_PAGES_PATTERN = 'viewforum-*.html'
+TOPIC_PAGES_PATTERN = 'viewtopic-*.html'
+
+TOPICS_PER_PAGE = 40
+LATEST_POST_TIMESTAMP = datetime(2021, 8, 29, 15, 17, 40, tzinfo=timezone.utc)
+
+# location part of topic titles as sellers write it
+TITLE_LOCATIONS = (
+    'Украина, Киев', 'Киев', 'Київ', 'Украина, Харьков', 'Харків', 'Днепр', 'Днипро', 'Украина, Одесса',
+    'Одеса', 'Львов', 'Украина, Львів', 'Запорожье', 'Винница', 'Вінниця', 'Украина, Полтава', 'Ровно',
+    'Івано - Франківськ', 'Украина, Киев/Бровары', 'Покровск, Донецкая область', 'Украина, Одесса и Стамбул',
+    'Украина', 'Киев и Одесса', 'Хмельницкий', 'Черкассы', 'Житомир'
+)
+TITLE_ITEMS = (
+    'Видеокарта GeForce GTX 1060 6GB', 'Процессор Ryzen 5 3600 BOX', 'Материнская плата B450 Tomahawk',
+    'Оперативная память DDR4 2x8GB 3200', 'SSD Samsung 970 EVO Plus 500GB', 'Блок питания Seasonic 650W',
+    'Монитор Dell U2419H', 'Корпус Fractal Design Meshify C', 'Кулер Noctua NH-D15', 'Ноутбук ThinkPad T480'
+)
+POST_TEXT = (
+    'Продается в отличном состоянии, не майнил, не разгонял. Полный комплект, коробка, документы. '
+    'Торг уместен при осмотре. Отправка Новой Почтой по предоплате или наложенным платежом. '
+)
+
+
+def _corpus_pages(pattern: str) -> Optional[List[str]]:
+    corpus_path = os.environ.get(CORPUS_PATH_VARIABLE)
+    if not corpus_path:
+        return None
+    pages = []
+    for path in sorted(glob.glob(os.path.join(corpus_path, pattern))):
+        with open(path, 'r', encoding='utf-8') as file:
+            pages.append(file.read())
+    return pages or None
+
+
+def listing_row(topic_id: int, timestamp: datetime, rng: random.Random) -> str:
+    location = rng.choice(TITLE_LOCATIONS)
+    return f'''
+    <li class="row bg{topic_id % 2 + 1}">
+        <dl class="row-item topic_read">
+            <dt title="Нет непрочитанных сообщений">
+                <div class="list-inner">
+                    <a href="./viewtopic.php?f=26&amp;t={topic_id}&amp;sid=0123456789abcdef" class="topictitle">
+                    [{location}] {rng.choice(TITLE_ITEMS)}
+                    </a>
+                </div>
+            </dt>
+            <dd class="author">
+                <a href="./memberlist.php?mode=viewprofile&amp;u={rng.randint(1000, 9999)}&amp;sid=0123456789abcdef"
+                   class="username">User{rng.randint(1, 500)}</a>
+            </dd>
+            <dd class="posts">{rng.randint(0, 30)} <dfn>Ответы</dfn></dd>
+            <dd class="views">{rng.randint(10, 3000)} <dfn>Просмотры</dfn></dd>
+            <dd class="lastpost">
+                <span><dfn>Последнее сообщение </dfn>
+                    <br><time datetime="{timestamp.isoformat()}">{timestamp:%d.%m.%Y %H:%M}</time>
+                </span>
+            </dd>
+        </dl>
+    </li>'''
+
+
+def listing_page(
+        page_index: int, rng: random.Random, topics: int = TOPICS_PER_PAGE,
+        latest_post_timestamp: datetime = LATEST_POST_TIMESTAMP
+) -> str:
+    """
+    Return listing (viewforum.php) page with topics, every next page is older.
+    """
+    first_topic_id = 3000000 - page_index * topics
+    rows = ''.join(
+        listing_row(first_topic_id - idx, latest_post_timestamp - timedelta(minutes=page_index * topics + idx), rng)
+        for idx in range(topics)
+    )
+    return f'''<!DOCTYPE html>
+<html dir="ltr" lang="ru">
+<head><meta charset="utf-8"><title>Продам - Форум Overclockers.ua</title></head>
+<body id="phpbb" class="section-viewforum ltr">
+<div id="page-body" class="page-body">
+    <div class="forumbg">
+        <div class="inner">
+            <ul class="topiclist topics">{rows}
+            </ul>
+        </div>
+    </div>
+</div>
+</body>
+</html>'''
+
+
+def topic_post(post_id: int, first: bool, rng: random.Random) -> str:
+    text = POST_TEXT * (rng.randint(4, 12) if first else rng.randint(1, 3))
+    return f'''
+    <div id="p{post_id}" class="post has-profile bg{1 if first else post_id % 2 + 1}">
+        <div class="inner">
+            <dl class="postprofile" id="profile{post_id}">
+                <dt class="has-profile-rank"><a href="./memberlist.php?mode=viewprofile&amp;u=1234"
+                    class="username">User{post_id % 500}</a></dt>
+                <dd class="profile-posts"><strong>Сообщения:</strong> {rng.randint(1, 5000)}</dd>
+            </dl>
+            <div class="postbody">
+                <div id="post_content{post_id}">
+                    <h3 class="first"><a href="#p{post_id}">Продам</a></h3>
+                    <p class="author"><span class="responsive-hide">
+                        <time datetime="2021-08-29T15:17:40+00:00">29.08.2021 18:17</time></span></p>
+                    <div class="content">{text}</div>
+                </div>
+            </div>
+        </div>
+    </div>
+    <hr class="divider" />'''
+
+
+def topic_page(topic_id: int, rng: random.Random, posts: int = 20, closed: bool = False) -> str:
+    """
+    Return topic (viewtopic.php) page with posts, closed topic has lock icon in action bar.
+    """
+    lock = '<i class="icon fa-lock fa-fw" aria-hidden="true"></i>' if closed else \
+        '<i class="icon fa-reply fa-fw" aria-hidden="true"></i>'
+    first_post_id = topic_id * 10
+    posts_html = ''.join(topic_post(first_post_id + idx, idx == 0, rng) for idx in range(posts))
+    return f'''<!DOCTYPE html>
+<html dir="ltr" lang="ru">
+<head><meta charset="utf-8"><title>Продам - Форум Overclockers.ua</title></head>
+<body id="phpbb" class="section-viewtopic ltr">
+<div id="page-body" class="page-body">
+    <h2 class="topic-title"><a href="./viewtopic.php?f=26&amp;t={topic_id}">Продам</a></h2>
+    <div class="action-bar bar-top">
+        <a href="./posting.php?mode=reply&amp;f=26&amp;t={topic_id}" class="button">{lock}</a>
+    </div>{posts_html}
+    <div class="action-bar bar-bottom">{lock}</div>
+</div>
+</body>
+</html>'''
+
+
+def listing_pages(count: int = 10, seed: int = 0) -> List[str]:
+    pages = _corpus_pages(LISTING_PAGES_PATTERN)
+    if pages:
+        return pages
+    rng = random.Random(seed)
+    return [listing_page(page_index, rng) for page_index in range(count)]
+
+
+def topic_pages(count: int = 20, seed: int = 0) -> List[str]:
+    pages = _corpus_pages(TOPIC_PAGES_PATTERN)
+    if pages:
+        return pages
+    rng = random.Random(seed)
+    return [topic_page(2000000 + idx, rng, posts=rng.randint(1, 40), closed=idx % 10 == 0) for idx in range(count)]
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    """
+    Return word with a single typo: missed, doubled, swapped or replaced letter.
+    """
+    if len(word) < 3:
+        return word
+    position = rng.randrange(len(word) - 1)
+    kind = rng.randrange(4)
+    if kind == 0:
+        return word[:position] + word[position + 1:]
+    if kind == 1:
+        return word[:position] + word[position] + word[position:]
+    if kind == 2:
+        return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+    return word[:position] + rng.choice('аеиоуыяюєії') + word[position + 1:]
+
+
+def location_typos(names: List[str], count: int = 500, seed: int = 0) -> List[str]:
+    """
+    Return location names with typos, a quarter of them are spelled correctly.
+    """
+    rng = random.Random(seed)
+    typos = []
+    for idx in range(count):
+        name = rng.choice(names)
+        typos.append(name if idx % 4 == 0 else misspell(name, rng))
+    return typos
@@ -0,0 +1,116 @@
+"""
+Run crawl pipeline of scrap_to_db against forum simulator and report throughput
+and request latency:
+
+    python -m scrapper.benchmarks.loadtest --pages 250 --latency 0.05 --throttle-rate 0.01
+
+Topics are written to mongomock unless --database is set, then database from settings is used.
+"""
+import argparse
+from functools import partial
+import multiprocessing
+import os
+import socket
+import time
+
+from mongoengine import connect
+
+from scrapper.engine.over_scrapper import OverclockersScrapper
+from scrapper.models.adapters import TopicsToDBAdapter
+from scrapper.scrap_to_db import Crawler
+from scrapper.settings import ENVIRONMENT_VARIABLE
+from scrapper.utils.metrics import metrics
+
+from . import simulator
+
+# request latency histogram buckets (seconds): from 1 ms to ~60 sec, 20% apart
+LATENCY_BUCKETS = tuple(round(0.001 * 1.2 ** power, 6) for power in range(61))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Load test of scrapper against forum simulator')
+    parser.add_argument('--port', type=int, default=8080, help='simulator port')
+    parser.add_argument('--coros-limit', type=int, default=100, help='scrapper concurrency limit')
+    parser.add_argument('--database', action='store_true', help='write topics to database from settings')
+    simulator.add_config_arguments(parser)
+    return parser.parse_args()
+
+
+def simulated_scrapper(host: str, port: int, **kwargs) -> OverclockersScrapper:
+    """
+    Return scrapper that crawls forum simulator instead of the forum.
+    """
+    domain = f'http://{host}:{port}'
+
+    class SimulatedScrapper(OverclockersScrapper):
+        HOST = f'{host}:{port}'
+        DOMAIN = domain
+        FORUM_URL = f'{domain}/viewforum.php'
+        TOPIC_URL = f'{domain}/viewtopic.php'
+
+    return SimulatedScrapper(**kwargs)
+
+
+def start_simulator(config: simulator.SimulatorConfig, host: str, port: int, timeout: float = 10):
+    """
+    Run simulator in its own process, so serving pages does not take scrapper CPU.
+    """
+    process = multiprocessing.Process(target=simulator.run, args=(config, host, port), daemon=True)
+    process.start()
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return process
+        except OSError:
+            if time.monotonic() > deadline or not process.is_alive():
+                process.terminate()
+                raise
+            time.sleep(0.1)
+
+
+def print_load_report(topics: int, elapsed: float):
+    print(f'Topics: {topics}\nElapsed: {elapsed:.2f} sec\nThroughput: {topics / elapsed:.1f} topics/sec')
+    requests = metrics.histograms.get('scrapper_request_seconds')
+    if requests:
+        summary = requests.summary
+        print(f'Requests: {summary["count"]} ({summary["count"] / elapsed:.1f}/sec), latency '
+              f'p50 {summary["p50"] * 1000:.0f} ms, p99 {summary["p99"] * 1000:.0f} ms, '
+              f'max {summary["max"] * 1000:.0f} ms')
+
+
+def main():
+    args = parse_args()
+    # settings are loaded on the first access
+    os.environ.setdefault(ENVIRONMENT_VARIABLE, 'development')
+
+    host = '127.0.0.1'
+    process = start_simulator(simulator.config_from_args(args), host, args.port)
+
+    adapter = None
+    if not args.database:
+        adapter = TopicsToDBAdapter()
+        adapter.connection = connect(db='loadtest', host='mongomock://localhost')
+    crawler = Crawler(
+        scrapper_factory=partial(simulated_scrapper, host, args.port, coros_limit=args.coros_limit), adapter=adapter
+    )
+    metrics.enabled = True
+    metrics.buckets = LATENCY_BUCKETS
+    metrics.reset()
+
+    started = time.perf_counter()
+    try:
+        results = crawler.crawl(1, args.pages, full=True)
+    finally:
+        elapsed = time.perf_counter() - started
+        crawler.close()
+        process.terminate()
+        process.join()
+
+    print_load_report(int(metrics.counters.get('scrapper_imported_topics_total', 0)), elapsed)
+    crawler.print_report(results)
+
+
+if __name__ == '__main__':
+    main()
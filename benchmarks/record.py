@@ -0,0 +1,57 @@
+"""
+Record forum pages to benchmarks corpus directory:
+
+    python -m scrapper.benchmarks.record ./corpus --pages 5 --topics 40
+
+then run benchmarks with BENCHMARK_CORPUS_PATH=./corpus.
+"""
+import argparse
+import asyncio
+import os
+
+from scrapper.engine.over_parser import OverclockersParser
+from scrapper.engine.over_scrapper import OverclockersScrapper
+from scrapper.utils.session import GSession
+
+from .corpus import LISTING_PAGES_PATTERN, TOPIC_PAGES_PATTERN
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Record forum pages for benchmarks')
+    parser.add_argument('path', help='corpus directory')
+    parser.add_argument('--pages', type=int, default=5, help='number of listing pages')
+    parser.add_argument('--topics', type=int, default=40, help='number of topic pages')
+    return parser.parse_args()
+
+
+def _save(path: str, pattern: str, name, content: str):
+    with open(os.path.join(path, pattern.replace('*', str(name))), 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+async def record(path: str, pages: int, topics: int):
+    scrapper = OverclockersScrapper()
+    parser = OverclockersParser(domain=scrapper.DOMAIN)
+    os.makedirs(path, exist_ok=True)
+
+    topics_listing = []
+    async with GSession(headers=scrapper.generate_headers()) as session:
+        for page_number in range(1, pages + 1):
+            response = await session.get_data(
+                scrapper.FORUM_URL, params={'f': scrapper.FORUM_ID, 'start': (page_number - 1) * 40}
+            )
+            _save(path, LISTING_PAGES_PATTERN, page_number, response.data)
+            topics_listing.extend(parser.parse_topics_list(response.data))
+
+        for topic in topics_listing[:topics]:
+            response = await session.get_data(topic.url)
+            _save(path, TOPIC_PAGES_PATTERN, topic.topic_id, response.data)
+
+
+def main():
+    args = parse_args()
+    asyncio.get_event_loop().run_until_complete(record(args.path, args.pages, args.topics))
+
+
+if __name__ == '__main__':
+    main()
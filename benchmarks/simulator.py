@@ -0,0 +1,131 @@
+"""
+Local stand-in of the forum serving synthetic listing and topic pages with configurable
+latency and failures:
+
+    python -m scrapper.benchmarks.simulator --port 8080 --pages 250 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass
+import random
+
+from aiohttp import web
+
+from . import corpus
+
+# number of distinct topic pages bodies, topic page is chosen by topic ID
+TOPIC_PAGE_VARIANTS = 50
+
+
+@dataclass
+class SimulatorConfig:  # pylint: disable=too-many-instance-attributes
+
+    # number of listing pages with topics, the next ones are empty
+    pages: int = 250
+    topics_per_page: int = corpus.TOPICS_PER_PAGE
+    # mean response delay (seconds), actual delay is uniform in [0.5, 1.5] of mean
+    latency: float = 0.05
+    # shares of responses answered with 500 and with 429
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    # Retry-After of 429 responses (seconds)
+    retry_after: int = 1
+    seed: int = 0
+
+
+class ForumSimulator:
+    """
+    aiohttp application that answers viewforum.php and viewtopic.php like the forum does.
+    Listing pages are rendered once, topic pages are taken from a pool of rendered pages.
+    """
+
+    def __init__(self, config: SimulatorConfig):
+        self.config = config
+        self.requests = 0
+        self._random = random.Random(config.seed)
+        self._listing_pages = {}
+        rng = random.Random(config.seed)
+        self._topic_pages = [
+            corpus.topic_page(idx, rng, posts=rng.randint(1, 40), closed=idx % 10 == 0)
+            for idx in range(TOPIC_PAGE_VARIANTS)
+        ]
+
+    def _listing_page(self, page_index: int) -> str:
+        if page_index not in self._listing_pages:
+            topics = self.config.topics_per_page if page_index < self.config.pages else 0
+            self._listing_pages[page_index] = corpus.listing_page(
+                page_index, random.Random(self.config.seed + page_index), topics=topics
+            )
+        return self._listing_pages[page_index]
+
+    async def _simulate(self):
+        """
+        Wait for response latency and return failure response if request is chosen to fail.
+        """
+        self.requests += 1
+        config = self.config
+        await asyncio.sleep(config.latency * self._random.uniform(0.5, 1.5))
+
+        chance = self._random.random()
+        if chance < config.throttle_rate:
+            return web.Response(status=429, headers={'Retry-After': str(config.retry_after)})
+        if chance < config.throttle_rate + config.error_rate:
+            return web.Response(status=500)
+        return None
+
+    async def view_forum(self, request: web.Request) -> web.Response:
+        failure = await self._simulate()
+        if failure:
+            return failure
+        page_index = int(request.query.get('start', 0)) // self.config.topics_per_page
+        return web.Response(text=self._listing_page(page_index), content_type='text/html')
+
+    async def view_topic(self, request: web.Request) -> web.Response:
+        failure = await self._simulate()
+        if failure:
+            return failure
+        topic_id = int(request.query['t'])
+        return web.Response(text=self._topic_pages[topic_id % TOPIC_PAGE_VARIANTS], content_type='text/html')
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/viewforum.php', self.view_forum)
+        app.router.add_get('/viewtopic.php', self.view_topic)
+        return app
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    defaults = SimulatorConfig()
+    parser.add_argument('--pages', type=int, default=defaults.pages, help='number of listing pages with topics')
+    parser.add_argument('--latency', type=float, default=defaults.latency, help='mean response delay, seconds')
+    parser.add_argument('--error-rate', type=float, default=defaults.error_rate, help='share of 500 responses')
+    parser.add_argument('--throttle-rate', type=float, default=defaults.throttle_rate, help='share of 429 responses')
+    parser.add_argument('--seed', type=int, default=defaults.seed, help='random seed')
+
+
+def config_from_args(args: argparse.Namespace) -> SimulatorConfig:
+    return SimulatorConfig(
+        pages=args.pages,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed
+    )
+
+
+def run(config: SimulatorConfig, host: str, port: int):
+    web.run_app(ForumSimulator(config).create_app(), host=host, port=port, print=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve forum simulator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    run(config_from_args(args), args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# pylint: disable=no-self-use
+
+import aiohttp
+from aiohttp import web
+import pytest
+
+from scrapper.engine.over_parser import OverclockersParser
+
+from ..simulator import ForumSimulator, SimulatorConfig
+
+
+async def fetch(config: SimulatorConfig, path: str, params: dict):
+    simulator = ForumSimulator(config)
+    runner = web.AppRunner(simulator.create_app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f'http://127.0.0.1:{port}{path}', params=params) as response:
+                return response.status, response.headers, await response.text()
+    finally:
+        await runner.cleanup()
+
+
+class TestForumSimulator:
+
+    @pytest.mark.asyncio
+    async def test_listing_page(self):
+        config = SimulatorConfig(pages=2, latency=0)
+        parser = OverclockersParser(domain='http://127.0.0.1')
+
+        status, _, page = await fetch(config, '/viewforum.php', {'f': 26, 'start': 40})
+        _, _, empty_page = await fetch(config, '/viewforum.php', {'f': 26, 'start': 80})
+
+        assert status == 200
+        assert len(parser.parse_topics_list(page)) == config.topics_per_page
+        assert not parser.parse_topics_list(empty_page)
+
+    @pytest.mark.asyncio
+    async def test_topic_page(self):
+        status, _, page = await fetch(SimulatorConfig(latency=0), '/viewtopic.php', {'f': 26, 't': 1234567890})
+
+        topic = OverclockersParser.parse_topic_content(page, 'http://127.0.0.1/viewtopic.php?f=26&t=1234567890')
+
+        assert status == 200
+        assert topic.topic_id == 1234567890
+        assert topic.content
+
+    @pytest.mark.asyncio
+    async def test_throttled(self):
+        config = SimulatorConfig(latency=0, throttle_rate=1.0, retry_after=3)
+
+        status, headers, _ = await fetch(config, '/viewtopic.php', {'f': 26, 't': 1})
+
+        assert status == 429
+        assert headers['Retry-After'] == '3'
+
+    @pytest.mark.asyncio
+    async def test_server_error(self):
+        status, _, _ = await fetch(SimulatorConfig(latency=0, error_rate=1.0), '/viewforum.php', {'f': 26})
+
+        assert status == 500
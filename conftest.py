@@ -4,12 +4,21 @@ from typing import Optional
 import pytest
 
 from scrapper.engine.base import TopicMetaInfo
+from scrapper.utils.spelling.checker import location_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_location_cache():
+    # memoized locations must not leak between tests with mocked location resources
+    location_cache.clear()
+    yield
+    location_cache.clear()
 
 
 @pytest.fixture
 def create_topic_meta_info():
-    def inner(url: Optional[str] = None, title: Optional[str] = None, location_raw: Optional[str] = None):
-        return TopicMetaInfo(
+    def inner(url: Optional[str] = None, title: Optional[str] = None):
+        return TopicMetaInfo.from_listing(
             domain='https://forum.example.com',
             url=url if url else './viewtopic.php?f=26&t=1000&sid=abc123',
             title=title if title else '[Украина, Киев] Title',
@@ -17,7 +26,6 @@ def create_topic_meta_info():
             author_profile_link='./memberlist.php?mode=viewprofile&u=123456',
             posts_count='100',
             views_count='100',
-            last_post_timestamp=datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
-            location_raw=location_raw if location_raw else 'Украина, Киев'
+            last_post_timestamp=datetime.now(timezone.utc).replace(microsecond=0).isoformat()
         )
     return inner
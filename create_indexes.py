@@ -0,0 +1,8 @@
+from scrapper.models.adapters import TopicsToDBAdapter
+
+
+if __name__ == '__main__':
+    adapter = TopicsToDBAdapter()
+    collections = adapter.ensure_indexes()
+
+    print(f'Indexes are created for: {", ".join(collections)}')
@@ -0,0 +1,48 @@
+import argparse
+import logging
+import signal
+
+from scrapper.scrap_to_db import Crawler
+from scrapper.settings import settings
+from scrapper.utils.scheduler import IntervalScheduler
+
+
+def parse_args():
+    daemon_settings = settings.DAEMON
+    parser = argparse.ArgumentParser(description='Scrap forum topics to database on schedule')
+    parser.add_argument('--start', type=int, default=1, help='first listing page number')
+    parser.add_argument('--end', type=int, default=10, help='last listing page number')
+    parser.add_argument(
+        '--interval', type=float, default=daemon_settings['interval'], help='seconds between crawls starts'
+    )
+    parser.add_argument(
+        '--jitter', type=float, default=daemon_settings['jitter'],
+        help='random number of seconds (up to) added to or subtracted from interval'
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # scrapper, database connections and caches are created once
+    # and stay warm between crawls
+    crawler = Crawler()
+
+    def crawl():
+        crawler.print_report(crawler.crawl(args.start, args.end))
+
+    scheduler = IntervalScheduler(crawl, args.interval, jitter=args.jitter)
+    # crawl in progress is finished before exit
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+
+    try:
+        scheduler.run()
+    finally:
+        crawler.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    main()
@@ -2,11 +2,11 @@ from datetime import datetime
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 import re
-from typing import Optional, Union
-
-from fake_useragent import FakeUserAgent
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from scrapper.utils.metrics import metrics
 from scrapper.utils.spelling.checker import validate_location
+from scrapper.utils.user_agents import UserAgentPool
 
 
 class BaseScraper(ABC):
@@ -36,7 +36,8 @@ class ScrapperMixin(BaseScraper):
     DOMAIN = ''
 
     def __init__(self):
-        self._ua = FakeUserAgent()
+        # bundled User-Agent strings, read on first request
+        self._ua = UserAgentPool()
 
     @property
     def _headers_partial(self) -> dict:
@@ -48,66 +49,86 @@ class ScrapperMixin(BaseScraper):
     def generate_headers(self) -> dict:
         headers = self._headers_partial
         headers.update(
-            {'User-Agent': self._ua.random}
+            {'User-Agent': self._ua.random()}
         )
         return headers
 
 
 class DataContainerMixin:  # pylint: disable=too-few-public-methods
 
+    __slots__ = ()
+
     TOPIC_ID_PATTERN = re.compile(r'\D+', re.IGNORECASE)
     COUNTRY_PATTERN = re.compile(r'(ук.*на)', re.IGNORECASE)
 
-    def parse_topic_id(self, path: str) -> int:
-        return int(re.sub(self.TOPIC_ID_PATTERN, '', path.rsplit('&', 1)[1]))
+    @classmethod
+    def parse_topic_id(cls, path: str) -> int:
+        return int(re.sub(cls.TOPIC_ID_PATTERN, '', path.rsplit('&', 1)[1]))
 
 
-@dataclass
 class TopicMetaInfo(DataContainerMixin):
-
-    domain: str
-    url: str
-    title: str
-    author: str
-    author_profile_link: str
-    posts_count: Union[str, int]
-    views_count: Union[str, int]
-    last_post_timestamp: Union[str, datetime]
-    location_raw: Optional[str] = None
-    location: Optional[str] = None
-    page_index: Optional[int] = None
-    topic_id: Optional[int] = None
-    topic_content: Optional[str] = None
-    processed: bool = False
-    closed: bool = False
-
-    def process(self) -> None:
-        if 'sid' in self.url:
-            relative_path = self.url.split('.', 1)[1].rsplit('&', 1)[0]
-        else:
-            relative_path = self.url.split('.', 1)[1]
-        self.url = f'{self.domain}{relative_path}'
-        self.posts_count = int(self.posts_count.strip())
-        self.views_count = int(self.views_count.strip())
-        self.last_post_timestamp = datetime.strptime(self.last_post_timestamp, '%Y-%m-%dT%H:%M:%S%z')
-        self.topic_id = self.parse_topic_id(path=relative_path)
-        self.author = self.author.strip()
-        if 'sid' in self.author_profile_link:
-            self.author_profile_link = self.author_profile_link.split('.', 1)[1].rsplit('&', 1)[0]
+    """
+    Topic listing row with typed values. Records are created by from_listing out of raw
+    listing page values; instances have no __dict__, so long crawls keep memory low.
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    __slots__ = (
+        'url', 'title', 'author', 'author_profile_link', 'posts_count', 'views_count', 'last_post_timestamp',
+        'topic_id', 'location_raw', 'location', 'page_index', 'topic_content', 'closed', 'content_hash',
+        'content_changed'
+    )
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-locals
+            self, *, url: str, title: str, author: str, author_profile_link: str, posts_count: int,
+            views_count: int, last_post_timestamp: datetime, topic_id: int, location_raw: Optional[str] = None,
+            location: Optional[str] = None, page_index: Optional[int] = None, topic_content: Optional[str] = None,
+            closed: bool = False, content_hash: Optional[str] = None, content_changed: bool = True
+    ):
+        self.url = url
+        self.title = title
+        self.author = author
+        self.author_profile_link = author_profile_link
+        self.posts_count = posts_count
+        self.views_count = views_count
+        self.last_post_timestamp = last_post_timestamp
+        self.topic_id = topic_id
+        self.location_raw = location_raw
+        self.location = location
+        self.page_index = page_index
+        self.topic_content = topic_content
+        self.closed = closed
+        # fingerprint of topic page content, see content_fingerprint
+        self.content_hash = content_hash
+        # False when topic page is the same as on previous crawl
+        self.content_changed = content_changed
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(topic_id={self.topic_id!r}, title={self.title!r})'
+
+    @staticmethod
+    def _absolute_link(domain: str, link: str) -> str:
+        if 'sid' in link:
+            relative_path = link.split('.', 1)[1].rsplit('&', 1)[0]
         else:
-            self.author_profile_link = self.author_profile_link.split('.', 1)[1]
-        self.author_profile_link = f'{self.domain}{self.author_profile_link}'
-
-        self.title = self.title.strip()
-        location_pair = self.title.split(']', maxsplit=1)[0].strip('[').split(',')
-        self.location_raw = ','.join(location_pair)
+            relative_path = link.split('.', 1)[1]
+        return f'{domain}{relative_path}'
+
+    @classmethod
+    def _parse_location(cls, title: str) -> Tuple[str, Optional[str]]:
+        """
+        Return raw location and validated location name out of topic title.
+        """
+        location_pair = title.split(']', maxsplit=1)[0].strip('[').split(',')
+        location_raw = ','.join(location_pair)
         location_length = len(location_pair)
 
-        if location_length == 1 and not re.match(self.COUNTRY_PATTERN, location_pair[0]):
+        location = None
+        if location_length == 1 and not re.match(cls.COUNTRY_PATTERN, location_pair[0]):
             location_name = location_pair[0].strip().replace(' ', '')
-            self.location = validate_location(location_name)
+            location = validate_location(location_name)
         elif location_length > 1:
-            if re.match(self.COUNTRY_PATTERN, location_pair[0]):
+            if re.match(cls.COUNTRY_PATTERN, location_pair[0]):
                 # example: Украина, Киев
                 location_name = location_pair[1].strip()
             else:
@@ -125,36 +146,80 @@ class TopicMetaInfo(DataContainerMixin):
             elif '-' in location_name:
                 # example: Ивано - Франковск
                 location_name = location_name.replace(' ', '')
-            self.location = validate_location(location_name)
-
-        self.title = self.title.split(']')[1].strip()
-
-        self.processed = True
+            location = validate_location(location_name)
+        return location_raw, location
+
+    @classmethod
+    @metrics.timed('scrapper_topic_process_seconds')
+    def from_listing(  # pylint: disable=too-many-arguments
+            cls, domain: str, url: str, title: str, author: str, author_profile_link: str, posts_count: str,
+            views_count: str, last_post_timestamp: str
+    ) -> 'TopicMetaInfo':
+        """
+        Create record out of raw values of topic row on listing page (relative links,
+        untrimmed strings, ISO timestamp).
+        """
+        url = cls._absolute_link(domain, url)
+        title = title.strip()
+        location_raw, location = cls._parse_location(title)
+
+        return cls(
+            url=url,
+            title=title.split(']')[1].strip(),
+            author=author.strip(),
+            author_profile_link=cls._absolute_link(domain, author_profile_link),
+            posts_count=int(posts_count.strip()),
+            views_count=int(views_count.strip()),
+            last_post_timestamp=datetime.strptime(last_post_timestamp, '%Y-%m-%dT%H:%M:%S%z'),
+            topic_id=cls.parse_topic_id(url),
+            location_raw=location_raw,
+            location=location
+        )
 
-    def to_json(self):
-        if self.processed:
-            base_data = {
+    def to_json(self) -> dict:
+        if not self.content_changed or self.closed:
+            # topic page is the same as stored one, so only counters are updated;
+            # closed topic data is not updated too since usually author remove
+            # all topic content. Updated is still set, topics checked recently
+            # are excluded from the next crawls by it
+            return {
                 'topic_id': self.topic_id,
                 'posts_count': self.posts_count,
                 'views_count': self.views_count,
                 'last_post_timestamp': self.last_post_timestamp,
-                'updated': datetime.now(),
+                'updated': datetime.now()
             }
-            if self.closed:
-                # avoid updating topic data when topic is closed
-                # since usually author remove all topic content
-                return base_data
-
-            base_data.update({
-                'url': self.url,
-                'title': self.title,
-                'location_raw': self.location_raw,
-                'location': self.location,
-                'topic_content': self.topic_content,
-                'closed': self.closed
-            })
-            return base_data
-        raise AttributeError('Values was not processed. Call process method first.')
+
+        data = {
+            'topic_id': self.topic_id,
+            'posts_count': self.posts_count,
+            'views_count': self.views_count,
+            'last_post_timestamp': self.last_post_timestamp,
+            'updated': datetime.now(),
+            'url': self.url,
+            'title': self.title,
+            'location_raw': self.location_raw,
+            'location': self.location,
+            'topic_content': self.topic_content,
+            'closed': self.closed
+        }
+        if self.content_hash:
+            data['content_hash'] = self.content_hash
+        return data
+
+
+def freshest_topics(topics: Iterable[TopicMetaInfo]) -> List[TopicMetaInfo]:
+    """
+    Return topics without duplicates (same topic ID, e.g. topic bumped to another listing
+    page during crawl) in order of first appearance. Topic with the latest post wins,
+    the later one wins a tie.
+    """
+    freshest: Dict[int, TopicMetaInfo] = {}
+    for topic in topics:
+        known = freshest.get(topic.topic_id)
+        if known is None or topic.last_post_timestamp >= known.last_post_timestamp:
+            freshest[topic.topic_id] = topic
+    return list(freshest.values())
 
 
 @dataclass
@@ -1,13 +1,26 @@
+import re
+from typing import Optional
+
 from selectolax.parser import HTMLParser
 
+from scrapper.utils.metrics import metrics
+
 from .base import TopicMetaInfo, TopicData
 
 
 class OverclockersParser:
 
+    TOPIC_CONTENT_SELECTOR = '.bg1 > .inner > .postbody > * > .content'
+    TOPIC_CLOSED_SELECTOR = '.fa-lock'
+    # markup of post content block and of post end on topic page: every post is followed
+    # by divider (the only post of topic too) and by the next post start
+    CONTENT_MARKER = 'class="content"'
+    POST_END_MARKER = re.compile(r'<hr class="divider"|<div id="p\d+"')
+
     def __init__(self, domain):
         self.domain = domain
 
+    @metrics.timed('scrapper_parse_listing_seconds')
     def parse_topics_list(self, page_content: str):
         results = []
 
@@ -25,9 +38,8 @@ class OverclockersParser:
             views = element.css_first('.views').child.html
             last_post_dt_string = element.css_first('.lastpost span time').attributes.get('datetime')
 
-            data_container = TopicMetaInfo(
+            results.append(TopicMetaInfo.from_listing(
                 domain=self.domain,
-                topic_id=0,
                 url=rel_url,
                 title=topic_title,
                 author=author,
@@ -35,17 +47,42 @@ class OverclockersParser:
                 posts_count=answers,
                 views_count=views,
                 last_post_timestamp=last_post_dt_string
-            )
-            data_container.process()
-
-            results.append(data_container)
+            ))
         return results
 
-    @staticmethod
-    def parse_topic_content(page_content: str, url: str):
-        root = HTMLParser(page_content)
-        topic_content = root.css_first('.bg1 > .inner > .postbody > * > .content').text()
-        topic_closed = bool(root.css_first('.fa-lock'))
+    @classmethod
+    def first_post_html(cls, page_content: str) -> Optional[str]:
+        """
+        Return beginning of topic page up to the end of the first post (divider or the next
+        post start that follows the first post content), or None if page markup doesn't have
+        expected markers.
+        """
+        content_position = page_content.find(cls.CONTENT_MARKER)
+        if content_position == -1:
+            return None
+
+        post_end = cls.POST_END_MARKER.search(page_content, content_position)
+        if post_end is None:
+            return None
+        return page_content[:post_end.start()]
+
+    @classmethod
+    @metrics.timed('scrapper_parse_topic_seconds')
+    def parse_topic_content(cls, page_content: str, url: str):
+        # topic is locked with icon in the action bar above posts, so both content and
+        # lock could be taken from the first post without building DOM of the whole page
+        topic_content = None
+        first_post_html = cls.first_post_html(page_content)
+        if first_post_html is not None:
+            root = HTMLParser(first_post_html)
+            content_node = root.css_first(cls.TOPIC_CONTENT_SELECTOR)
+            if content_node is not None:
+                topic_content = content_node.text()
+
+        if topic_content is None:
+            root = HTMLParser(page_content)
+            topic_content = root.css_first(cls.TOPIC_CONTENT_SELECTOR).text()
+        topic_closed = bool(root.css_first(cls.TOPIC_CLOSED_SELECTOR))
 
         data_container = TopicData(
             content=topic_content,
@@ -1,15 +1,69 @@
 import asyncio
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import repeat
 import logging
-from typing import Generator, List
+from typing import AsyncGenerator, Callable, Collection, Dict, Generator, Iterable, List, Optional, Union
+
+import aiohttp
 
 from scrapper.engine.base import ScrapperMixin
+from scrapper.utils.cache import ResponseCache
+from scrapper.utils.helpers import content_fingerprint
+from scrapper.utils.limiter import AdaptiveLimiter
+from scrapper.utils.retry import DEFAULT_RETRY_POLICIES, RetryBudget, RetryPolicy, RetryStats
 from scrapper.utils.session import GSession
+from scrapper.utils.spelling.checker import location_cache
 
+from .base import TopicMetaInfo, freshest_topics
 from .over_parser import OverclockersParser
 from .types import URLContent
 
+# marks the end of a pipeline stage output
+_STAGE_DONE = object()
+
+# all requests go to a single host, so connections are kept open between
+# requests (and crawls) and host name is resolved rarely
+DEFAULT_CONNECTOR_OPTIONS = {
+    'keepalive_timeout': 60,
+    'ttl_dns_cache': 300
+}
+
+
+def _parse_in_worker(func: Callable, *args):
+    """
+    Run parser function in parse executor and return its result with location cache updates
+    of worker process (see init_location_worker), so they get to cache of the parent process.
+    """
+    return func(*args), location_cache.pop_updates()
+
+
+def _merge_location_updates(results: Iterable) -> Generator:
+    for result, updates in results:
+        location_cache.merge(*updates)
+        yield result
+
+
+@dataclass
+class _PipelineContext:
+    """
+    Resources shared by the stages of a single stream_topics call.
+    """
+
+    session: GSession
+    semaphore: Union[asyncio.Semaphore, AdaptiveLimiter]
+    parser: OverclockersParser
+    topics_queue: asyncio.Queue
+    results_queue: asyncio.Queue
+    # callable that returns stored content fingerprints for topic ID's
+    fingerprints: Optional[Callable[[List[int]], Dict[int, str]]] = None
+    # topic ID -> the latest post timestamp of topics pushed to topics queue
+    seen_topics: Dict[int, datetime] = field(default_factory=dict)
+
 
 class OverclockersScrapper(ScrapperMixin):
+    # pylint: disable=too-many-instance-attributes
 
     HOST = 'forum.overclockers.ua'
     DOMAIN = f'https://{HOST}'
@@ -17,13 +71,57 @@ class OverclockersScrapper(ScrapperMixin):
     TOPIC_URL = f'{DOMAIN}/viewtopic.php'
     FORUM_ID = 26
 
-    def __init__(self, coros_limit=100, r_timeout=5, pause=15, raise_exceptions=True):
+    def __init__(  # pylint: disable=too-many-arguments
+            self, coros_limit=100, r_timeout=5, pause=15, raise_exceptions=True, queue_size=None,
+            cache: Optional[ResponseCache] = None, adaptive_concurrency=True, initial_concurrency=10,
+            retry_policies: Optional[Dict[str, RetryPolicy]] = None, retry_budget_ratio=0.2,
+            connector_options: Optional[dict] = None, parse_executor: Optional[Executor] = None
+    ):
         super().__init__()
         self.loop = None
+        # optional on-disk cache for conditional requests
+        self.cache = cache
         self.r_timeout = r_timeout
         self.coros_limit = coros_limit
+        # with adaptive concurrency coros_limit is the upper bound, actual number of concurrent
+        # requests starts from initial_concurrency and follows server health (see AdaptiveLimiter)
+        self.adaptive_concurrency = adaptive_concurrency
+        self.initial_concurrency = min(initial_concurrency, coros_limit)
+        self.limiter = None
         self.raise_exceptions = raise_exceptions
+        # failed requests are retried by policy for the kind of failure (DEFAULT_RETRY_POLICIES
+        # if not set), with empty retry_policies they are retried with constant pause
+        self.retry_policies = DEFAULT_RETRY_POLICIES if retry_policies is None else retry_policies
         self.pause = pause
+        # retries of a single crawl are limited to the ratio of requests
+        self.retry_budget_ratio = retry_budget_ratio
+        self.retry_stats = None
+        # options of TCPConnector of scrapper session (see aiohttp.TCPConnector)
+        self.connector_options = {
+            **DEFAULT_CONNECTOR_OPTIONS,
+            'limit': coros_limit,
+            'limit_per_host': coros_limit,
+            **(connector_options or {})
+        }
+        self._session = None
+        self._session_loop = None
+        # optional executor (usually ProcessPoolExecutor) pages are parsed in, so parsing
+        # of a page runs on other core while next pages are being fetched; executor is
+        # not owned by scrapper and has to be shut down by the caller. Worker processes
+        # have to be initialized with init_location_worker to merge their location cache
+        # into the one of scrapper process
+        self.parse_executor = parse_executor
+        # bounds every queue between pipeline stages, so memory stays flat
+        # no matter how many pages are crawled
+        self.queue_size = queue_size if queue_size else coros_limit * 2
+        # filled during streaming: the latest post timestamp seen on listing
+        # pages, number of listing and topic pages failed to be fetched, number
+        # of excluded topics and of topics seen on listing pages again
+        self.latest_post_timestamp = None
+        self.listing_errors = 0
+        self.content_errors = 0
+        self.excluded_topics = 0
+        self.duplicate_topics = 0
         self._event_loop_set = False
 
     def _set_event_loop(self):
@@ -49,9 +147,63 @@ class OverclockersScrapper(ScrapperMixin):
             )
         return urls
 
+    def _create_semaphore(self) -> Union[asyncio.Semaphore, AdaptiveLimiter]:
+        if not self.adaptive_concurrency:
+            return asyncio.Semaphore(self.coros_limit)
+        # last limiter is kept for its stats
+        self.limiter = AdaptiveLimiter(
+            initial_limit=self.initial_concurrency,
+            max_limit=self.coros_limit,
+            # response slower than half of timeout means server is overloaded
+            max_latency=self.r_timeout / 2 if self.r_timeout else None
+        )
+        return self.limiter
+
+    async def _get_session(self) -> GSession:
+        """
+        Return scrapper session. Session is created on first use and its connections are
+        reused by all requests and crawls run in the same event loop until close is called.
+        Scrapper has to be closed before it is used in other event loop. Retries are budgeted
+        and counted per call.
+        """
+        loop = asyncio.get_event_loop()
+        if self._session is not None and not self._session.closed and self._session_loop is not loop:
+            # connections of open session belong to its event loop and could be closed only there,
+            # so replacing session would leak them
+            raise RuntimeError('Scrapper session is bound to other event loop, scrapper has to be closed first')
+        if self._session is None or self._session.closed:
+            self._session = GSession(
+                connector=aiohttp.TCPConnector(**self.connector_options),
+                headers=self.generate_headers(),
+                cache=self.cache,
+                retry_policies=self.retry_policies,
+                # requests are spread over User-Agents
+                user_agents=self._ua
+            )
+            self._session_loop = loop
+
+        self._session.retry_budget = RetryBudget(ratio=self.retry_budget_ratio)
+        self._session.retry_stats = RetryStats()
+        # last crawl retry stats are kept
+        self.retry_stats = self._session.retry_stats
+        return self._session
+
+    async def aclose(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    def close(self):
+        """
+        Close scrapper session (and its connections), event loop is left open.
+        """
+        if self._session is not None and self._session_loop is self.loop:
+            self.loop.run_until_complete(self.aclose())
+
     async def _fire_requests(self, urls):
-        session = GSession(headers=self.generate_headers())
-        semaphore = asyncio.Semaphore(self.coros_limit)
+        session = await self._get_session()
+        semaphore = self._create_semaphore()
 
         tasks, result = [], []
 
@@ -60,18 +212,41 @@ class OverclockersScrapper(ScrapperMixin):
 
         result = await asyncio.gather(*tasks, return_exceptions=self.raise_exceptions)
 
-        await session.close()
         return result
 
-    async def _get_data(self, url, req_params, session, semaphore) -> URLContent:
-        data = None
-        response = await session.get_data(
+    def _map_parse(self, func: Callable, *iterables) -> Iterable:
+        """
+        Apply parser function to every page, in parse executor if it is set.
+        """
+        if self.parse_executor is None:
+            return map(func, *iterables)
+        return _merge_location_updates(self.parse_executor.map(_parse_in_worker, repeat(func), *iterables))
+
+    async def _parse(self, func: Callable, *args):
+        """
+        Run parser function in parse executor if it is set, so event loop
+        keeps serving requests meanwhile, or in place otherwise.
+        """
+        if self.parse_executor is None:
+            return func(*args)
+        result, updates = await asyncio.get_event_loop().run_in_executor(
+            self.parse_executor, _parse_in_worker, func, *args
+        )
+        location_cache.merge(*updates)
+        return result
+
+    async def _get_response(self, url, req_params, session, semaphore):
+        return await session.get_data(
             url,
             params=req_params,
             semaphore=semaphore,
             timeout=self.r_timeout,
             sleep_on_retry=self.pause
         )
+
+    async def _get_data(self, url, req_params, session, semaphore) -> URLContent:
+        data = None
+        response = await self._get_response(url, req_params, session, semaphore)
         if response and response.data:
             data = {str(response.url): response.data}
         return data
@@ -86,30 +261,282 @@ class OverclockersScrapper(ScrapperMixin):
         urls = self._generate_listing_urls(page_num_start, page_num_end)
         results_raw = self.loop.run_until_complete(self._fire_requests(urls))
 
+        pages = []
         for page_index, page in enumerate(results_raw):
             if isinstance(page, Exception):
                 logging.error(page)
             else:
-                for data_raw in page.values():
-                    data = parser.parse_topics_list(data_raw)
-                    for item in data:
-                        item.page_index = page_index
-                        topics_listing.append(item)
-        return topics_listing
+                pages.extend((page_index, data_raw) for data_raw in page.values())
+
+        pages_topics = self._map_parse(parser.parse_topics_list, [data_raw for _, data_raw in pages])
+        for (page_index, _), data in zip(pages, pages_topics):
+            for item in data:
+                item.page_index = page_index
+                topics_listing.append(item)
+        # topic bumped during crawl is listed on two pages
+        return freshest_topics(topics_listing)
 
     def get_topics_content(self, urls):
         self._set_event_loop()
 
-        topics_listing = []
         parser = OverclockersParser(domain=self.DOMAIN)
 
         results_raw = self.loop.run_until_complete(self._fire_requests(urls))
 
+        pages = []
         for page in results_raw:
             if isinstance(page, Exception):
                 logging.error(page)
             else:
-                for url, data_raw in page.items():
-                    data = parser.parse_topic_content(data_raw, url)
-                    topics_listing.append(data)
-        return topics_listing
+                pages.extend(page.items())
+
+        return list(self._map_parse(
+            parser.parse_topic_content, [data_raw for _, data_raw in pages], [url for url, _ in pages]
+        ))
+
+    async def _get_indexed_data(self, ctx: _PipelineContext, page_index: int, url: str, req_params: dict):
+        try:
+            data = await self._get_data(url, req_params, ctx.session, ctx.semaphore)
+        except Exception as err:  # pylint: disable=broad-except
+            data = err
+        return page_index, data
+
+    async def _handle_page_error(self, ctx: _PipelineContext, err: Exception):
+        if self.raise_exceptions:
+            logging.error(err)
+        else:
+            await ctx.results_queue.put(err)
+
+    async def _iter_listing_pages(self, ctx: _PipelineContext, urls: List[tuple], ordered: bool):
+        """
+        Yield (page_index, page) pairs. Pages are requested concurrently and yielded as completed
+        unless ordered is set - then pages are requested one by one, so caller can stop paging.
+        """
+        if ordered:
+            for page_index, (url, req_params) in enumerate(urls):
+                yield await self._get_indexed_data(ctx, page_index, url, req_params)
+            return
+
+        tasks = [
+            asyncio.ensure_future(self._get_indexed_data(ctx, page_index, url, req_params))
+            for page_index, (url, req_params) in enumerate(urls)
+        ]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _track_latest_post(self, topics: List[TopicMetaInfo]):
+        for topic in topics:
+            if not self.latest_post_timestamp or topic.last_post_timestamp > self.latest_post_timestamp:
+                self.latest_post_timestamp = topic.last_post_timestamp
+
+    def _drop_seen_topics(self, ctx: _PipelineContext, topics: List[TopicMetaInfo]) -> List[TopicMetaInfo]:
+        """
+        Drop topics already pushed to topics queue, unless they have newer posts now
+        (topic is bumped during crawl), so topic pages are not fetched twice.
+        """
+        fresh_topics = []
+        for topic in freshest_topics(topics):
+            seen_timestamp = ctx.seen_topics.get(topic.topic_id)
+            if seen_timestamp is not None and topic.last_post_timestamp <= seen_timestamp:
+                self.duplicate_topics += 1
+                continue
+            ctx.seen_topics[topic.topic_id] = topic.last_post_timestamp
+            fresh_topics.append(topic)
+        return fresh_topics
+
+    async def _prepare_topics(
+            self, ctx: _PipelineContext, topics: List[TopicMetaInfo], exclude
+    ) -> List[TopicMetaInfo]:
+        """
+        Drop excluded topics and set stored content fingerprints to the rest.
+        """
+        # both usually hit the database, so keep them off the event loop
+        loop = asyncio.get_event_loop()
+        if exclude and topics:
+            excluded = await loop.run_in_executor(None, exclude, [t.topic_id for t in topics])
+            topics_count = len(topics)
+            topics = [t for t in topics if t.topic_id not in excluded]
+            self.excluded_topics += topics_count - len(topics)
+        if ctx.fingerprints and topics:
+            stored_hashes = await loop.run_in_executor(None, ctx.fingerprints, [t.topic_id for t in topics])
+            for topic in topics:
+                topic.content_hash = stored_hashes.get(topic.topic_id)
+        return topics
+
+    async def _listing_stage(self, ctx: _PipelineContext, urls: List[tuple], exclude, since: Optional[datetime]):
+        """
+        Fetch listing pages and push parsed topics (except excluded ones) to topics queue
+        as soon as each page is ready. If since is set, stop paging once a whole page
+        is older than since.
+        """
+        pages = self._iter_listing_pages(ctx, urls, ordered=since is not None)
+        try:
+            async for page_index, page in pages:
+                if isinstance(page, Exception):
+                    self.listing_errors += 1
+                    await self._handle_page_error(ctx, page)
+                    if since:
+                        # there is no way to tell whether next pages are still fresh
+                        break
+                    continue
+                if not page:
+                    continue
+
+                stale_page = False
+                for data_raw in page.values():
+                    topics = await self._parse(ctx.parser.parse_topics_list, data_raw)
+                    self._track_latest_post(topics)
+                    if since and all(topic.last_post_timestamp <= since for topic in topics):
+                        stale_page = True
+                        break
+                    topics = await self._prepare_topics(ctx, self._drop_seen_topics(ctx, topics), exclude)
+                    for topic in topics:
+                        topic.page_index = page_index
+                        await ctx.topics_queue.put(topic)
+                if stale_page:
+                    break
+        finally:
+            await pages.aclose()
+
+    async def _content_stage(self, ctx: _PipelineContext):
+        """
+        Fetch topic pages taken from topics queue, merge parsed content into topic
+        meta info and push it to results queue. Pages not modified since previous
+        crawl (same fingerprint as stored one or not modified response) are not parsed.
+        """
+        while True:
+            topic = await ctx.topics_queue.get()
+            if topic is _STAGE_DONE:
+                break
+
+            try:
+                response = await self._get_response(topic.url, {}, ctx.session, ctx.semaphore)
+            except Exception as err:  # pylint: disable=broad-except
+                self.content_errors += 1
+                await self._handle_page_error(ctx, err)
+                continue
+            if not response or not response.data:
+                continue
+
+            content_hash = content_fingerprint(response.data)
+            if ctx.fingerprints:
+                # stored fingerprint is more reliable than cache since it is missing for new topics
+                content_changed = content_hash != topic.content_hash
+            else:
+                content_changed = not response.not_modified
+
+            if content_changed:
+                topic_data = await self._parse(ctx.parser.parse_topic_content, response.data, str(response.url))
+                topic.topic_content = topic_data.content
+                topic.closed = topic_data.closed
+                topic.content_hash = content_hash
+            else:
+                # page is the same as on previous crawl, so there is nothing to parse
+                topic.content_changed = False
+            await ctx.results_queue.put(topic)
+
+    async def stream_topics(
+            self, page_num_start: int, page_num_end: int, exclude: Optional[Callable[[List[int]], Collection]] = None,
+            since: Optional[datetime] = None, fingerprints: Optional[Callable[[List[int]], Dict[int, str]]] = None
+    ) -> AsyncGenerator[TopicMetaInfo, None]:
+        """
+        Crawl listing pages and topic pages as a pipeline: listing fetch -> parse -> exclusion
+        filter -> content fetch. Each topic flows to the next stage as soon as it is ready and
+        is yielded with its content. Stages are connected with bounded queues.
+        Exclude callable receives topic ID's of a listing page and return ID's to skip.
+        Since (timezone aware) enables incremental mode: listing pages are requested in order
+        and paging stops on the first page where every topic last post is not newer than since.
+        Fingerprints callable receives topic ID's of a listing page and return stored content
+        fingerprints of these topics; topics with the same content are yielded with
+        content_changed unset and without parsed content.
+        """
+        self.latest_post_timestamp = None
+        self.listing_errors = 0
+        self.content_errors = 0
+        self.excluded_topics = 0
+        self.duplicate_topics = 0
+
+        ctx = _PipelineContext(
+            session=await self._get_session(),
+            semaphore=self._create_semaphore(),
+            parser=OverclockersParser(domain=self.DOMAIN),
+            topics_queue=asyncio.Queue(maxsize=self.queue_size),
+            results_queue=asyncio.Queue(maxsize=self.queue_size),
+            fingerprints=fingerprints
+        )
+
+        urls = self._generate_listing_urls(page_num_start, page_num_end)
+        workers = [asyncio.ensure_future(self._content_stage(ctx)) for _ in range(self.coros_limit)]
+        producer = asyncio.ensure_future(self._listing_stage(ctx, urls, exclude, since))
+
+        async def supervise():
+            try:
+                await producer
+                for _ in workers:
+                    await ctx.topics_queue.put(_STAGE_DONE)
+                await asyncio.gather(*workers)
+            except Exception as err:  # pylint: disable=broad-except
+                # unexpected stage failure (e.g. parser error) is raised to the caller
+                await ctx.results_queue.put(err)
+            else:
+                await ctx.results_queue.put(_STAGE_DONE)
+
+        supervisor = asyncio.ensure_future(supervise())
+
+        try:
+            while True:
+                topic = await ctx.results_queue.get()
+                if topic is _STAGE_DONE:
+                    break
+                if isinstance(topic, Exception):
+                    raise topic
+                yield topic
+        finally:
+            for task in (supervisor, producer, *workers):
+                task.cancel()
+            await asyncio.gather(supervisor, producer, *workers, return_exceptions=True)
+
+    @staticmethod
+    async def _consume(consumer: Callable, chunk: List[TopicMetaInfo]):
+        if asyncio.iscoroutinefunction(consumer):
+            return await consumer(chunk)
+        # blocking consumer (usually a database write) runs in executor while fetching goes on
+        return await asyncio.get_event_loop().run_in_executor(None, consumer, chunk)
+
+    async def _consume_in_chunks(self, topics: AsyncGenerator, consumer: Callable, chunk_size: int) -> list:
+        results, chunk = [], []
+
+        try:
+            async for topic in topics:
+                chunk.append(topic)
+                if len(chunk) >= chunk_size:
+                    results.append(await self._consume(consumer, chunk))
+                    chunk = []
+        finally:
+            # on consumer failure pipeline tasks are blocked on full queues, so they are cancelled
+            await topics.aclose()
+
+        if chunk:
+            results.append(await self._consume(consumer, chunk))
+        return results
+
+    def crawl(  # pylint: disable=too-many-arguments
+            self, page_num_start: int, page_num_end: int, consumer: Callable[[List[TopicMetaInfo]], object],
+            exclude: Optional[Callable[[List[int]], Collection]] = None, since: Optional[datetime] = None,
+            fingerprints: Optional[Callable[[List[int]], Dict[int, str]]] = None, chunk_size: int = 50
+    ) -> list:
+        """
+        Run streaming pipeline (see stream_topics) and pass topics to consumer in chunks
+        of chunk_size as they arrive. Consumer could be a coroutine function, then it is
+        awaited in scrapper event loop. Return list of consumer results.
+        """
+        self._set_event_loop()
+        topics = self.stream_topics(
+            page_num_start, page_num_end, exclude=exclude, since=since, fingerprints=fingerprints
+        )
+        return self.loop.run_until_complete(self._consume_in_chunks(topics, consumer, chunk_size))
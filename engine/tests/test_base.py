@@ -1,10 +1,10 @@
 # pylint: disable=no-self-use
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pytest
 
-from scrapper.engine.base import ScrapperMixin
+from scrapper.engine.base import ScrapperMixin, freshest_topics
 
 
 class TestScrapperMixin:
@@ -29,16 +29,31 @@ class TestScrapperMixin:
         assert headers == {'Host': 'other_host', 'Referer': 'other_domain'}
 
 
+class TestFreshestTopics:
+
+    def test_freshest_topics(self, create_topic_meta_info):
+        first = create_topic_meta_info(url='./viewtopic.php?f=26&t=1')
+        second = create_topic_meta_info(url='./viewtopic.php?f=26&t=2')
+        # topic is bumped, so it is listed on the next page again with a newer post
+        bumped = create_topic_meta_info(url='./viewtopic.php?f=26&t=1')
+        bumped.last_post_timestamp += timedelta(minutes=1)
+        stale = create_topic_meta_info(url='./viewtopic.php?f=26&t=2')
+        stale.last_post_timestamp -= timedelta(minutes=1)
+
+        assert freshest_topics([first, second, bumped, stale]) == [bumped, second]
+
+    def test_freshest_topics_empty(self):
+        assert not freshest_topics([])
+
+
 class TestTopicMetaInfo:
 
-    def test_process_ok(self, create_topic_meta_info):
+    def test_from_listing(self, create_topic_meta_info):
         topic = create_topic_meta_info()
-        topic.process()
 
         assert topic.topic_id == 1000
         assert topic.title == 'Title'
         assert topic.closed is False
-        assert topic.processed is True
         assert topic.location == 'киев'
         assert isinstance(topic.views_count, int)
         assert isinstance(topic.posts_count, int)
@@ -46,80 +61,58 @@ class TestTopicMetaInfo:
 
     def test_location_single_length(self, create_topic_meta_info):
         topic = create_topic_meta_info(title='[Днипро] GeForce for mining!')
-        topic.process()
 
-        assert topic.processed is True
         assert topic.location == 'днипро'
 
     def test_location_no_city(self, create_topic_meta_info):
         topic = create_topic_meta_info(title='[Украина] GeForce for mining!')
-        topic.process()
 
-        assert topic.processed is True
         assert topic.location is None
 
     def test_location_city_and_district_comma_separated(self, create_topic_meta_info):
         topic = create_topic_meta_info(title='[Покровск, Донецкая область] GeForce for mining!')
-        topic.process()
 
-        assert topic.processed is True
         assert topic.location == 'покровск'
 
     def test_location_district_and_city_comma_separated(self, create_topic_meta_info):
         topic = create_topic_meta_info(title='[Верховцево, Днепропетровская область] GeForce for mining!')
-        topic.process()
 
-        assert topic.processed is True
         assert topic.location == 'верховцево'
 
     def test_location_cities_slash_separated(self, create_topic_meta_info):
         topic = create_topic_meta_info(title='[Украина, Киев/Бровары] GeForce for mining!')
-        topic.process()
 
-        assert topic.processed is True
         assert topic.location == 'киев'
 
     def test_location_cities_using_and_separation(self, create_topic_meta_info):
         topic = create_topic_meta_info(title='[Украина, Одесса и Стамбул] GeForce for mining!')
-        topic.process()
 
-        assert topic.processed is True
         assert topic.location == 'одесса'
 
     def test_location_city_name_with_hyphen(self, create_topic_meta_info):
         topic = create_topic_meta_info(title='[Украина, Ивано-Франковск] GeForce for mining!')
-        topic.process()
 
-        assert topic.processed is True
         assert topic.location == 'ивано-франковск'
 
     def test_location_separated_by_multiple_commas(self, create_topic_meta_info):
         topic = create_topic_meta_info(title='[Украина, рівне, львів] GeForce for mining!')
-        topic.process()
 
-        assert topic.processed is True
         assert topic.location == 'ровно'
 
     def test_no_country_and_city_with_hyphen(self, create_topic_meta_info):
         topic = create_topic_meta_info(title='[Івано - Франківськ] GeForce for mining!')
-        topic.process()
 
-        assert topic.processed is True
         assert topic.location == 'ивано-франковск'
 
-    def test_to_json_without_process_first(self, create_topic_meta_info):
+    def test_no_instance_dict(self, create_topic_meta_info):
         topic = create_topic_meta_info()
 
-        with pytest.raises(AttributeError) as err:
-            topic.to_json()
-
-        assert str(err.value) == 'Values was not processed. Call process method first.'
+        assert not hasattr(topic, '__dict__')
+        with pytest.raises(AttributeError):
+            topic.some_attribute = 'value'
 
     def test_to_json(self, create_topic_meta_info):
         topic = create_topic_meta_info()
-        topic.process()
-
-        assert topic.processed is True
 
         data = topic.to_json()
 
@@ -142,9 +135,6 @@ class TestTopicMetaInfo:
     def test_to_json_on_closed_topic(self, create_topic_meta_info):
         topic = create_topic_meta_info()
         topic.closed = True
-        topic.process()
-
-        assert topic.processed is True
 
         data = topic.to_json()
 
@@ -158,6 +148,27 @@ class TestTopicMetaInfo:
             'views_count': 100
         }
 
+    def test_to_json_on_not_modified_topic(self, create_topic_meta_info):
+        topic = create_topic_meta_info()
+        topic.content_changed = False
+
+        data = topic.to_json()
+        updated_field = data.pop('updated')
+
+        assert updated_field <= datetime.now()
+        assert data == {
+            'last_post_timestamp': topic.last_post_timestamp,
+            'posts_count': 100,
+            'topic_id': 1000,
+            'views_count': 100
+        }
+
+    def test_to_json_with_content_hash(self, create_topic_meta_info):
+        topic = create_topic_meta_info()
+        topic.content_hash = 'abc'
+
+        assert topic.to_json()['content_hash'] == 'abc'
+
 
 class TestTopicData:
 
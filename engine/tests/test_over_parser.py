@@ -1,6 +1,9 @@
 # pylint: disable=no-self-use
 
 from datetime import datetime, timezone
+from unittest import mock
+
+from selectolax.parser import HTMLParser
 
 from scrapper.engine.over_parser import OverclockersParser
 
@@ -48,7 +51,6 @@ class TestOverclockersParser:
         assert topic_meta_info.location == 'киев'
         assert topic_meta_info.location_raw == 'Украина, Киев'
         assert topic_meta_info.closed is False
-        assert topic_meta_info.processed is True
         assert topic_meta_info.last_post_timestamp == datetime(2021, 8, 29, 15, 17, 40, tzinfo=timezone.utc)
 
     def test_parse_topic_content(self):
@@ -103,3 +105,89 @@ class TestOverclockersParser:
         assert result.closed is True
         assert result.content.strip() == 'Продается кофеварка со встроенной майнинг-фермой и PS4 china edition\n' \
             '                        Недорого - 19999,9 коинов'
+
+    def test_parse_topic_content_first_post(self):
+        html = '''
+        <div class="action-bar"><i class="icon fa-lock fa-fw"></i></div>
+        <div id="p100" class="post bg1">
+            <div class="inner">
+                <div class="postbody">
+                    <div class="post_content1234567890">
+                        <div class="content">Продается кофеварка</div>
+                    </div>
+                </div>
+            </div>
+        </div>
+        <div id="p101" class="post bg2">
+            <div class="inner">
+                <div class="postbody">
+                    <div class="post_content1234567891"><div class="content">Ап</div></div>
+                </div>
+            </div>
+        </div>'''
+
+        parser = OverclockersParser(domain='https://forum.overclockers.ua')
+        first_post_html = parser.first_post_html(html)
+        result = parser.parse_topic_content(
+            page_content=html,
+            url='https://forum.overclockers.ua/viewtopic.php?f=26&t=1234567890'
+        )
+
+        assert first_post_html is not None
+        assert 'p101' not in first_post_html
+        assert result.closed is True
+        assert result.content == 'Продается кофеварка'
+
+    def test_parse_topic_content_single_post(self):
+        html = '''
+        <div class="action-bar bar-top"><i class="icon fa-lock fa-fw"></i></div>
+        <div id="p100" class="post bg1">
+            <div class="inner">
+                <div class="postbody">
+                    <div class="post_content1234567890"><div class="content">Продается кофеварка</div></div>
+                </div>
+            </div>
+        </div>
+        <hr class="divider" />
+        <div class="action-bar bar-bottom"><i class="icon fa-lock fa-fw"></i></div>
+        <div class="jumpbox">Перейти</div>'''
+
+        parser = OverclockersParser(domain='https://forum.overclockers.ua')
+        with mock.patch('scrapper.engine.over_parser.HTMLParser', wraps=HTMLParser) as html_parser:
+            result = parser.parse_topic_content(
+                page_content=html,
+                url='https://forum.overclockers.ua/viewtopic.php?f=26&t=1234567890'
+            )
+
+        # only the first post is parsed, whole page is not
+        html_parser.assert_called_once_with(parser.first_post_html(html))
+        assert 'jumpbox' not in parser.first_post_html(html)
+        assert result.closed is True
+        assert result.content == 'Продается кофеварка'
+
+    def test_parse_topic_content_fallback(self):
+        # first post content marker precedes second post, but first post selector doesn't match
+        # within truncated page, so whole page is parsed
+        html = '''
+        <div id="p100" class="post bg2">
+            <div class="inner"><div class="postbody"><div><div class="content">Ап</div></div></div></div>
+        </div>
+        <div id="p101" class="post bg1">
+            <div class="inner"><div class="postbody"><div><div class="content">Продается</div></div></div></div>
+        </div>
+        <div class="fa-lock"></div>'''
+
+        parser = OverclockersParser(domain='https://forum.overclockers.ua')
+        result = parser.parse_topic_content(
+            page_content=html,
+            url='https://forum.overclockers.ua/viewtopic.php?f=26&t=1234567890'
+        )
+
+        assert result.closed is True
+        assert result.content == 'Продается'
+
+    def test_first_post_html_without_markers(self):
+        parser = OverclockersParser(domain='https://forum.overclockers.ua')
+
+        assert parser.first_post_html('<div class="content">Продается</div>') is None
+        assert parser.first_post_html('<div id="p100" class="post bg1"></div>') is None
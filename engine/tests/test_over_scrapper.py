@@ -1,17 +1,36 @@
 # pylint: disable=no-self-use
 # pylint: disable=protected-access
 
-from asyncio import ProactorEventLoop
+import asyncio
+from asyncio import ProactorEventLoop, Semaphore
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import count
 from unittest import mock
 import logging
 
 import pytest
 
+from scrapper.engine.over_parser import OverclockersParser
 from scrapper.engine.over_scrapper import OverclockersScrapper
+from scrapper.utils.helpers import content_fingerprint
+from scrapper.utils.limiter import AdaptiveLimiter
+from scrapper.utils.retry import DEFAULT_RETRY_POLICIES
+from scrapper.utils.spelling.checker import init_location_worker, location_cache
 
 LOGGER = logging.getLogger(__name__)
 LOGGER.propagate = True
 
+LAST_POST_TIMESTAMP = datetime(2021, 8, 29, 15, 17, 40, tzinfo=timezone.utc)
+
+
+def cache_location(location: str) -> str:
+    # parser function run in worker process, location is looked up in worker location cache
+    found, _ = location_cache.lookup(location)
+    if not found:
+        location_cache.set(location, location.upper())
+    return location
+
 
 class TestOverclockersScrapper:
 
@@ -39,6 +58,77 @@ class TestOverclockersScrapper:
         assert url_pairs[0][1] == {'f': scrapper.FORUM_ID, 'start': 0}
         assert len(url_pairs) == page_number
 
+    @pytest.mark.asyncio
+    async def test_create_semaphore(self):
+        scrapper = OverclockersScrapper(coros_limit=50, r_timeout=4)
+        limiter = scrapper._create_semaphore()
+
+        assert isinstance(limiter, AdaptiveLimiter)
+        assert limiter is scrapper.limiter
+        assert limiter.stats['limit'] == 10
+        assert limiter.max_limit == 50
+        assert limiter.max_latency == 2
+
+    @pytest.mark.asyncio
+    async def test_create_semaphore_fixed_concurrency(self):
+        scrapper = OverclockersScrapper(coros_limit=5, adaptive_concurrency=False)
+
+        assert isinstance(scrapper._create_semaphore(), Semaphore)
+        assert scrapper.limiter is None
+
+    @pytest.mark.asyncio
+    async def test_get_session(self):
+        scrapper = OverclockersScrapper(coros_limit=20, retry_budget_ratio=0.5, connector_options={'limit': 30})
+        session = await scrapper._get_session()
+
+        assert session.retry_policies == DEFAULT_RETRY_POLICIES
+        assert session.retry_budget.ratio == 0.5
+        assert scrapper.retry_stats is session.retry_stats
+        assert session.connector.limit == 30
+        assert session.connector.limit_per_host == 20
+
+        budget = session.retry_budget
+        # session is reused, but every crawl has its own retry budget and stats
+        assert await scrapper._get_session() is session
+        assert session.retry_budget is not budget
+
+        await scrapper.aclose()
+        assert session.closed is True
+
+        other_session = await scrapper._get_session()
+        assert other_session is not session
+
+        await scrapper.aclose()
+
+    def test_close(self):
+        scrapper = OverclockersScrapper()
+        scrapper._set_event_loop()
+        session = scrapper.loop.run_until_complete(scrapper._get_session())
+
+        scrapper.close()
+
+        assert session.closed is True
+        assert scrapper._session is None
+        scrapper.loop.close()
+
+    def test_get_session_other_event_loop(self):
+        scrapper = OverclockersScrapper()
+        scrapper._set_event_loop()
+        session = scrapper.loop.run_until_complete(scrapper._get_session())
+        other_loop = asyncio.new_event_loop()
+
+        with pytest.raises(RuntimeError):
+            other_loop.run_until_complete(scrapper._get_session())
+        assert session.closed is False
+
+        scrapper.close()
+        other_session = other_loop.run_until_complete(scrapper._get_session())
+
+        assert other_session is not session
+        other_loop.run_until_complete(scrapper.aclose())
+        other_loop.close()
+        scrapper.loop.close()
+
     @pytest.mark.asyncio
     async def test_fire_requests(self):
         expected_result = 'some_result'
@@ -49,6 +139,7 @@ class TestOverclockersScrapper:
         with mock.patch('scrapper.engine.over_scrapper.OverclockersScrapper._get_data') as req:
             req.return_value = expected_result
             result = await scrapper._fire_requests(urls)
+        await scrapper.aclose()
 
         assert req.called is True
         assert len(result) == 1
@@ -61,7 +152,9 @@ class TestOverclockersScrapper:
         with mock.patch('scrapper.engine.over_scrapper.OverclockersScrapper._fire_requests') as req_result:
             with mock.patch('scrapper.engine.over_scrapper.OverclockersParser.parse_topics_list') as parser_result:
                 req_result.return_value = [{'https://example.com/topics-list': ''} for _ in range(page_number)]
-                parser_result.return_value = [mock.Mock()]
+                parser_result.side_effect = [
+                    [mock.Mock(topic_id=topic_id, last_post_timestamp=topic_id)] for topic_id in range(page_number)
+                ]
                 result = scrapper.get_topics(1, page_number)
 
         assert req_result.called is True
@@ -69,6 +162,20 @@ class TestOverclockersScrapper:
         assert len(result) == page_number
         assert result[-1].page_index == page_number - 1
 
+    def test_get_topics_parse_executor(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            scrapper = OverclockersScrapper(parse_executor=executor)
+
+            with mock.patch('scrapper.engine.over_scrapper.OverclockersScrapper._fire_requests') as req_result:
+                with mock.patch('scrapper.engine.over_scrapper.OverclockersParser.parse_topics_list') as parser_result:
+                    req_result.return_value = [
+                        {'https://example.com/topics-list': str(page_index)} for page_index in range(3)
+                    ]
+                    parser_result.side_effect = lambda page_content: [mock.Mock(title=page_content)]
+                    result = scrapper.get_topics(1, 3)
+
+        assert [(topic.title, topic.page_index) for topic in result] == [('0', 0), ('1', 1), ('2', 2)]
+
     @pytest.mark.parametrize('page_number', list(range(1, 10)))
     def test_get_topics_on_exception(self, page_number, caplog):
         caplog.set_level(logging.ERROR)
@@ -136,3 +243,278 @@ class TestOverclockersScrapper:
         result = await scrapper._get_data(url, None, mocked_session, None)
 
         assert result == {'https://example.com/topic': 'some_data'}
+
+    @pytest.mark.asyncio
+    async def test_parse_in_process_pool(self):
+        html = '''
+        <div id="p100" class="post bg1">
+            <div class="inner"><div class="postbody"><div><div class="content">Продается</div></div></div></div>
+        </div>'''
+        url = 'https://forum.overclockers.ua/viewtopic.php?f=26&t=1234567890'
+
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            scrapper = OverclockersScrapper(parse_executor=executor)
+            result = await scrapper._parse(OverclockersParser.parse_topic_content, html, url)
+
+        assert result.topic_id == 1234567890
+        assert result.content == 'Продается'
+
+    @pytest.mark.asyncio
+    async def test_parse_process_executor_location_cache(self):
+        with ProcessPoolExecutor(max_workers=1, initializer=init_location_worker) as executor:
+            scrapper = OverclockersScrapper(parse_executor=executor)
+            result = await scrapper._parse(cache_location, 'киев')
+            results = list(scrapper._map_parse(cache_location, ['харьков', 'киев']))
+
+        assert result == 'киев'
+        assert results == ['харьков', 'киев']
+        # cache of worker process is merged
+        assert location_cache.lookup('киев') == (True, 'КИЕВ')
+        assert location_cache.lookup('харьков') == (True, 'ХАРЬКОВ')
+        assert location_cache.stats['hits'] == 3
+
+
+class TestOverclockersScrapperPipeline:
+
+    @pytest.fixture
+    def pipeline_mocks(self):
+        topic_ids = count()
+
+        # pylint: disable=unused-argument
+        async def fake_get_response(url, req_params, *args):
+            if url == OverclockersScrapper.FORUM_URL:
+                return mock.Mock(url=f'{url}?start={req_params["start"]}', data=str(req_params['start']))
+            return mock.Mock(url=url, data='topic', not_modified=url.endswith('/0'))
+
+        def fake_parse_topics_list(page_content):
+            # every next listing page is one hour older
+            page_timestamp = LAST_POST_TIMESTAMP - timedelta(hours=int(page_content) // 40)
+            topics = []
+            for _ in range(2):
+                topic_id = next(topic_ids)
+                topics.append(mock.Mock(
+                    topic_id=topic_id,
+                    url=f'https://example.com/topic/{topic_id}',
+                    last_post_timestamp=page_timestamp - timedelta(minutes=topic_id % 2)
+                ))
+            return topics
+
+        # requests are mocked, so there is no need in real session
+        with mock.patch(
+                'scrapper.engine.over_scrapper.OverclockersScrapper._get_session', new_callable=mock.AsyncMock
+        ) as _, mock.patch('scrapper.engine.over_scrapper.OverclockersScrapper._get_response') as req:
+            with mock.patch('scrapper.engine.over_scrapper.OverclockersParser.parse_topics_list') as list_parser:
+                with mock.patch('scrapper.engine.over_scrapper.OverclockersParser.parse_topic_content') as parser:
+                    req.side_effect = fake_get_response
+                    list_parser.side_effect = fake_parse_topics_list
+                    parser.return_value = mock.Mock(content='some content', closed=True)
+                    yield req, list_parser, parser
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('page_number', [1, 5])
+    async def test_stream_topics(self, page_number, pipeline_mocks):
+        req, _, parser = pipeline_mocks
+        scrapper = OverclockersScrapper(coros_limit=3)
+
+        result = [topic async for topic in scrapper.stream_topics(1, page_number)]
+
+        assert len(result) == page_number * 2
+        assert req.call_count == page_number * 3
+        # the first topic page is not modified, so it is not parsed
+        assert parser.call_count == page_number * 2 - 1
+        assert all(topic.topic_content == 'some content' for topic in result if topic.topic_id)
+        assert all(topic.closed is True for topic in result if topic.topic_id)
+        assert [topic.content_changed for topic in result if not topic.topic_id] == [False]
+
+    @pytest.mark.asyncio
+    async def test_stream_topics_exclude(self, pipeline_mocks):
+        req, _, _ = pipeline_mocks
+        scrapper = OverclockersScrapper(coros_limit=3)
+
+        result = [topic async for topic in scrapper.stream_topics(1, 2, exclude=lambda ids: {ids[0]})]
+
+        assert len(result) == 2
+        assert req.call_count == 4
+        assert {topic.topic_id for topic in result} == {1, 3}
+        assert scrapper.excluded_topics == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_topics_duplicate_topics(self, pipeline_mocks):
+        req, list_parser, _ = pipeline_mocks
+        # the same topic is listed on every page
+        list_parser.side_effect = lambda page_content: [
+            mock.Mock(topic_id=1, url='https://example.com/topic/1', last_post_timestamp=LAST_POST_TIMESTAMP)
+        ]
+        scrapper = OverclockersScrapper(coros_limit=3)
+
+        result = [topic async for topic in scrapper.stream_topics(1, 3)]
+
+        assert [topic.topic_id for topic in result] == [1]
+        assert req.call_count == 4
+        assert scrapper.duplicate_topics == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_topics_fingerprints(self, pipeline_mocks):
+        _, _, parser = pipeline_mocks
+        topic_hash = content_fingerprint('topic')
+
+        scrapper = OverclockersScrapper(coros_limit=3)
+        result = [
+            topic async for topic in
+            scrapper.stream_topics(1, 2, fingerprints=lambda ids: {ids[0]: 'other', ids[1]: topic_hash})
+        ]
+        result = {topic.topic_id: topic for topic in result}
+
+        assert len(result) == 4
+        assert parser.call_count == 2
+        # stored fingerprint takes precedence over not modified response
+        assert result[0].topic_content == 'some content'
+        assert result[0].content_hash == topic_hash
+        assert result[2].topic_content == 'some content'
+        assert result[2].content_hash == topic_hash
+        assert result[1].content_changed is False
+        assert result[3].content_changed is False
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("pipeline_mocks")
+    async def test_stream_topics_latest_post_timestamp(self):
+        scrapper = OverclockersScrapper(coros_limit=3)
+
+        _ = [topic async for topic in scrapper.stream_topics(1, 3)]
+
+        assert scrapper.latest_post_timestamp == LAST_POST_TIMESTAMP
+        assert scrapper.listing_errors == 0
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('hours_since, expected_listing_requests', [(-1, 1), (0, 1), (1, 2), (2, 3), (100, 5)])
+    async def test_stream_topics_incremental(self, hours_since, expected_listing_requests, pipeline_mocks):
+        req, list_parser, _ = pipeline_mocks
+        since = LAST_POST_TIMESTAMP - timedelta(hours=hours_since)
+
+        scrapper = OverclockersScrapper(coros_limit=3)
+        result = [topic async for topic in scrapper.stream_topics(1, 5, since=since)]
+
+        listing_requests = [call for call in req.call_args_list if call.args[0] == scrapper.FORUM_URL]
+
+        assert len(listing_requests) == expected_listing_requests
+        assert list_parser.call_count == expected_listing_requests
+        # topics of the last (stale) page are skipped unless paging reached the end
+        assert len(result) == 2 * min(max(hours_since, 0), 5)
+        assert [call.args[1]['start'] for call in listing_requests] == \
+            [idx * 40 for idx in range(expected_listing_requests)]
+
+    @pytest.mark.asyncio
+    async def test_stream_topics_incremental_on_exception(self, pipeline_mocks, caplog):
+        caplog.set_level(logging.ERROR)
+        req, _, _ = pipeline_mocks
+        req.side_effect = Exception('Something happened')
+
+        scrapper = OverclockersScrapper(coros_limit=3)
+        result = [topic async for topic in scrapper.stream_topics(1, 5, since=LAST_POST_TIMESTAMP)]
+
+        assert len(result) == 0
+        assert req.call_count == 1
+        assert scrapper.listing_errors == 1
+        assert caplog.messages == ['Something happened']
+
+    @pytest.mark.asyncio
+    async def test_stream_topics_on_exception(self, pipeline_mocks, caplog):
+        caplog.set_level(logging.ERROR)
+        req, _, _ = pipeline_mocks
+        req.side_effect = Exception('Something happened')
+
+        scrapper = OverclockersScrapper(coros_limit=3)
+        result = [topic async for topic in scrapper.stream_topics(1, 2)]
+
+        assert len(result) == 0
+        assert caplog.messages == ['Something happened', 'Something happened']
+
+    @pytest.mark.asyncio
+    async def test_stream_topics_content_errors(self, pipeline_mocks, caplog):
+        caplog.set_level(logging.ERROR)
+        req, _, _ = pipeline_mocks
+        get_response = req.side_effect
+
+        async def fail_topic(url, req_params, *args):
+            if url == 'https://example.com/topic/1':
+                raise Exception('Something happened')
+            return await get_response(url, req_params, *args)
+
+        req.side_effect = fail_topic
+
+        scrapper = OverclockersScrapper(coros_limit=3)
+        result = [topic async for topic in scrapper.stream_topics(1, 2)]
+
+        assert sorted(topic.topic_id for topic in result) == [0, 2, 3]
+        assert scrapper.listing_errors == 0
+        assert scrapper.content_errors == 1
+        assert caplog.messages == ['Something happened']
+
+    @pytest.mark.asyncio
+    async def test_stream_topics_raise_exception(self, pipeline_mocks):
+        req, _, _ = pipeline_mocks
+        req.side_effect = Exception('Something happened')
+
+        scrapper = OverclockersScrapper(coros_limit=3, raise_exceptions=False)
+
+        with pytest.raises(Exception) as err:
+            _ = [topic async for topic in scrapper.stream_topics(1, 2)]
+
+        assert str(err.value) == 'Something happened'
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 50])
+    @pytest.mark.usefixtures("pipeline_mocks")
+    def test_crawl(self, chunk_size):
+        chunks = []
+
+        def consumer(topics):
+            chunks.append(list(topics))
+            return len(topics)
+
+        scrapper = OverclockersScrapper(coros_limit=3)
+        result = scrapper.crawl(1, 3, consumer=consumer, chunk_size=chunk_size)
+
+        assert sum(result) == 6
+        assert len(chunks) == len(result)
+        assert all(len(chunk) <= chunk_size for chunk in chunks)
+
+    @pytest.mark.usefixtures("pipeline_mocks")
+    def test_crawl_consumer_exception(self):
+        async def consumer(topics):
+            raise Exception('Something happened')
+
+        # small queues get full while consumer is failing
+        scrapper = OverclockersScrapper(coros_limit=3, queue_size=1)
+        with pytest.raises(Exception) as err:
+            scrapper.crawl(1, 5, consumer=consumer, chunk_size=1)
+
+        assert str(err.value) == 'Something happened'
+        # no pipeline task is left on scrapper event loop
+        assert not asyncio.all_tasks(scrapper.loop)
+        scrapper.loop.close()
+
+    @pytest.mark.usefixtures("pipeline_mocks")
+    def test_crawl_async_consumer(self):
+        chunks = []
+
+        async def consumer(topics):
+            chunks.append(list(topics))
+            return len(topics)
+
+        scrapper = OverclockersScrapper(coros_limit=3)
+        result = scrapper.crawl(1, 3, consumer=consumer, chunk_size=4)
+
+        assert result == [4, 2]
+        assert len(chunks) == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_topics_parse_executor(self, pipeline_mocks):
+        _, list_parser, parser = pipeline_mocks
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            scrapper = OverclockersScrapper(coros_limit=3, parse_executor=executor)
+            result = [topic async for topic in scrapper.stream_topics(1, 2)]
+
+        assert len(result) == 4
+        assert list_parser.call_count == 2
+        assert parser.call_count == 3
@@ -5,6 +5,15 @@ echo "Starting"
 # make environment variables visible to Cron
 printenv > /etc/environment
 
+# create database indexes before the first run
+/usr/local/bin/python3 /home/app/scrapper/create_indexes.py
+
+# daemon mode keeps scrapper warm between crawls,
+# exec makes it receive SIGTERM on container stop
+if [ "$SCRAPPER_MODE" = "daemon" ]; then
+  exec /usr/local/bin/python3 /home/app/scrapper/daemon.py
+fi
+
 # run python script every 10 minutes
 # redirect output (including errors) to cron.log file
 echo "*/10 * * * * /usr/local/bin/python3 /home/app/scrapper/scrap_to_db.py >> /var/log/cron.log 2>&1" > scheduler.txt
@@ -1,20 +1,27 @@
 import datetime
-from collections import defaultdict
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
+from bson import ObjectId
 from mongoengine import connect
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 import pymongo
 from pymongo.results import BulkWriteResult
 
-from scrapper.engine.base import TopicMetaInfo
+from scrapper.engine.base import TopicMetaInfo, freshest_topics
 from scrapper.settings import settings
-from scrapper.models.overclockers_models import Author, Topic
+from scrapper.utils.metrics import metrics
+from scrapper.models.overclockers_models import Author, CrawlState, Topic
 
 
-class TopicsToDBAdapter:
+class BaseTopicsToDBAdapter:
+
+    DOCUMENTS = (Author, Topic, CrawlState)
 
     def __init__(self):
         self.connection = None
+        # nickname -> (Author record ID, profile link) of authors already written
+        # by this adapter, kept between imports
+        self._authors_cache: Dict[str, Tuple[ObjectId, str]] = {}
 
     def connect(self):
         if not self.connection:
@@ -26,43 +33,148 @@ class TopicsToDBAdapter:
             )
         return self.connection
 
-    @staticmethod
-    def import_topics_to_db(topics: List[TopicMetaInfo]) -> BulkWriteResult:
-        authors_mapping = defaultdict(list)
-        # trick for optimization - allows to create/update author
-        # only one's for a group of topics
+    def ensure_indexes(self) -> List[str]:
+        """
+        Create indexes declared by models (existing ones are left untouched)
+        and return names of collections that were indexed.
+        """
+        self.connect()
+        collections = []
+        for document in self.DOCUMENTS:
+            document.ensure_indexes()
+            collections.append(document._get_collection_name())  # pylint: disable=protected-access
+        return collections
+
+    def close(self):
+        """
+        Release resources of adapter, connection made by connect is left to model managers.
+        """
+
+    def _authors_to_write(self, topics: List[TopicMetaInfo]) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Return nicknames of topics authors and mapping of nickname to profile link for
+        authors that are not cached (or have a new profile link), so have to be written.
+        """
+        authors = {}
         for topic in topics:
-            authors_mapping[topic.author].append(topic)
-
-        topics_bulk = []
-        for author, topic_list in authors_mapping.items():
-            # note that Author record will be created/updated anyway even if
-            # bulk Topic's write operation fail
-            author_record = Author.objects.create_or_update(  # pylint: disable=no-member
-                nickname=author, profile_link=topic_list[0].author_profile_link
+            authors.setdefault(topic.author, topic.author_profile_link)
+
+        authors_to_write = {
+            nickname: profile_link for nickname, profile_link in authors.items()
+            if self._authors_cache.get(nickname, (None, None))[1] != profile_link
+        }
+        return list(authors), authors_to_write
+
+    def _cache_authors(
+            self, nicknames: List[str], authors_to_write: Dict[str, str], authors_ids: Dict[str, ObjectId]
+    ) -> Dict[str, ObjectId]:
+        for nickname, author_id in authors_ids.items():
+            self._authors_cache[nickname] = (author_id, authors_to_write[nickname])
+        return {nickname: self._authors_cache[nickname][0] for nickname in nicknames}
+
+    @staticmethod
+    def _topics_operations(topics: List[TopicMetaInfo], authors_ids: Dict[str, ObjectId]) -> List[pymongo.UpdateOne]:
+        operations = []
+        # a single operation per topic, so bulk write does not update the same record twice
+        for topic in freshest_topics(topics):
+            topic_data = topic.to_json()
+            topic_data['author'] = authors_ids[topic.author]
+            operations.append(
+                pymongo.UpdateOne(
+                    {'topic_id': topic.topic_id},
+                    {
+                        '$set': topic_data,
+                        '$setOnInsert': {
+                            'created': datetime.datetime.now()
+                        }
+                    },
+                    upsert=True
+                )
             )
+        return operations
 
-            for topic in topic_list:
-                topic_data = topic.to_json()
-                topic_data['author'] = author_record.id
-                topics_bulk.append(topic_data)
-
-        field_update_operations = [
-            pymongo.UpdateOne(
-                {'topic_id': topic['topic_id']},
-                {
-                    '$set': topic,
-                    '$setOnInsert': {
-                        'created': datetime.datetime.now()
-                    }
-                },
-                upsert=True
-            ) for topic in topics_bulk
-        ]
-
-        operations = field_update_operations
+
+class TopicsToDBAdapter(BaseTopicsToDBAdapter):
+
+    def _resolve_authors(self, topics: List[TopicMetaInfo]) -> Dict[str, ObjectId]:
+        """
+        Return mapping of author nickname to Author record ID. Only authors that are not
+        cached (or have a new profile link) are written, with a single bulk write.
+        """
+        nicknames, authors_to_write = self._authors_to_write(topics)
+        # note that Author records will be created/updated anyway even if
+        # bulk Topic's write operation fail
+        authors_ids = Author.objects.bulk_create_or_update(authors_to_write)  # pylint: disable=no-member
+        return self._cache_authors(nicknames, authors_to_write, authors_ids)
+
+    @metrics.timed('scrapper_import_seconds')
+    def import_topics_to_db(self, topics: List[TopicMetaInfo]) -> BulkWriteResult:
+        metrics.inc('scrapper_imported_topics_total', len(topics))
+        authors_ids = self._resolve_authors(topics)
+
+        operations = self._topics_operations(topics, authors_ids)
         result = None
         if operations:
             result = Topic._get_collection().bulk_write(operations)  # pylint: disable=protected-access
 
         return result
+
+
+class AsyncTopicsToDBAdapter(BaseTopicsToDBAdapter):
+    """
+    Same as TopicsToDBAdapter, but writes go via Motor, so import could be awaited
+    inside scrapper event loop while topics are being fetched. Connection made by
+    connect method is still used by model managers for reading.
+    """
+
+    def __init__(self, database: Optional[AsyncIOMotorDatabase] = None, max_pool_size: int = 10):
+        super().__init__()
+        self.max_pool_size = max_pool_size
+        self._client = None
+        self._database = database
+
+    @property
+    def database(self) -> AsyncIOMotorDatabase:
+        # client is created on first use to bind it to the running event loop
+        if self._database is None:
+            db_settings = settings.SCRAPPER_DATABASES['default']
+            self._client = AsyncIOMotorClient(
+                host=db_settings.get('host'),
+                port=int(db_settings.get('port')),
+                maxPoolSize=self.max_pool_size
+            )
+            self._database = self._client[db_settings.get('db_name')]
+        return self._database
+
+    def close(self):
+        if self._client:
+            self._client.close()
+            self._client = None
+            self._database = None
+
+    async def _resolve_authors(self, topics: List[TopicMetaInfo]) -> Dict[str, ObjectId]:
+        nicknames, authors_to_write = self._authors_to_write(topics)
+
+        authors_ids = {}
+        if authors_to_write:
+            collection = self.database[Author._get_collection_name()]  # pylint: disable=protected-access
+            await collection.bulk_write(Author.upsert_operations(authors_to_write), ordered=False)
+            records = await collection.find(
+                {'nickname': {'$in': list(authors_to_write)}}, {'nickname': 1}
+            ).to_list(length=None)
+            authors_ids = {record['nickname']: record['_id'] for record in records}
+
+        return self._cache_authors(nicknames, authors_to_write, authors_ids)
+
+    @metrics.timed('scrapper_import_seconds')
+    async def import_topics_to_db(self, topics: List[TopicMetaInfo]) -> BulkWriteResult:
+        metrics.inc('scrapper_imported_topics_total', len(topics))
+        authors_ids = await self._resolve_authors(topics)
+
+        operations = self._topics_operations(topics, authors_ids)
+        result = None
+        if operations:
+            collection = self.database[Topic._get_collection_name()]  # pylint: disable=protected-access
+            result = await collection.bulk_write(operations)
+
+        return result
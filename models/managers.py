@@ -1,5 +1,7 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Collection, Dict, List, Optional, Set
 
+from bson import ObjectId
 from mongoengine.queryset import Q, QuerySet
 
 
@@ -13,20 +15,108 @@ class AuthorQuerySet(QuerySet):
         self(nickname=nickname).update(set__profile_link=profile_link, upsert=True)
         return self.get(nickname=nickname)
 
+    def bulk_create_or_update(self, authors: Dict[str, str]) -> Dict[str, ObjectId]:
+        """
+        Create or update Author records with a single bulk write and return mapping
+        of nickname to record ID. Authors is a mapping of nickname to profile link.
+        """
+        if not authors:
+            return {}
+
+        collection = self._document._get_collection()  # pylint: disable=protected-access
+        collection.bulk_write(self._document.upsert_operations(authors), ordered=False)
+        return {
+            record['nickname']: record['_id']
+            for record in collection.find({'nickname': {'$in': list(authors)}}, {'nickname': 1})
+        }
+
 
 class TopicQuerySet(QuerySet):
 
+    @staticmethod
+    def _excluded_topics_filter(max_posts_count: int, max_views_count: int, time_limit: int) -> Q:
+        date_limit = datetime.utcnow() - timedelta(minutes=time_limit)
+        return (
+            Q(posts_count__gte=max_posts_count) |
+            Q(views_count__gte=max_views_count) |
+            Q(updated__gte=date_limit) |
+            Q(closed=True) |
+            Q(location=None)
+        )
+
     def fetch_excluded_topics(
             self, max_posts_count: int = 15, max_views_count: int = 2000, time_limit: int = 15
     ):
         """
         Return Topic ID's that needs to be excluded (no requests for topic page content scrapping)
         """
-        date_limit = datetime.utcnow() - timedelta(minutes=time_limit)
         return self.filter(
-            Q(posts_count__gte=max_posts_count) |
-            Q(views_count__gte=max_views_count) |
-            Q(updated__gte=date_limit) |
-            Q(closed=True) |
-            Q(location=None)
+            self._excluded_topics_filter(max_posts_count, max_views_count, time_limit)
         ).only('topic_id')
+
+    def fetch_excluded_topic_ids(
+            self, topic_ids: Collection[int], max_posts_count: int = 15, max_views_count: int = 2000,
+            time_limit: int = 15
+    ) -> Set[int]:
+        """
+        Return those of given Topic ID's that needs to be excluded. Unlike fetch_excluded_topics
+        only candidates are looked up (by topic_id index) and only topic_id is projected.
+        """
+        if not topic_ids:
+            return set()
+
+        queryset = self.filter(
+            Q(topic_id__in=list(topic_ids)) &
+            self._excluded_topics_filter(max_posts_count, max_views_count, time_limit)
+        )
+        cursor = self._collection.find(
+            queryset._query, {'topic_id': True, '_id': False}  # pylint: disable=protected-access
+        )
+        return {record['topic_id'] for record in cursor}
+
+    def fetch_content_hashes(self, topic_ids: List[int]) -> Dict[int, str]:
+        """
+        Return fingerprints of stored topic pages content for given Topic ID's.
+        Lookup is covered by (topic_id, content_hash) index, so documents are not fetched.
+        """
+        cursor = self._collection.find(
+            {'topic_id': {'$in': list(topic_ids)}, 'content_hash': {'$ne': None}},
+            {'topic_id': True, 'content_hash': True, '_id': False}
+        )
+        return {record['topic_id']: record['content_hash'] for record in cursor}
+
+
+class CrawlStateQuerySet(QuerySet):
+
+    def get_high_water_mark(self, name: str) -> Optional[datetime]:
+        """
+        Return timestamp of the latest post seen by previous crawl (timezone aware, UTC)
+        or None if there was no crawl yet.
+        """
+        state = self(name=name).only('last_post_timestamp').first()
+        if state and state.last_post_timestamp:
+            return state.last_post_timestamp.replace(tzinfo=timezone.utc)
+        return None
+
+    def update_high_water_mark(self, name: str, timestamp: datetime):
+        """
+        Move high-water mark forward. Older timestamp than stored one is ignored.
+        """
+        self(name=name).update_one(
+            max__last_post_timestamp=timestamp, set__updated=datetime.utcnow(), upsert=True
+        )
+
+    def get_checkpoint(self, name: str) -> Optional[int]:
+        """
+        Return the last listing page number saved by crawl or None if there is no checkpoint.
+        """
+        state = self(name=name).only('last_page').first()
+        if state:
+            return state.last_page
+        return None
+
+    def save_checkpoint(self, name: str, last_page: int):
+        self(name=name).update_one(set__last_page=last_page, set__updated=datetime.utcnow(), upsert=True)
+
+    def clear_checkpoint(self, name: str):
+        self(name=name).delete()
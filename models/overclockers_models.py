@@ -1,18 +1,50 @@
+from typing import Dict, List
+
 from mongoengine import Document, StringField, URLField, IntField, ReferenceField, DateTimeField, BooleanField
+import pymongo
 
-from .managers import AuthorQuerySet, TopicQuerySet
+from .managers import AuthorQuerySet, CrawlStateQuerySet, TopicQuerySet
 
 
 class Author(Document):
     meta = {'queryset_class': AuthorQuerySet, 'collection': 'Authors'}
 
-    nickname = StringField(required=True, max_length=128)
+    nickname = StringField(required=True, max_length=128, unique=True)
     profile_link = URLField(required=True)
 
+    @classmethod
+    def upsert_operations(cls, authors: Dict[str, str]) -> List[pymongo.UpdateOne]:
+        """
+        Return bulk write operations that create or update Author records.
+        Authors is a mapping of nickname to profile link.
+        """
+        operations = []
+        for nickname, profile_link in authors.items():
+            # bulk write goes directly via Pymongo, so validate records first
+            cls(nickname=nickname, profile_link=profile_link).validate()
+            operations.append(
+                pymongo.UpdateOne({'nickname': nickname}, {'$set': {'profile_link': profile_link}}, upsert=True)
+            )
+        return operations
+
 
 class Topic(Document):
 
-    meta = {'queryset_class': TopicQuerySet, 'collection': 'Topics'}
+    meta = {
+        'queryset_class': TopicQuerySet,
+        'collection': 'Topics',
+        'indexes': [
+            # every branch of excluded topics filter needs its own index,
+            # otherwise MongoDB falls back to a collection scan for the whole $or
+            'posts_count',
+            'views_count',
+            'updated',
+            'location',
+            {'fields': ['closed'], 'partialFilterExpression': {'closed': True}},
+            # covers content fingerprints lookup
+            ('topic_id', 'content_hash'),
+        ]
+    }
 
     created = DateTimeField(required=True)
     updated = DateTimeField(required=True)
@@ -26,4 +58,17 @@ class Topic(Document):
     location_raw = StringField(max_length=128)
     location = StringField(required=True, max_length=128)
     topic_content = StringField(required=True)
+    content_hash = StringField(max_length=32)
     closed = BooleanField(required=True, default=False)
+
+
+class CrawlState(Document):
+
+    meta = {'queryset_class': CrawlStateQuerySet, 'collection': 'CrawlStates'}
+
+    name = StringField(required=True, unique=True, max_length=64)
+    last_post_timestamp = DateTimeField(null=True)
+    # checkpoint of crawl that walks listing pages in windows: the last listing
+    # page number of the last completed window
+    last_page = IntField(null=True)
+    updated = DateTimeField()
@@ -1,6 +1,7 @@
 # pylint: disable=unused-argument
 # pylint: disable=redefined-outer-name
 # pylint: disable=too-many-arguments
+# pylint: disable=too-few-public-methods
 
 from unittest import mock
 from pathlib import Path
@@ -9,6 +10,7 @@ from random import randint
 import sys
 
 from mongoengine import connect, disconnect
+from mongoengine.connection import get_db
 from mongomock.helpers import utcnow
 import pytest
 
@@ -51,11 +53,52 @@ def mocked_db_connection():
     disconnect()
 
 
+class AsyncCursor:
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    async def to_list(self, length=None):
+        return list(self.cursor)[:length]
+
+
+class AsyncCollection:
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def bulk_write(self, *args, **kwargs):
+        return self.collection.bulk_write(*args, **kwargs)
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self.collection.find(*args, **kwargs))
+
+
+class AsyncDatabase:
+    """
+    Motor-like wrapper around mongomock database
+    """
+
+    def __init__(self, database):
+        self.database = database
+
+    def __getitem__(self, name):
+        return AsyncCollection(self.database[name])
+
+
+@pytest.fixture(scope='function')
+def mocked_async_database(mocked_db_connection):
+    return AsyncDatabase(get_db())
+
+
 @pytest.fixture
 def create_author():
     def inner(nickname='joedoe', profile_link='https://example.com'):
-        author = Author(nickname='joedoe', profile_link='https://example.com')
-        author.save()
+        # nickname is unique, so the same author is reused between topics
+        author = Author.objects(nickname=nickname).first()  # pylint: disable=no-member
+        if not author:
+            author = Author(nickname=nickname, profile_link=profile_link)
+            author.save()
         return author
     return inner
 
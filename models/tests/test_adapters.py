@@ -3,11 +3,14 @@
 # pylint: disable=protected-access
 # pylint: disable=too-few-public-methods
 
+from datetime import datetime, timedelta
 from random import randint
+from unittest import mock
 
 import pytest
 
-from ..adapters import TopicsToDBAdapter
+from ..adapters import AsyncTopicsToDBAdapter, TopicsToDBAdapter
+from ..managers import AuthorQuerySet
 from ..overclockers_models import Author, Topic
 
 # pylint: disable=unused-argument
@@ -28,7 +31,6 @@ class TestTopicsToDBAdapter:
         topics = []
         for _ in range(10):
             topic = create_topic_meta_info()
-            topic.process()
             topic.topic_id = randint(1000, 1000000)
             topics.append(topic)
 
@@ -42,16 +44,124 @@ class TestTopicsToDBAdapter:
         assert len(topics) == 10
         assert Topic.objects.first().topic_id == topics[0].topic_id
 
-    def test_import_topics_to_db_without_process_called(self, mock_adapter_db_settings, create_topic_meta_info):
+    def test_import_not_changed_topic_updates_counters_only(self, mock_adapter_db_settings, create_topic_meta_info):
         adapter = TopicsToDBAdapter()
         adapter.connect()
 
         topic = create_topic_meta_info()
-        topic.author_profile_link = 'https://forum.example.com/memberlist.php?mode=viewprofile&u=123456'
+        topic.topic_content = 'some content'
+        topic.content_hash = 'abc'
+        adapter.import_topics_to_db([topic])
+        # topic was checked long ago
+        updated = datetime.now() - timedelta(hours=1)
+        Topic.objects(topic_id=topic.topic_id).update_one(set__updated=updated)
 
-        with pytest.raises(AttributeError) as err:
-            _ = adapter.import_topics_to_db([topic])
+        topic = create_topic_meta_info()
+        topic.posts_count = 101
+        topic.content_changed = False
+        result = adapter.import_topics_to_db([topic])
+
+        assert result.modified_count == 1
+
+        entry_from_db = Topic.objects.get(topic_id=topic.topic_id)
+
+        assert entry_from_db.posts_count == 101
+        assert entry_from_db.topic_content == 'some content'
+        assert entry_from_db.content_hash == 'abc'
+        # topic is marked as checked, so it is excluded from the next crawls for a while
+        assert entry_from_db.updated > updated
+        assert Topic.objects.fetch_excluded_topic_ids([topic.topic_id], max_posts_count=1000) == {topic.topic_id}
+
+    def test_import_duplicate_topics(self, mock_adapter_db_settings, create_topic_meta_info):
+        adapter = TopicsToDBAdapter()
+        adapter.connect()
+
+        topic = create_topic_meta_info()
+        bumped = create_topic_meta_info()
+        bumped.posts_count = 101
+
+        operations = adapter._topics_operations([topic, bumped], {'Nickname': None})
+        result = adapter.import_topics_to_db([topic, bumped])
+
+        assert len(operations) == 1
+        assert result.upserted_count == 1
+        assert Topic.objects.count() == 1
+        assert Topic.objects.get(topic_id=topic.topic_id).posts_count == 101
+
+    def test_import_topics_to_db_authors_cache(self, mock_adapter_db_settings, create_topic_meta_info):
+        adapter = TopicsToDBAdapter()
+        adapter.connect()
+
+        topics = []
+        for author in ('joedoe', 'janedoe', 'joedoe'):
+            topic = create_topic_meta_info()
+            topic.author = author
+            topic.topic_id = randint(1000, 1000000)
+            topics.append(topic)
+
+        with mock.patch(
+                'scrapper.models.managers.AuthorQuerySet.bulk_create_or_update',
+                autospec=True, side_effect=AuthorQuerySet.bulk_create_or_update
+        ) as bulk_mock:
+            adapter.import_topics_to_db(topics)
+            adapter.import_topics_to_db(topics)
+
+            profile_link = topics[0].author_profile_link
+            topics[0].author_profile_link = 'https://forum.example.com/memberlist.php?mode=viewprofile&u=1'
+            adapter.import_topics_to_db(topics)
+
+        assert [call.args[1] for call in bulk_mock.call_args_list] == [
+            {'joedoe': profile_link, 'janedoe': profile_link},
+            {},
+            {'joedoe': 'https://forum.example.com/memberlist.php?mode=viewprofile&u=1'}
+        ]
+        assert Author.objects.count() == 2
+        assert {topic.author.nickname for topic in Topic.objects.all()} == {'joedoe', 'janedoe'}
+
+    def test_ensure_indexes(self, mock_adapter_db_settings):
+        adapter = TopicsToDBAdapter()
 
-        assert str(err.value) == 'Values was not processed. Call process method first.'
+        assert adapter.ensure_indexes() == ['Authors', 'Topics', 'CrawlStates']
+
+        authors_indexes = Author._get_collection().index_information()
+        assert authors_indexes['nickname_1']['unique'] is True
+
+        topics_indexes = Topic._get_collection().index_information()
+        assert topics_indexes['closed_1']['partialFilterExpression'] == {'closed': True}
+        assert {'topic_id_1', 'posts_count_1', 'views_count_1', 'updated_1', 'location_1',
+                'topic_id_1_content_hash_1'} <= set(topics_indexes)
+
+
+@pytest.mark.usefixtures("mocked_db_connection")
+class TestAsyncTopicsToDBAdapter:
+
+    @pytest.mark.asyncio
+    async def test_import_topics_to_db(self, mocked_async_database, create_topic_meta_info):
+        adapter = AsyncTopicsToDBAdapter(database=mocked_async_database)
+
+        topics = []
+        for _ in range(10):
+            topic = create_topic_meta_info()
+            topic.topic_id = randint(1000, 1000000)
+            topics.append(topic)
+
+        result = await adapter.import_topics_to_db(topics)
+
+        assert result.upserted_count == 10
         assert Author.objects.count() == 1
-        assert Topic.objects.count() == 0
+        assert Topic.objects.count() == 10
+        assert {topic.author.nickname for topic in Topic.objects.all()} == {'Nickname'}
+
+    @pytest.mark.asyncio
+    async def test_import_topics_to_db_authors_cache(self, mocked_async_database, create_topic_meta_info):
+        adapter = AsyncTopicsToDBAdapter(database=mocked_async_database)
+
+        topic = create_topic_meta_info()
+
+        await adapter.import_topics_to_db([topic])
+        Author.objects.delete()
+        await adapter.import_topics_to_db([topic])
+
+        # cached author is not written again
+        assert Author.objects.count() == 0
+        assert Topic.objects.count() == 1
@@ -0,0 +1,88 @@
+# pylint: disable=no-self-use
+# pylint: disable=no-member
+# pylint: disable=protected-access
+# pylint: disable=redefined-outer-name
+
+from datetime import datetime
+import os
+
+from mongoengine import connect, disconnect
+from mongoengine.queryset import Q
+import pytest
+
+from ..adapters import TopicsToDBAdapter
+from ..managers import TopicQuerySet
+from ..overclockers_models import Author, CrawlState, Topic
+
+# query plans can only be checked against a real server, mongomock has no explain
+MONGO_TEST_HOST = os.environ.get('MONGO_TEST_HOST')
+
+pytestmark = pytest.mark.skipif(
+    not MONGO_TEST_HOST, reason='set MONGO_TEST_HOST to run query plan tests against MongoDB server'
+)
+
+
+def plan_stages(plan: dict):
+    yield plan.get('stage')
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            yield from plan_stages(plan[key])
+    for child in plan.get('inputStages', []):
+        yield from plan_stages(child)
+
+
+def winning_plan_stages(explain: dict) -> set:
+    planner = explain['queryPlanner']
+    return set(plan_stages(planner['winningPlan']))
+
+
+@pytest.fixture
+def indexed_db_connection():
+    connect('overbot_indexes_test', host=MONGO_TEST_HOST, serverSelectionTimeoutMS=2000)
+    for document in TopicsToDBAdapter.DOCUMENTS:
+        document.drop_collection()
+        # drop_collection resets cached collection, so indexes are created again
+        document.ensure_indexes()
+    yield None
+    for document in TopicsToDBAdapter.DOCUMENTS:
+        document.drop_collection()
+    disconnect()
+
+
+@pytest.mark.usefixtures("indexed_db_connection")
+class TestQueryPlans:
+
+    def test_author_lookup_by_nickname(self):
+        explain = Author._get_collection().find({'nickname': {'$in': ['joedoe']}}).explain()
+
+        assert 'COLLSCAN' not in winning_plan_stages(explain)
+
+    def test_fetch_excluded_topics(self):
+        explain = Topic.objects.fetch_excluded_topics().explain()
+
+        assert 'COLLSCAN' not in winning_plan_stages(explain)
+
+    def test_fetch_excluded_topic_ids(self):
+        query = Topic.objects.filter(
+            Q(topic_id__in=[1, 2, 3]) & TopicQuerySet._excluded_topics_filter(15, 2000, 15)
+        )._query
+        explain = Topic._get_collection().find(query, {'topic_id': True, '_id': False}).explain()
+
+        assert 'COLLSCAN' not in winning_plan_stages(explain)
+
+    def test_fetch_content_hashes_is_covered(self):
+        explain = Topic._get_collection().find(
+            {'topic_id': {'$in': [1, 2, 3]}, 'content_hash': {'$ne': None}},
+            {'topic_id': True, 'content_hash': True, '_id': False}
+        ).explain()
+
+        stages = winning_plan_stages(explain)
+        assert 'COLLSCAN' not in stages
+        assert 'FETCH' not in stages
+
+    def test_high_water_mark_lookup(self):
+        CrawlState.objects.update_high_water_mark('listing', datetime.utcnow())
+
+        explain = CrawlState.objects(name='listing').explain()
+
+        assert 'COLLSCAN' not in winning_plan_stages(explain)
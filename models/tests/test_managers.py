@@ -3,13 +3,13 @@
 # pylint: disable=protected-access
 # pylint: disable=too-few-public-methods
 
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 
 from mongoengine.errors import ValidationError
 from mongomock.helpers import utcnow
 import pytest
 
-from scrapper.models.overclockers_models import Author, Topic
+from scrapper.models.overclockers_models import Author, CrawlState, Topic
 
 
 @pytest.mark.usefixtures("mocked_db_connection")
@@ -45,6 +45,31 @@ class TestAuthorManager:
             nickname=author.nickname, profile_link=author.profile_link
         ).id == author.id
 
+    def test_bulk_create_or_update(self, create_author):
+        author = create_author()
+
+        authors_ids = Author.objects.bulk_create_or_update({
+            author.nickname: 'https://example.com/new',
+            'janedoe': 'https://example.com/janedoe'
+        })
+
+        assert Author.objects.count() == 2
+        assert authors_ids[author.nickname] == author.id
+        assert authors_ids['janedoe'] == Author.objects.get(nickname='janedoe').id
+        assert Author.objects.get(nickname=author.nickname).profile_link == 'https://example.com/new'
+
+    def test_bulk_create_or_update_no_authors(self):
+        assert Author.objects.bulk_create_or_update({}) == {}
+
+    def test_bulk_create_or_update_with_broken_link(self):
+        with pytest.raises(ValidationError):
+            Author.objects.bulk_create_or_update({
+                'janedoe': 'https://example.com/janedoe',
+                'joedoe': 'example.com'
+            })
+
+        assert Author.objects.count() == 0
+
 
 @pytest.mark.usefixtures("mocked_db_connection")
 class TestTopicManager:
@@ -110,3 +135,82 @@ class TestTopicManager:
         topic.save()
 
         assert Topic.objects.fetch_excluded_topics().count() == 0, 'There is no reason to exclude topic'
+
+    def test_fetch_excluded_topic_ids(self, create_topic):
+        past_timestamp = utcnow() - timedelta(minutes=15)
+
+        create_topic(topic_id=1, updated=past_timestamp)
+        create_topic(topic_id=2, updated=past_timestamp, posts_count=15)
+        create_topic(topic_id=3, updated=utcnow())
+        create_topic(topic_id=4, updated=past_timestamp, views_count=2000)
+
+        excluded = Topic.objects.fetch_excluded_topic_ids([1, 2, 3, 5])
+
+        assert isinstance(excluded, set)
+        assert excluded == {2, 3}, 'Only candidates that need to be excluded should be returned'
+        assert Topic.objects.fetch_excluded_topic_ids([1, 5]) == set()
+        assert Topic.objects.fetch_excluded_topic_ids([]) == set()
+
+    def test_fetch_content_hashes(self, create_topic):
+        topic = create_topic(topic_id=1)
+        topic.content_hash = 'abc'
+        topic.save()
+        create_topic(topic_id=2)
+
+        assert Topic.objects.fetch_content_hashes([1, 2, 3]) == {1: 'abc'}
+        assert Topic.objects.fetch_content_hashes([2, 3]) == {}
+
+
+@pytest.mark.usefixtures("mocked_db_connection")
+class TestCrawlStateManager:
+
+    def test_get_high_water_mark_no_state(self):
+        assert CrawlState.objects.get_high_water_mark('listing') is None
+
+    def test_update_high_water_mark(self):
+        timestamp = datetime(2021, 8, 29, 15, 17, 40, tzinfo=timezone.utc)
+
+        CrawlState.objects.update_high_water_mark('listing', timestamp)
+
+        assert CrawlState.objects.count() == 1
+        assert CrawlState.objects.get_high_water_mark('listing') == timestamp
+        assert CrawlState.objects.get_high_water_mark('other') is None
+
+    def test_update_high_water_mark_only_moves_forward(self):
+        timestamp = datetime(2021, 8, 29, 15, 17, 40, tzinfo=timezone.utc)
+
+        CrawlState.objects.update_high_water_mark('listing', timestamp)
+        CrawlState.objects.update_high_water_mark('listing', timestamp - timedelta(hours=1))
+
+        assert CrawlState.objects.get_high_water_mark('listing') == timestamp
+
+        CrawlState.objects.update_high_water_mark('listing', timestamp + timedelta(hours=1))
+
+        assert CrawlState.objects.count() == 1
+        assert CrawlState.objects.get_high_water_mark('listing') == timestamp + timedelta(hours=1)
+
+    def test_get_checkpoint_no_state(self):
+        assert CrawlState.objects.get_checkpoint('backfill') is None
+
+    def test_save_checkpoint(self):
+        CrawlState.objects.save_checkpoint('backfill', 20)
+        CrawlState.objects.save_checkpoint('backfill', 40)
+
+        assert CrawlState.objects.count() == 1
+        assert CrawlState.objects.get_checkpoint('backfill') == 40
+        assert CrawlState.objects.get_checkpoint('other') is None
+
+    def test_checkpoint_keeps_high_water_mark(self):
+        timestamp = datetime(2021, 8, 29, 15, 17, 40, tzinfo=timezone.utc)
+
+        CrawlState.objects.update_high_water_mark('listing', timestamp)
+        CrawlState.objects.save_checkpoint('backfill', 20)
+
+        assert CrawlState.objects.get_high_water_mark('listing') == timestamp
+        assert CrawlState.objects.get_checkpoint('backfill') == 20
+
+    def test_clear_checkpoint(self):
+        CrawlState.objects.save_checkpoint('backfill', 20)
+        CrawlState.objects.clear_checkpoint('backfill')
+
+        assert CrawlState.objects.get_checkpoint('backfill') is None
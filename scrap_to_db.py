@@ -1,32 +1,209 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from typing import Callable, Optional
+
 from scrapper.engine.over_scrapper import OverclockersScrapper
-from scrapper.models.adapters import Topic, TopicsToDBAdapter
+from scrapper.models.adapters import AsyncTopicsToDBAdapter, BaseTopicsToDBAdapter, Topic
+from scrapper.models.overclockers_models import CrawlState
+from scrapper.settings import settings
+from scrapper.utils.cache import ResponseCache
+from scrapper.utils.metrics import create_sinks, metrics
+from scrapper.utils.spelling.checker import init_location_worker, location_cache, preload_location_resources
+
+# name of CrawlState record that keeps listing high-water mark
+LISTING_STATE = 'listing'
+# name of CrawlState record that keeps backfill checkpoint
+BACKFILL_STATE = 'backfill'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Scrap forum topics to database')
+    parser.add_argument('--start', type=int, default=1, help='first listing page number')
+    parser.add_argument('--end', type=int, default=10, help='last listing page number')
+    parser.add_argument(
+        '--full', action='store_true',
+        help='fetch the whole page range instead of stopping on pages older than the previous run'
+    )
+    return parser.parse_args()
+
+
+def create_response_cache():
+    cache_settings = settings.RESPONSE_CACHE
+    if not cache_settings.get('path'):
+        return None
+    return ResponseCache(cache_settings['path'], max_size=cache_settings['max_size'])
+
+
+def load_location_cache():
+    cache_settings = settings.LOCATION_CACHE
+    location_cache.max_size = cache_settings['max_size']
+    if cache_settings.get('path'):
+        location_cache.load(cache_settings['path'])
+    return cache_settings.get('path')
+
+
+class Crawler:
+    """
+    Scrapper, database adapter and caches wired together. Single instance could run
+    any number of crawls, keeping connections and caches warm between them.
+    Scrapper factory and adapter could be replaced, e.g. to crawl forum simulator.
+    """
+
+    def __init__(
+            self, scrapper_factory: Callable[..., OverclockersScrapper] = OverclockersScrapper,
+            adapter: Optional[BaseTopicsToDBAdapter] = None
+    ):
+        self.response_cache = create_response_cache()
+        self.location_cache_path = load_location_cache()
+        self.metrics_sinks = create_sinks(**settings.METRICS)
+        # listing pages (first, last) of the window backfill stopped on, None if it was not stopped
+        self.backfill_stopped_window = None
+        metrics.enabled = bool(self.metrics_sinks)
+        # pages are parsed in worker processes, so parsing (location validation
+        # included) is spread over cores and overlaps with fetching
+        self.parse_executor = None
+        if settings.PARSE_WORKERS:
+            # location resources are loaded before workers are forked, so they are not
+            # loaded by every worker again; workers start with warm location cache and
+            # pass their cache updates back, so it is saved and reported as a whole
+            preload_location_resources()
+            self.parse_executor = ProcessPoolExecutor(
+                max_workers=settings.PARSE_WORKERS, initializer=init_location_worker,
+                initargs=(self.location_cache_path, location_cache.max_size)
+            )
+        self.scrapper = scrapper_factory(cache=self.response_cache, parse_executor=self.parse_executor)
+
+        # writes go via Motor inside scrapper event loop,
+        # connection is used by managers for reading
+        self.adapter = adapter if adapter else AsyncTopicsToDBAdapter()
+        self.adapter.connect()
+        # Motor writes bypass mongoengine, so indexes are not created on first use
+        self.adapter.ensure_indexes()
+
+    def _crawl_pages(
+            self, start: int, end: int, since=None, consumer: Optional[Callable] = None, chunk_size: int = 50
+    ) -> list:
+        # topics flow from listing pages to topic pages and then to database
+        # in chunks, as soon as they are ready
+        return self.scrapper.crawl(
+            start, end,
+            consumer=consumer or self.adapter.import_topics_to_db,
+            # excluding some topics to avoid firing redundant requests
+            exclude=Topic.objects.fetch_excluded_topic_ids,  # pylint: disable=no-member
+            since=since,
+            # unchanged topics are neither parsed nor rewritten
+            fingerprints=Topic.objects.fetch_content_hashes,  # pylint: disable=no-member
+            chunk_size=chunk_size
+        )
+
+    def crawl(self, start: int, end: int, full: bool = False) -> list:
+        """
+        Crawl listing pages from start to end, write topics to database and return bulk write results.
+        """
+        # incremental mode: stop paging once listing page is older than previous run
+        high_water_mark = None
+        if not full:
+            high_water_mark = CrawlState.objects.get_high_water_mark(LISTING_STATE)  # pylint: disable=no-member
+
+        results = self._crawl_pages(start, end, since=high_water_mark)
+
+        # do not move high-water mark if some listing or topic pages are missed,
+        # otherwise the next incremental crawl stops before their listing pages
+        if self.scrapper.latest_post_timestamp and not self.scrapper.listing_errors \
+                and not self.scrapper.content_errors:
+            CrawlState.objects.update_high_water_mark(  # pylint: disable=no-member
+                LISTING_STATE, self.scrapper.latest_post_timestamp
+            )
+
+        if self.location_cache_path:
+            location_cache.save(self.location_cache_path)
+        self.export_metrics()
+
+        return [result for result in results if result]
+
+    def backfill(self, start: int, end: int, window: int = 20, chunk_size: int = 50) -> list:
+        """
+        Crawl listing pages from start to end in windows of window pages and return bulk write
+        results. Checkpoint (the last page of window) is saved after every completed window, so
+        crawl resumes from the next window after restart. Crawl stops on the window with failed
+        listing or topic pages (see backfill_stopped_window) to retry it on resume. Resume is
+        window-granular: topics already written by interrupted window are crawled again, their
+        writes are idempotent and recently written ones are excluded from topic pages fetching.
+        """
+        self.backfill_stopped_window = None
+        last_page = CrawlState.objects.get_checkpoint(BACKFILL_STATE)  # pylint: disable=no-member
+        if last_page is not None and last_page >= start:
+            logging.info('Resuming backfill after page %s', last_page)
+            start = last_page + 1
+
+        results = []
+        for window_start in range(start, end + 1, window):
+            window_end = min(window_start + window - 1, end)
+            results.extend(self._crawl_pages(window_start, window_end, chunk_size=chunk_size))
+            if self.location_cache_path:
+                location_cache.save(self.location_cache_path)
+            self.export_metrics()
+            if self.scrapper.listing_errors or self.scrapper.content_errors:
+                logging.error('Backfill stopped: %s listing pages and %s topic pages of %s-%s failed',
+                              self.scrapper.listing_errors, self.scrapper.content_errors, window_start, window_end)
+                self.backfill_stopped_window = (window_start, window_end)
+                break
+
+            CrawlState.objects.save_checkpoint(BACKFILL_STATE, window_end)  # pylint: disable=no-member
+            logging.info('Backfill checkpoint: page %s', window_end)
+
+        return [result for result in results if result]
+
+    def export_metrics(self):
+        """
+        Write metrics collected since process start to every sink.
+        """
+        for sink in self.metrics_sinks:
+            sink.write(metrics)
+
+    def print_report(self, results: list):
+        if results:
+            modified_records = sum(result.modified_count for result in results)
+            upserted_records = sum(result.upserted_count for result in results)
+            inserted_records = sum(result.inserted_count for result in results)
+
+            print(f'Excluded: {self.scrapper.excluded_topics}\nDuplicates: {self.scrapper.duplicate_topics}\n'
+                  f'Modified: {modified_records}\n'
+                  f'Upserted: {upserted_records}\nInserted: {inserted_records}')
+        else:
+            print('No updates')
+
+        if self.response_cache:
+            print(f'Response cache: {self.response_cache.stats}')
+        print(f'Location cache: {location_cache.stats}')
+        if self.scrapper.limiter:
+            print(f'Concurrency: {self.scrapper.limiter.stats}')
+        if self.scrapper.retry_stats:
+            print(f'Requests: {self.scrapper.retry_stats.stats}')
+
+    def close(self):
+        # Motor client is bound to scrapper event loop, so it is closed before the loop
+        self.adapter.close()
+        if self.scrapper.loop:
+            self.scrapper.close()
+            self.scrapper.loop.close()
+        if self.parse_executor:
+            self.parse_executor.shutdown()
+
+
+def main():
+    args = parse_args()
+
+    crawler = Crawler()
+    try:
+        results = crawler.crawl(args.start, args.end, full=args.full)
+    finally:
+        # process pool, Motor client and event loop are released even if crawl failed
+        crawler.close()
+
+    crawler.print_report(results)
 
 
 if __name__ == '__main__':
-    scrapper = OverclockersScrapper()
-    topics = scrapper.get_topics(1, 10)
-
-    adapter = TopicsToDBAdapter()
-    adapter.connect()
-
-    # excluding some topics to avoid firing redundant requests
-    topics_to_exclude = [topic.topic_id for topic in Topic.objects.fetch_excluded_topics()]  # pylint: disable=no-member
-    topics = list(filter(lambda topic: topic.topic_id not in topics_to_exclude, topics))
-    topics_mapping = {t.topic_id: t for t in topics}
-
-    topics_data = scrapper.get_topics_content([(t.url, {}) for t in topics])
-    for topic in topics_data:
-        topic_meta = topics_mapping.get(topic.topic_id)
-        topic_meta.topic_content = topic.content
-        topic_meta.closed = topic.closed
-
-    result = adapter.import_topics_to_db(list(topics_mapping.values()))
-    if result:
-        modified_records = result.modified_count
-        upserted_records = result.upserted_count
-        inserted_records = result.inserted_count
-
-        print(f'Excluded: {len(topics_to_exclude)}\nModified: {modified_records}\nUpserted: {upserted_records}\n'
-              f'Inserted: {inserted_records}')
-    else:
-        print('No updates')
+    main()
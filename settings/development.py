@@ -9,3 +9,35 @@ SCRAPPER_DATABASES = {
         'db_name': os.environ.get('MONGO_DB_NAME', 'overbot')
     }
 }
+
+# on-disk cache for conditional (ETag/Last-Modified) requests,
+# disabled when directory is not set
+RESPONSE_CACHE = {
+    'path': os.environ.get('RESPONSE_CACHE_PATH'),
+    'max_size': int(os.environ.get('RESPONSE_CACHE_MAX_SIZE', 100 * 1024 * 1024))
+}
+
+# memoized location names, snapshot is loaded on start and saved
+# on exit of scrapper, disabled when file path is not set
+LOCATION_CACHE = {
+    'path': os.environ.get('LOCATION_CACHE_PATH'),
+    'max_size': int(os.environ.get('LOCATION_CACHE_MAX_SIZE', 4096))
+}
+
+# daemon mode: seconds between crawls starts and random
+# deviation of interval, so requests do not follow strict pattern
+DAEMON = {
+    'interval': float(os.environ.get('SCRAPPER_INTERVAL', 600)),
+    'jitter': float(os.environ.get('SCRAPPER_JITTER', 30))
+}
+
+# number of worker processes topic pages are parsed in,
+# pages are parsed in scrapper process when it is 0
+PARSE_WORKERS = int(os.environ.get('SCRAPPER_PARSE_WORKERS', 0))
+
+# run metrics (latency histograms and counters), enabled when any sink is set:
+# Prometheus text file and JSON summary are rewritten after every crawl
+METRICS = {
+    'prometheus_path': os.environ.get('METRICS_PROMETHEUS_PATH'),
+    'json_path': os.environ.get('METRICS_JSON_PATH')
+}
@@ -0,0 +1,155 @@
+# pylint: disable=no-self-use
+# pylint: disable=no-member
+# pylint: disable=redefined-outer-name
+# pylint: disable=too-few-public-methods
+# pylint: disable=unused-argument
+
+from unittest import mock
+import sys
+
+from mongoengine import connect, disconnect
+import pytest
+
+from scrapper.engine.over_parser import OverclockersParser
+from scrapper.engine.over_scrapper import OverclockersScrapper
+from scrapper.models.adapters import TopicsToDBAdapter
+from scrapper.models.overclockers_models import CrawlState, Topic
+from scrapper.backfill import main as backfill_main
+from scrapper.scrap_to_db import BACKFILL_STATE, LISTING_STATE, Crawler, main
+
+TOPIC_URLS = ('./viewtopic.php?f=26&t=1', './viewtopic.php?f=26&t=2')
+FAILED_TOPIC_URL = 'https://forum.example.com/viewtopic.php?f=26&t=2'
+
+
+@pytest.fixture
+def mock_crawler_settings(monkeypatch):
+    settings_mock = mock.Mock()
+    settings_mock.RESPONSE_CACHE = {'path': None}
+    settings_mock.LOCATION_CACHE = {'path': None, 'max_size': 100}
+    settings_mock.METRICS = {}
+    settings_mock.PARSE_WORKERS = 0
+
+    monkeypatch.setattr(sys.modules['scrapper.scrap_to_db'], 'settings', settings_mock)
+
+
+@pytest.fixture
+def mocked_db_connection():
+    connect('mongoenginetest', host='mongomock://localhost')
+    yield None
+    disconnect()
+
+
+@pytest.fixture
+def create_crawler(mock_crawler_settings, mocked_db_connection):
+    crawlers = []
+
+    def inner():
+        adapter = TopicsToDBAdapter()
+        # mongomock connection is made by fixture
+        adapter.connection = True
+        crawler = Crawler(scrapper_factory=lambda **kwargs: OverclockersScrapper(coros_limit=3, **kwargs),
+                          adapter=adapter)
+        crawlers.append(crawler)
+        return crawler
+
+    yield inner
+    for crawler in crawlers:
+        crawler.close()
+
+
+@pytest.fixture
+def forum_mocks(create_topic_meta_info):
+    failed_urls = set()
+
+    # pylint: disable=unused-argument
+    async def fake_get_response(url, req_params, *args):
+        if url == OverclockersScrapper.FORUM_URL:
+            # the only listing page with topics
+            return mock.Mock(url=url, data='listing' if not req_params['start'] else None)
+        if url in failed_urls:
+            failed_urls.remove(url)
+            raise Exception('Something happened')
+        return mock.Mock(url=url, data=f'topic {url}', not_modified=False)
+
+    # requests are mocked, so there is no need in real session
+    with mock.patch.object(OverclockersScrapper, '_get_session', new_callable=mock.AsyncMock), \
+            mock.patch.object(OverclockersScrapper, '_get_response', side_effect=fake_get_response), \
+            mock.patch.object(
+                OverclockersParser, 'parse_topics_list',
+                side_effect=lambda page_content: [create_topic_meta_info(url) for url in TOPIC_URLS]
+            ), \
+            mock.patch.object(
+                OverclockersParser, 'parse_topic_content', return_value=mock.Mock(content='some content', closed=False)
+            ):
+        yield failed_urls
+
+
+class TestCrawler:
+
+    def test_crawl_moves_high_water_mark(self, create_crawler, forum_mocks):
+        crawler = create_crawler()
+
+        crawler.crawl(1, 2)
+
+        assert Topic.objects.count() == 2
+        assert CrawlState.objects.get_high_water_mark(LISTING_STATE) is not None
+
+    def test_crawl_failed_topic_page_fetched_on_next_run(self, create_crawler, forum_mocks):
+        forum_mocks.add(FAILED_TOPIC_URL)
+        crawler = create_crawler()
+
+        crawler.crawl(1, 2)
+
+        assert crawler.scrapper.content_errors == 1
+        assert list(Topic.objects.scalar('topic_id')) == [1]
+        # high-water mark is kept, so the next incremental crawl reaches listing page of failed topic
+        assert CrawlState.objects.get_high_water_mark(LISTING_STATE) is None
+
+        crawler.crawl(1, 2)
+
+        assert crawler.scrapper.content_errors == 0
+        assert sorted(Topic.objects.scalar('topic_id')) == [1, 2]
+        assert CrawlState.objects.get_high_water_mark(LISTING_STATE) is not None
+
+    def test_backfill_stops_on_failed_topic_page(self, create_crawler, forum_mocks):
+        forum_mocks.add(FAILED_TOPIC_URL)
+        crawler = create_crawler()
+
+        crawler.backfill(1, 4, window=2)
+
+        assert crawler.scrapper.content_errors == 1
+        assert crawler.backfill_stopped_window == (1, 2)
+        assert list(Topic.objects.scalar('topic_id')) == [1]
+        # window is retried on resume
+        assert CrawlState.objects.get_checkpoint(BACKFILL_STATE) is None
+
+        crawler.backfill(1, 4, window=2)
+
+        assert crawler.backfill_stopped_window is None
+        assert sorted(Topic.objects.scalar('topic_id')) == [1, 2]
+        assert CrawlState.objects.get_checkpoint(BACKFILL_STATE) == 4
+
+class TestMain:
+
+    def test_crawler_closed_on_failed_crawl(self):
+        with mock.patch('scrapper.scrap_to_db.parse_args') as args_mock, \
+                mock.patch('scrapper.scrap_to_db.Crawler') as crawler_mock:
+            args_mock.return_value = mock.Mock(start=1, end=2, full=False)
+            crawler_mock.return_value.crawl.side_effect = Exception('Something happened')
+
+            with pytest.raises(Exception):
+                main()
+
+        crawler_mock.return_value.close.assert_called_once_with()
+        crawler_mock.return_value.print_report.assert_not_called()
+
+    @pytest.mark.parametrize('stopped_window, exit_status', [(None, 0), ((1, 20), 1)])
+    def test_backfill_exit_status(self, stopped_window, exit_status):
+        with mock.patch('scrapper.backfill.parse_args') as args_mock, \
+                mock.patch('scrapper.backfill.Crawler') as crawler_mock:
+            args_mock.return_value = mock.Mock(start=1, end=40, window=20, chunk_size=50, restart=False)
+            crawler_mock.return_value.backfill_stopped_window = stopped_window
+
+            assert backfill_main() == exit_status
+
+        crawler_mock.return_value.close.assert_called_once_with()
@@ -0,0 +1,143 @@
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional, Union
+from urllib.parse import urlencode
+
+from .helpers import cache_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+
+    url: str
+    data: Union[str, dict]
+    content_type: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def validators(self) -> dict:
+        """
+        Conditional request headers for this entry.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    On-disk cache of GET responses keyed by URL and request params. Each entry keeps response
+    body with ETag/Last-Modified validators used for conditional requests. Least recently used
+    entries are evicted once total size of the cache exceeds max_size (bytes).
+    File I/O is synchronous: entries are single response bodies (bounded by session
+    max_body_size) on local disk, so it is cheaper than a round trip to an executor.
+    """
+
+    FILE_EXTENSION = '.json'
+
+    def __init__(self, path: str, max_size: int = 100 * 1024 * 1024):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # key -> [size, last access time], loaded on first access
+        self._index: Optional[Dict[str, list]] = None
+        # total size of indexed entries, kept along with the index
+        self._size = 0
+
+    @staticmethod
+    def make_key(url: str, params: Optional[dict] = None) -> str:
+        query = urlencode(sorted((str(key), str(value)) for key, value in params.items())) if params else ''
+        return hashlib.sha1(f'{url}?{query}'.encode('utf-8')).hexdigest()
+
+    @property
+    def stats(self) -> dict:
+        return cache_stats(self.hits, self.misses, entries=len(self._load_index()), size=self.size)
+
+    @property
+    def size(self) -> int:
+        self._load_index()
+        return self._size
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, f'{key}{self.FILE_EXTENSION}')
+
+    def _load_index(self) -> Dict[str, list]:
+        if self._index is None:
+            os.makedirs(self.path, exist_ok=True)
+            self._index = {}
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.endswith(self.FILE_EXTENSION):
+                        stat = entry.stat()
+                        key = entry.name[:-len(self.FILE_EXTENSION)]
+                        self._index[key] = [stat.st_size, stat.st_mtime]
+                        self._size += stat.st_size
+        return self._index
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        index = self._load_index()
+        if key not in index:
+            return None
+
+        file_path = self._entry_path(key)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                entry = CacheEntry(**json.load(file))
+        except (OSError, ValueError, TypeError):
+            logger.warning('Broken response cache entry %s removed', key)
+            self.delete(key)
+            return None
+
+        # file modification time is used as last access time, so LRU order
+        # survives process restarts
+        os.utime(file_path)
+        index[key][1] = os.path.getmtime(file_path)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        index = self._load_index()
+        content = json.dumps(asdict(entry), ensure_ascii=False).encode('utf-8')
+        if len(content) > self.max_size:
+            return
+
+        file_path = self._entry_path(key)
+        tmp_path = f'{file_path}.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(content)
+        os.replace(tmp_path, file_path)
+
+        if key in index:
+            self._size -= index[key][0]
+        index[key] = [len(content), os.path.getmtime(file_path)]
+        self._size += len(content)
+        self._evict()
+
+    def delete(self, key: str) -> None:
+        removed = self._load_index().pop(key, None)
+        if removed is not None:
+            self._size -= removed[0]
+        try:
+            os.remove(self._entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        index = self._load_index()
+        if self._size <= self.max_size:
+            return
+
+        for key in sorted(index, key=lambda item: index[item][1]):
+            self.delete(key)
+            if self._size <= self.max_size:
+                break
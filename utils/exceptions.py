@@ -6,3 +6,13 @@ class RetriesExceeded(Exception):
 class NotConfigurated(Exception):
 
     pass
+
+
+class RetryBudgetExceeded(RetriesExceeded):
+
+    pass
+
+
+class ResponseTooLarge(Exception):
+
+    pass
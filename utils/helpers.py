@@ -1,7 +1,12 @@
 from contextlib import asynccontextmanager
+import hashlib
+import re
 
 import asyncio
 
+# phpBB adds session id to links for guests, so it differs between requests
+SESSION_ID_PATTERN = re.compile(r'sid=[0-9a-f]+')
+
 
 @asynccontextmanager
 async def fake_semaphore():
@@ -9,3 +14,19 @@ async def fake_semaphore():
         yield None
     finally:
         await asyncio.sleep(0)
+
+
+def content_fingerprint(content: str) -> str:
+    """
+    Return fingerprint of page content that does not depend on session id.
+    """
+    normalized = SESSION_ID_PATTERN.sub('', content)
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def cache_stats(hits: int, misses: int, **extra) -> dict:
+    """
+    Return cache hits/misses counters with hit rate and any extra stats.
+    """
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0, **extra}
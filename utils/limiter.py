@@ -0,0 +1,119 @@
+import asyncio
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import logging
+import time
+from typing import Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Return number of seconds to wait from Retry-After header value (seconds or HTTP date).
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveLimiter:  # pylint: disable=too-many-instance-attributes
+    """
+    AIMD (additive increase, multiplicative decrease) concurrency limiter, that could be used
+    in place of asyncio.Semaphore. Every healthy response grows the limit by 1/limit, so
+    the limit grows by one per limit of responses. Throttling (429/5xx), timeouts and responses
+    slower than max_latency cut the limit by backoff_factor, at most once per cooldown seconds,
+    as a burst of failures of concurrent requests is a single congestion signal.
+    Retry-After pauses all acquisitions until the given time.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self, initial_limit: int = 10, min_limit: int = 1, max_limit: int = 100, backoff_factor: float = 0.5,
+            max_latency: Optional[float] = None, cooldown: float = 1.0, clock: Callable[[], float] = time.monotonic
+    ):
+        if not min_limit <= initial_limit <= max_limit:
+            raise ValueError('Initial limit should be between min and max limits')
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_factor = backoff_factor
+        self.max_latency = max_latency
+        self.cooldown = cooldown
+        self.clock = clock
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.backoffs = 0
+        self.peak_limit = initial_limit
+        self._last_backoff = None
+        self._condition = asyncio.Condition()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'limit': int(self.limit),
+            'peak_limit': self.peak_limit,
+            'in_flight': self.in_flight,
+            'backoffs': self.backoffs
+        }
+
+    async def acquire(self):
+        async with self._condition:
+            while True:
+                pause = self.paused_until - self.clock()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+                elif self.in_flight < int(self.limit):
+                    break
+                else:
+                    await self._condition.wait()
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.release()
+
+    def on_success(self, latency: Optional[float] = None):
+        if self.max_latency is not None and latency is not None and latency > self.max_latency:
+            self.backoff()
+            return
+        self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        self.peak_limit = max(self.peak_limit, int(self.limit))
+
+    def on_failure(self):
+        self.backoff()
+
+    def on_throttled(self, retry_after: Optional[float] = None):
+        if retry_after:
+            self.paused_until = max(self.paused_until, self.clock() + retry_after)
+            logger.info('Requests are paused for %.1f sec as asked by server', retry_after)
+        self.backoff()
+
+    def backoff(self):
+        now = self.clock()
+        if self._last_backoff is not None and now - self._last_backoff < self.cooldown:
+            return
+        self._last_backoff = now
+        self.backoffs += 1
+        self.limit = max(float(self.min_limit), self.limit * self.backoff_factor)
+        logger.info('Concurrency limit decreased to %i', int(self.limit))
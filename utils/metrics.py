@@ -0,0 +1,206 @@
+import asyncio
+from bisect import bisect_left
+from contextlib import contextmanager
+import functools
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+# upper bounds (seconds) of latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """
+    Cumulative histogram of observed values with fixed buckets.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # the last one counts values above the highest bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, quantile: float) -> float:
+        """
+        Return upper bound of the bucket quantile falls into, but not more than max value.
+        """
+        rank = quantile * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    @property
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99)
+        }
+
+
+class Metrics:
+    """
+    Registry of counters and latency histograms. Nothing is recorded while it is disabled,
+    so instrumented code pays only for the enabled check.
+    """
+
+    def __init__(self, enabled: bool = False, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        # instrumented code runs in executor threads too
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        """
+        Observe duration (seconds) of the block in name histogram,
+        failed blocks are counted in name_failures_total counter.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(f'{name}_failures_total')
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def timed(self, name: str) -> Callable:
+        """
+        Decorator that times every call of a function or coroutine function (see timer).
+        """
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    with self.timer(name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+    @property
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {name: histogram.summary for name, histogram in self.histograms.items()}
+            }
+
+    def prometheus_text(self) -> str:
+        """
+        Return metrics in Prometheus text exposition format.
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.extend((f'# TYPE {name} counter', f'{name} {value}'))
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f'# TYPE {name} histogram')
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.extend((
+                    f'{name}_bucket{{le="+Inf"}} {histogram.count}',
+                    f'{name}_sum {histogram.sum}',
+                    f'{name}_count {histogram.count}'
+                ))
+        return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path: str, content: str):
+    # readers (e.g. node exporter textfile collector) never see a partially written file
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+
+class PrometheusFileSink:  # pylint: disable=too-few-public-methods
+    """
+    Write metrics to a file in Prometheus text exposition format.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, registry: Metrics):
+        _write_atomic(self.path, registry.prometheus_text())
+
+
+class JsonSink:  # pylint: disable=too-few-public-methods
+    """
+    Write metrics summary (counters, histograms count/sum/mean/max/p50/p99) as JSON.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, registry: Metrics):
+        _write_atomic(self.path, json.dumps(registry.summary, indent=2, sort_keys=True))
+
+
+# metrics of the process, disabled until enabled by scrapper script
+metrics = Metrics()
+
+
+def create_sinks(prometheus_path: Optional[str] = None, json_path: Optional[str] = None) -> list:
+    sinks = []
+    if prometheus_path:
+        sinks.append(PrometheusFileSink(prometheus_path))
+    if json_path:
+        sinks.append(JsonSink(json_path))
+    return sinks
@@ -0,0 +1,134 @@
+from collections import Counter
+from dataclasses import dataclass
+import random
+from typing import Dict, Optional
+
+# kinds of failed requests, each kind is retried by its own policy
+TIMEOUT = 'timeout'
+CONNECTION_ERROR = 'connection_error'
+THROTTLED = 'throttled'
+SERVER_ERROR = 'server_error'
+
+# statuses server responds with when client should slow down
+THROTTLING_STATUSES = frozenset([429, 503])
+
+
+def classify_status(status: int) -> Optional[str]:
+    """
+    Return kind of failure for response status or None for successful response.
+    """
+    if status in THROTTLING_STATUSES:
+        return THROTTLED
+    if status >= 500:
+        return SERVER_ERROR
+    return None
+
+
+@dataclass
+class RetryPolicy:
+    """
+    How many attempts are made for a kind of failure and how long to wait between them:
+    exponential backoff capped by max_delay, with full jitter (random delay from zero
+    to backoff) so clients failed at once do not retry at once.
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    multiplier: float = 2.0
+    jitter: bool = True
+
+    @classmethod
+    def constant(cls, max_attempts: int, delay: Optional[float] = None) -> 'RetryPolicy':
+        return cls(max_attempts=max_attempts, base_delay=delay or 0, max_delay=delay or 0, multiplier=1, jitter=False)
+
+    def delay(self, retry: int) -> float:
+        """
+        Return delay before given retry (starting from 1).
+        """
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (retry - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+DEFAULT_RETRY_POLICIES = {
+    TIMEOUT: RetryPolicy(max_attempts=3, base_delay=1),
+    CONNECTION_ERROR: RetryPolicy(max_attempts=3, base_delay=0.5),
+    THROTTLED: RetryPolicy(max_attempts=5, base_delay=5, max_delay=120),
+    SERVER_ERROR: RetryPolicy(max_attempts=3, base_delay=2),
+}
+
+
+def constant_retry_policies(max_attempts: int, delay: Optional[float] = None) -> Dict[str, RetryPolicy]:
+    """
+    Policies with the same number of attempts and constant delay for every kind of failure.
+    """
+    policy = RetryPolicy.constant(max_attempts, delay)
+    return {kind: policy for kind in (TIMEOUT, CONNECTION_ERROR, THROTTLED, SERVER_ERROR)}
+
+
+class RetryBudget:
+    """
+    Limits retries of all requests made with it (e.g. during a single crawl) to min_retries
+    plus ratio of requests, so a degraded host does not get ratio times more load.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.rejected = 0
+
+    @property
+    def available(self) -> int:
+        return max(0, int(self.min_retries + self.ratio * self.requests) - self.retries)
+
+    def on_request(self):
+        self.requests += 1
+
+    def try_spend(self) -> bool:
+        if self.available <= 0:
+            self.rejected += 1
+            return False
+        self.retries += 1
+        return True
+
+
+class RetryStats:
+    """
+    Per-attempt metrics of requests: outcome (success or kind of failure) of every attempt,
+    number of retries and attempts latency, and number of requests coalesced with identical
+    in-flight ones.
+    """
+
+    SUCCESS = 'success'
+
+    def __init__(self):
+        self.outcomes = Counter()
+        self.retries = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.coalesced = 0
+
+    @property
+    def attempts(self) -> int:
+        return sum(self.outcomes.values())
+
+    @property
+    def stats(self) -> dict:
+        attempts = self.attempts
+        return {
+            'attempts': attempts,
+            'retries': self.retries,
+            'outcomes': dict(self.outcomes),
+            'latency_avg': self.latency_total / attempts if attempts else 0.0,
+            'latency_max': self.latency_max,
+            'coalesced': self.coalesced
+        }
+
+    def record(self, outcome: str, latency: float, attempt: int):
+        self.outcomes[outcome] += 1
+        if attempt > 1:
+            self.retries += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
@@ -0,0 +1,64 @@
+import logging
+import random
+import threading
+import time
+from typing import Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+class IntervalScheduler:
+    """
+    Run job every interval seconds (plus or minus random jitter) until stopped.
+    Runs never overlap: if job takes longer than interval, the next run starts right after it.
+    Failed run is logged and does not stop the scheduler.
+    """
+
+    def __init__(
+            self, job: Callable[[], object], interval: float, jitter: float = 0.0,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        if jitter > interval:
+            raise ValueError('Jitter could not be greater than interval')
+        self.job = job
+        self.interval = interval
+        self.jitter = jitter
+        self.clock = clock
+        self.runs = 0
+        self.failures = 0
+        self._stop_event = threading.Event()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def stop(self, *args) -> None:  # pylint: disable=unused-argument
+        """
+        Stop scheduler after the current run. Accepts signal handler arguments.
+        """
+        if not self.stopped:
+            logger.info('Scheduler is stopping')
+        self._stop_event.set()
+
+    def next_delay(self, started: float) -> float:
+        """
+        Return delay before the next run of job started at given time.
+        """
+        interval = self.interval + random.uniform(-self.jitter, self.jitter)
+        return max(0.0, interval - (self.clock() - started))
+
+    def run(self) -> int:
+        """
+        Block running job until stopped and return number of runs.
+        """
+        while not self.stopped:
+            started = self.clock()
+            try:
+                self.job()
+            except Exception:  # pylint: disable=broad-except
+                self.failures += 1
+                logger.exception('Scheduled run failed')
+            self.runs += 1
+            self._stop_event.wait(self.next_delay(started))
+        return self.runs
@@ -1,49 +1,316 @@
 import asyncio
+from dataclasses import dataclass
+from functools import partial
+import json
 import logging
+import time
+from typing import Dict, Optional, Tuple
 
 import aiohttp
 from aiohttp.typedefs import StrOrURL
+from yarl import URL
 
-from scrapper.utils.exceptions import RetriesExceeded
+from scrapper.utils.cache import CacheEntry, ResponseCache
+from scrapper.utils.exceptions import ResponseTooLarge, RetriesExceeded, RetryBudgetExceeded
 from scrapper.utils.helpers import fake_semaphore
+from scrapper.utils.limiter import AdaptiveLimiter, parse_retry_after
+from scrapper.utils.metrics import metrics
+from scrapper.utils.retry import (
+    CONNECTION_ERROR, THROTTLED, TIMEOUT, RetryBudget, RetryPolicy, RetryStats, classify_status,
+    constant_retry_policies
+)
+from scrapper.utils.user_agents import UserAgentPool
 
 
 logger = logging.getLogger(__name__)
 
+# exceptions of broken connections that are worth to retry
+RETRIABLE_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+
+# response body is read by chunks of this size
+CHUNK_SIZE = 64 * 1024
+# used when response does not declare charset
+DEFAULT_CHARSET = 'utf-8'
+
+
+@dataclass
+class _Request:
+
+    url: StrOrURL
+    kwargs: dict
+    semaphore: object = None
+    cache_key: Optional[str] = None
+    cache_entry: Optional[CacheEntry] = None
+
+    @property
+    def limiter(self) -> Optional[AdaptiveLimiter]:
+        return self.semaphore if isinstance(self.semaphore, AdaptiveLimiter) else None
+
+
+@dataclass
+class _FailedAttempt:
+
+    kind: str
+    attempt: int
+    error: Optional[Exception] = None
+    retry_after: Optional[float] = None
+
+
+@dataclass
+class _Flight:
+    """
+    Request in flight and number of callers waiting for its response.
+    """
+
+    task: asyncio.Future
+    waiters: int = 0
+
 
 class GSession(aiohttp.ClientSession):
 
-    async def get_data(
-            self, url: StrOrURL, *, allow_redirects=True, semaphore=None, retry_num=3, sleep_on_retry=None, **kwargs
+    ATTRS = aiohttp.ClientSession.ATTRS | frozenset(
+        ['cache', 'retry_policies', 'retry_budget', 'retry_stats', 'max_body_size', 'user_agents', '_in_flight']
+    )
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self, *args, cache: Optional[ResponseCache] = None,
+            retry_policies: Optional[Dict[str, RetryPolicy]] = None, retry_budget: Optional[RetryBudget] = None,
+            max_body_size: Optional[int] = 8 * 1024 * 1024, user_agents: Optional[UserAgentPool] = None, **kwargs
     ):
-        retries = 0
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+        # responses bigger than that (bytes) are rejected
+        self.max_body_size = max_body_size
+        self.retry_policies = retry_policies
+        self.retry_budget = retry_budget
+        self.retry_stats = RetryStats()
+        # when set, every request goes with User-Agent taken from the pool
+        self.user_agents = user_agents
+        # request key -> request in flight, see get_data
+        self._in_flight: Dict[str, _Flight] = {}
+
+    @staticmethod
+    def request_key(url: StrOrURL, params: Optional[dict] = None) -> str:
+        """
+        Return URL with query of URL and params merged and sorted, so the same
+        request gets the same key no matter how query parameters are given.
+        """
+        url = URL(str(url))
+        if params:
+            url = url.update_query({str(key): str(value) for key, value in params.items()})
+        return str(url.with_query(sorted(url.query.items())))
+
+    def _prepare_conditional_request(self, url: StrOrURL, kwargs: dict):
+        """
+        Return cache key and cached entry for the request (if any) and add
+        If-None-Match/If-Modified-Since headers to request kwargs.
+        """
+        if self.cache is None:
+            return None, None
+
+        cache_key = self.cache.make_key(str(url), kwargs.get('params'))
+        entry = self.cache.get(cache_key)
+        if entry:
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), **entry.validators}
+        return cache_key, entry
+
+    def _store_response(self, cache_key: Optional[str], response: aiohttp.ClientResponse):
+        if cache_key is None or response.status != 200 or not response.data:
+            return
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            self.cache.set(cache_key, CacheEntry(
+                url=str(response.url),
+                data=response.data,
+                content_type=response.content_type,
+                etag=etag,
+                last_modified=last_modified
+            ))
+
+    async def get_data(self, url: StrOrURL, **kwargs):
+        """
+        Perform GET request (see _fetch for arguments) and return response with decoded body
+        in response.data. Identical requests (same URL and params) made while one is in flight
+        are not sent, but get the response of the request in flight (single-flight).
+        """
+        key = self.request_key(url, kwargs.get('params'))
+        flight = self._in_flight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(self._fetch(url, **kwargs)))
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(partial(self._land, key, flight))
+        else:
+            self.retry_stats.coalesced += 1
 
+        flight.waiters += 1
+        try:
+            # caller cancellation must not cancel request for other waiters
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters:
+                flight.task.cancel()
+
+    def _land(self, key: str, flight: _Flight, _):
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+
+    @metrics.timed('scrapper_request_seconds')
+    async def _fetch(  # pylint: disable=too-many-arguments
+            self, url: StrOrURL, *, allow_redirects=True, semaphore=None, retry_num=3, sleep_on_retry=None,
+            retry_policies: Optional[Dict[str, RetryPolicy]] = None, **kwargs
+    ):
+        """
+        Perform GET request and set response.data to decoded body. When session has a cache,
+        request is conditional and on 304 response.data is taken from the cache with
+        response.not_modified set to True.
+        Semaphore could be an AdaptiveLimiter, then it gets latency/status of every response.
+        Timeouts, connection errors, throttling (429/503, Retry-After is honoured) and server
+        errors are retried according to retry policies for the kind of failure: given ones,
+        session ones or retry_num attempts with constant sleep_on_retry delay. Retries are
+        limited by session retry budget, every attempt is recorded to session retry stats.
+        With session User-Agent pool every request gets its own User-Agent header.
+        """
+        if retry_policies is None:
+            retry_policies = self.retry_policies or constant_retry_policies(retry_num, sleep_on_retry)
+        cache_key, cache_entry = self._prepare_conditional_request(url, kwargs)
+        if self.user_agents:
+            # retries of the request keep its User-Agent
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), 'User-Agent': self.user_agents.random()}
+        request = _Request(
+            url=url,
+            kwargs={'allow_redirects': allow_redirects, **kwargs},
+            semaphore=semaphore,
+            cache_key=cache_key,
+            cache_entry=cache_entry
+        )
+
+        if self.retry_budget:
+            self.retry_budget.on_request()
+
+        attempt = 1
         while True:
-            async with semaphore if semaphore else fake_semaphore():
-                try:
-                    async with super().get(url, allow_redirects=allow_redirects, **kwargs) as response:
-                        if response.content_type == 'application/json':
-                            content = await response.json()
-                        else:
-                            content = await response.text()
-                        response.data = content if content else None
-
-                        return response
-                except asyncio.TimeoutError as err:
-                    retries += 1
-                    if retries == retry_num:
-                        logger.exception('Request aborted due to retries limit exceeded')
-                        raise RetriesExceeded(
-                            f'Retry limit exceeded ({retries} of {retry_num}) for GET {url}'
-                        ) from err
-                    if sleep_on_retry:
-                        logger.info(
-                            'GET request waiting %i sec for %s to retry (%i of %i)',
-                            sleep_on_retry, url, retries, retry_num
-                        )
-                        await asyncio.sleep(sleep_on_retry)
-                    else:
-                        logger.exception('GET %s request failed on timeout', url)
-                except Exception:
-                    logger.exception('Exception raised during processing of GET %s request', url)
-                    raise
+            response, failed = await self._attempt(request, attempt)
+            if failed is None:
+                return response
+
+            delay = self._retry_delay(request, failed, retry_policies[failed.kind])
+            # slot of semaphore is not held while waiting for retry
+            if delay:
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _attempt(
+            self, request: '_Request', attempt: int
+    ) -> Tuple[Optional[aiohttp.ClientResponse], Optional['_FailedAttempt']]:
+        """
+        Make a single request attempt and return either response or failed attempt.
+        """
+        limiter = request.limiter
+        failed = None
+
+        async with request.semaphore if request.semaphore else fake_semaphore():
+            started = time.monotonic()
+            try:
+                async with super().get(request.url, **request.kwargs) as response:
+                    kind = classify_status(response.status)
+                    if kind is None:
+                        if limiter:
+                            limiter.on_success(time.monotonic() - started)
+                        response = await self._read_response(response, request.cache_key, request.cache_entry)
+                        self.retry_stats.record(RetryStats.SUCCESS, time.monotonic() - started, attempt)
+                        return response, None
+                    failed = _FailedAttempt(kind, attempt)
+                    if kind == THROTTLED:
+                        failed.retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            except asyncio.TimeoutError as err:
+                failed = _FailedAttempt(TIMEOUT, attempt, error=err)
+            except RETRIABLE_ERRORS as err:
+                failed = _FailedAttempt(CONNECTION_ERROR, attempt, error=err)
+            except Exception:
+                logger.exception('Exception raised during processing of GET %s request', request.url)
+                raise
+
+        self.retry_stats.record(failed.kind, time.monotonic() - started, attempt)
+        if limiter:
+            if failed.kind == THROTTLED:
+                limiter.on_throttled(failed.retry_after)
+            else:
+                limiter.on_failure()
+        return None, failed
+
+    def _retry_delay(self, request: '_Request', failed: '_FailedAttempt', policy: RetryPolicy) -> float:
+        """
+        Return delay before retry of failed attempt or raise RetriesExceeded if it could not be retried.
+        """
+        url, error = request.url, failed.error
+        if failed.attempt >= policy.max_attempts:
+            logger.error('Request aborted due to retries limit exceeded', exc_info=error)
+            raise RetriesExceeded(
+                f'Retry limit exceeded ({failed.attempt} of {policy.max_attempts}) for GET {url}'
+            ) from error
+
+        if self.retry_budget and not self.retry_budget.try_spend():
+            logger.error('Request aborted due to retry budget exhausted (%s)', failed.kind, exc_info=error)
+            raise RetryBudgetExceeded(f'Retry budget exhausted for GET {url}') from error
+
+        if failed.retry_after is not None:
+            # limiter pauses all requests by itself
+            delay = 0 if request.limiter else failed.retry_after
+        else:
+            delay = policy.delay(failed.attempt)
+
+        if delay:
+            logger.info(
+                'GET request waiting %.3g sec for %s to retry (%i of %i)',
+                delay, url, failed.attempt, policy.max_attempts
+            )
+        elif failed.kind == TIMEOUT:
+            logger.exception('GET %s request failed on timeout', url, exc_info=error)
+        else:
+            logger.warning(
+                'GET %s request failed (%s), retry (%i of %i)', url, failed.kind, failed.attempt, policy.max_attempts
+            )
+        return delay
+
+    async def _read_body(self, response: aiohttp.ClientResponse) -> bytes:
+        """
+        Read response body by chunks and raise ResponseTooLarge as soon as it gets
+        bigger than max_body_size, so memory taken by a single page is bounded.
+        """
+        max_size = self.max_body_size
+        if max_size and response.content_length and response.content_length > max_size:
+            raise ResponseTooLarge(
+                f'Response of GET {response.url} is {response.content_length} bytes (limit is {max_size})'
+            )
+
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            body.extend(chunk)
+            if max_size and len(body) > max_size:
+                raise ResponseTooLarge(f'Response of GET {response.url} exceeds {max_size} bytes')
+        return bytes(body)
+
+    async def _read_response(
+            self, response: aiohttp.ClientResponse, cache_key: Optional[str], cache_entry: Optional[CacheEntry]
+    ) -> aiohttp.ClientResponse:
+        if cache_entry and response.status == 304:
+            self.cache.hits += 1
+            response.data = cache_entry.data
+            response.not_modified = True
+            return response
+
+        text = (await self._read_body(response)).decode(response.charset or DEFAULT_CHARSET, errors='replace')
+        if response.content_type == 'application/json':
+            content = json.loads(text) if text else None
+        else:
+            content = text
+        response.data = content if content else None
+        response.not_modified = False
+
+        if cache_key is not None:
+            self.cache.misses += 1
+            self._store_response(cache_key, response)
+        return response
@@ -1,46 +1,228 @@
+from collections import OrderedDict, defaultdict
 from functools import lru_cache
 import json
+import logging
+import marshal
 import os
 import re
-from typing import Optional
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import nltk
 
-from .constants import Languages, LettersSet
+from ..helpers import cache_stats
+from ..metrics import metrics
 
 
-def _load_json_data(path: str) -> dict:
+logger = logging.getLogger(__name__)
+
+# maximum edit distance supported by location index
+MAX_EDIT_DISTANCE = 2
+# short names are looked up with edit distance 1 only, as almost every
+# short word is within distance 2 of some location
+SHORT_LOCATION_LENGTH = 4
+
+LOCATIONS_PATH = './resources/locations.json'
+LOCATIONS_FREQUENCIES_PATH = './resources/locations_freq.json'
+RESOURCES = (LOCATIONS_PATH, LOCATIONS_FREQUENCIES_PATH)
+
+# resources compiled by scrapper.utils.spelling.compile
+COMPILED_RESOURCES_PATH = './resources/locations.bin'
+# bump on any change of compiled resources layout
+COMPILED_RESOURCES_FORMAT = 1
+
+
+def _resource_path(path: str) -> str:
     working_dir = os.path.abspath(os.path.dirname(__file__))
-    file_path = os.path.join(working_dir, path)
+    return os.path.normpath(os.path.join(working_dir, path))
+
+
+def _load_json_data(path: str) -> dict:
+    file_path = _resource_path(path)
     with open(file_path, 'r', encoding='utf-8') as file:
         content = file.read()
     return json.loads(content)
 
 
+def resources_version() -> str:
+    """
+    Return version of location resources made of their sizes and modification times.
+    """
+    version = []
+    for path in RESOURCES:
+        try:
+            stat = os.stat(_resource_path(path))
+        except OSError:
+            continue
+        version.append(f'{stat.st_size}:{int(stat.st_mtime)}')
+    return ','.join(version)
+
+
+def _compiled_resources_header() -> dict:
+    return {
+        'format': COMPILED_RESOURCES_FORMAT,
+        # marshal format is specific to Python version
+        'python': '.'.join(map(str, sys.version_info[:2])),
+    }
+
+
+def save_compiled_resources(resources: dict, path: Optional[str] = None) -> str:
+    """
+    Write resources to binary artifact: marshalled header followed by marshalled resources.
+    Return path of the artifact.
+    """
+    file_path = path if path else _resource_path(COMPILED_RESOURCES_PATH)
+    header = {**_compiled_resources_header(), 'resources_version': resources_version()}
+    tmp_path = f'{file_path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        marshal.dump(header, file)
+        marshal.dump(resources, file)
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+@lru_cache(maxsize=None)
+def load_compiled_resources() -> Optional[dict]:
+    """
+    Return resources compiled by scrapper.utils.spelling.compile or None, if there is no
+    artifact or it was compiled by other version of compiler, Python or from other resources.
+    Source JSON files are not required once the artifact is compiled. Artifact is loaded once
+    per process, see preload_location_resources for sharing it with parse workers.
+    """
+    file_path = _resource_path(COMPILED_RESOURCES_PATH)
+    if not os.path.exists(file_path):
+        return None
+
+    try:
+        with open(file_path, 'rb') as file:
+            header = marshal.load(file)
+            if any(header.get(key) != value for key, value in _compiled_resources_header().items()):
+                logger.warning('Compiled location resources %s are outdated, JSON resources are used', file_path)
+                return None
+            version = resources_version()
+            if version and header['resources_version'] != version:
+                logger.warning('Compiled location resources %s do not match JSON resources', file_path)
+                return None
+            return marshal.load(file)
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        logger.warning('Broken compiled location resources %s ignored', file_path)
+        return None
+
+
+@lru_cache(maxsize=None)
+def load_locations() -> list:
+    return _load_json_data(LOCATIONS_PATH)
+
+
+def ru_ua_location_names(locations: list) -> dict:
+    return {item['name']['ru'].lower(): item['name']['uk'].lower() for item in locations}
+
+
+def ua_ru_location_names(locations: list) -> dict:
+    return {item['name']['uk'].lower(): item['name']['ru'].lower() for item in locations}
+
+
 @lru_cache(maxsize=None)
 def load_ru_ua_location_names() -> dict:
-    data = _load_json_data('./resources/locations.json')
-    locations = {item['name']['ru'].lower(): item['name']['uk'].lower() for item in data}
-    return locations
+    compiled = load_compiled_resources()
+    if compiled:
+        return compiled['ru_ua']
+    return ru_ua_location_names(load_locations())
 
 
 @lru_cache(maxsize=None)
 def load_ua_ru_location_names() -> dict:
-    data = _load_json_data('./resources/locations.json')
-    locations = {item['name']['uk'].lower(): item['name']['ru'].lower() for item in data}
-    return locations
+    compiled = load_compiled_resources()
+    if compiled:
+        return compiled['ua_ru']
+    return ua_ru_location_names(load_locations())
 
 
 @lru_cache(maxsize=None)
 def load_locations_frequencies() -> dict:
-    data = _load_json_data('./resources/locations_freq.json')
-    return data
+    compiled = load_compiled_resources()
+    if compiled:
+        return compiled['frequencies']
+    return _load_json_data(LOCATIONS_FREQUENCIES_PATH)
+
+
+def create_deletes(word: str, max_distance: int) -> Set[str]:
+    """
+    Return word itself and all words made of it by deleting up to max_distance characters.
+    """
+    deletes = {word}
+    edits = {word}
+    for _ in range(max_distance):
+        edits = {edit[:i] + edit[i + 1:] for edit in edits for i in range(len(edit))}
+        deletes |= edits
+    return deletes
+
+
+def build_location_index(locations: Iterable[str], max_distance: int = MAX_EDIT_DISTANCE) -> Dict[str, List[str]]:
+    """
+    Build symmetric delete index (SymSpell) - mapping of every delete of location name
+    to location names it was made of. Two words within max_distance edits have a common
+    delete, so lookup needs only deletes of user input instead of all its edits.
+    """
+    index = defaultdict(list)
+    for location in locations:
+        for delete in create_deletes(location, max_distance):
+            index[delete].append(location)
+    return dict(index)
+
+
+@lru_cache(maxsize=None)
+def load_ru_location_index() -> dict:
+    compiled = load_compiled_resources()
+    if compiled:
+        return compiled['ru_index']
+    return build_location_index(load_ru_ua_location_names())
+
+
+@lru_cache(maxsize=None)
+def load_ua_location_index() -> dict:
+    compiled = load_compiled_resources()
+    if compiled:
+        return compiled['ua_index']
+    return build_location_index(load_ua_ru_location_names())
+
+
+def preload_location_resources():
+    """
+    Load location dictionaries, frequencies and indexes now instead of on first lookup.
+    Loading a realistic distance 2 index takes seconds, so it is done once in the parent
+    process before parse workers are forked (workers inherit loaded objects, memory pages
+    are copied only when touched); as pool initializer it loads resources on worker start
+    with other start methods and is a no-op in forked workers.
+    """
+    for loader in (
+            load_ru_ua_location_names, load_ua_ru_location_names, load_locations_frequencies,
+            load_ru_location_index, load_ua_location_index
+    ):
+        loader()
+
+
+def lookup_location(word: str, index: dict, max_distance: int = MAX_EDIT_DISTANCE) -> List[Tuple[str, int]]:
+    """
+    Return (location name, edit distance) pairs for names of index within max_distance from word.
+    """
+    candidates = set()
+    for delete in create_deletes(word, max_distance):
+        candidates.update(index.get(delete, ()))
+
+    suggestions = []
+    for candidate in sorted(candidates):
+        distance = nltk.edit_distance(word, candidate, transpositions=True)
+        if distance <= max_distance:
+            suggestions.append((candidate, distance))
+    return suggestions
 
 
 def check_known_location_second_name(location: str):
     # hardcoded list of frequent mistakes in locations
-    # naming that can't be constructed by create_misspelled_words_list
-    # method
+    # naming that are too far from the right name to be corrected
+    # by location index lookup
     hardcoded_locations = {
         'днепр': 'днипро',
         'днепропетровск': 'днипро',
@@ -55,38 +237,170 @@ def check_known_location_second_name(location: str):
     return hardcoded_locations.get(location)
 
 
-def create_misspelled_words_list(word: str, language: str) -> set:
-    if language == Languages.RUSSIAN.value:
-        letters = LettersSet.RUSSIAN_LETTERS.value
-    elif language == Languages.UKRAINIAN.value:
-        letters = LettersSet.UKRAINIAN_LETTERS.value
-    else:
-        raise NotImplementedError(f'Unsupported language: {language}')
+class LocationCache:
+    """
+    Bounded LRU cache of validate_location results (misses of location dictionary included).
+    Cache could be saved to disk and loaded by the next process, snapshot made from other
+    version of location resources is ignored. Cache of a worker process could track its
+    updates, so they are merged into the cache of the parent process (see pop_updates).
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        # entries set and hits/misses counted before the last pop_updates call,
+        # updates are not tracked unless track_updates is called
+        self._updates: Optional[list] = None
+        self._reported_hits = 0
+        self._reported_misses = 0
+        # listing pages are parsed on the event loop or in worker processes (each with its
+        # own cache), but scrapper parse executor could be a thread pool sharing this cache
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def stats(self) -> dict:
+        return cache_stats(self.hits, self.misses, entries=len(self._data))
+
+    def lookup(self, location: str) -> Tuple[bool, Optional[str]]:
+        """
+        Return (found, result) pair, as None is a valid result too.
+        """
+        with self._lock:
+            if location in self._data:
+                self._data.move_to_end(location)
+                self.hits += 1
+                return True, self._data[location]
+            self.misses += 1
+            return False, None
+
+    def set(self, location: str, result: Optional[str]) -> None:
+        with self._lock:
+            if self._updates is not None:
+                self._updates.append((location, result))
+            self._data[location] = result
+            self._data.move_to_end(location)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
 
-    word = word.lower()
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self._updates = None
+            self._reported_hits = 0
+            self._reported_misses = 0
 
-    # Peter Norvig's Spell Correction Algorithm - https://norvig.com/spell-correct.html
-    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
-    deletes = [L + R[1:] for L, R in splits if R]
-    transposes = [L + R[1] + R[0] + R[2:] for L, R in splits if len(R) > 1]
-    replaces = [L + c + R[1:] for L, R in splits if R for c in letters]
-    inserts = [L + c + R for L, R in splits for c in letters]
-    return set(deletes + transposes + replaces + inserts)
+    def track_updates(self) -> None:
+        """
+        Start tracking entries set and hits/misses counted from now on.
+        """
+        with self._lock:
+            self._updates = []
+            self._reported_hits = self.hits
+            self._reported_misses = self.misses
 
+    def pop_updates(self) -> Tuple[list, int, int]:
+        """
+        Return entries set and number of hits and misses counted since the previous call
+        (or track_updates call). Nothing is returned unless updates are tracked.
+        """
+        with self._lock:
+            if self._updates is None:
+                return [], 0, 0
+            updates = (self._updates, self.hits - self._reported_hits, self.misses - self._reported_misses)
+            self._updates = []
+            self._reported_hits = self.hits
+            self._reported_misses = self.misses
+        return updates
 
+    def merge(self, entries: list, hits: int = 0, misses: int = 0) -> None:
+        """
+        Merge updates returned by pop_updates of other (worker process) cache.
+        """
+        for location, result in entries:
+            self.set(location, result)
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            content = {'version': resources_version(), 'entries': list(self._data.items())}
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(content, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """
+        Load snapshot made by save and return number of cached entries.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                content = json.load(file)
+            entries = content['entries']
+            version = content['version']
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.warning('Broken location cache snapshot %s ignored', path)
+            return 0
+
+        if version != resources_version():
+            return 0
+
+        for location, result in entries:
+            self.set(location, result)
+        return len(self._data)
+
+
+location_cache = LocationCache()
+
+
+def init_location_worker(cache_path: Optional[str] = None, max_size: Optional[int] = None):
+    """
+    Initializer of parse worker processes: load location resources, warm location cache
+    from snapshot (forked worker already has cache of the parent process) and track cache
+    updates, so the parent process merges them (see OverclockersScrapper parse executor).
+    """
+    preload_location_resources()
+    if max_size:
+        location_cache.max_size = max_size
+    if cache_path and not location_cache:
+        location_cache.load(cache_path)
+    location_cache.track_updates()
+
+
+@metrics.timed('scrapper_validate_location_seconds')
 def validate_location(location: str) -> Optional[str]:
     """
-    This method used to correct misspelled location names by creating a 1-Levenshtein distance
-    words set from provided location name and searching for closest (appropriate) name from dictionary.
+    Memoized version of correct_location, results are kept in location_cache.
+    """
+    location = location.lower()
+    found, result = location_cache.lookup(location)
+    if not found:
+        result = correct_location(location)
+        location_cache.set(location, result)
+    return result
+
+
+def correct_location(location: str) -> Optional[str]:
+    """
+    This method used to correct misspelled location names by searching for closest (appropriate)
+    name within 2-Levenshtein distance in location index. Most frequent location wins a tie.
     Examples:
-        validate_location('виница') -> винница
-        validate_location('днепр') -> днипро
-        validate_location('харьсков') -> харьков
-    """
-    def calculate_levenshtein_distance(locations_pair: tuple):
-        user_input = locations_pair[0]
-        prediction = locations_pair[1]
-        distance = nltk.edit_distance(user_input, prediction, transpositions=True)
+        correct_location('виница') -> винница
+        correct_location('днепр') -> днипро
+        correct_location('харьсков') -> харьков
+    """
+    def calculate_weighted_distance(suggestion: tuple):
+        prediction, distance = suggestion
         if distance > 0:
             freq = load_locations_frequencies().get(prediction, 0)
             distance -= freq
@@ -102,6 +416,9 @@ def validate_location(location: str) -> Optional[str]:
     if location_second_name:
         return location_second_name
 
+    max_distance = 1 if len(location) <= SHORT_LOCATION_LENGTH else MAX_EDIT_DISTANCE
+
+    # suggestions are pairs of (rus location, edit distance)
     possible_locations = []
     # naive and straightforward hack to determine language
     if re.search(location_pattern, location):
@@ -110,12 +427,9 @@ def validate_location(location: str) -> Optional[str]:
         if matched_location:
             return matched_location
 
-        misspelled_location_name_variants = create_misspelled_words_list(location, Languages.UKRAINIAN.value)
-        for misspelled_location in misspelled_location_name_variants:
-            location_from_dict = locations_dict.get(misspelled_location)
-            if location_from_dict:
-                # return rus location for ukrainian input
-                return location_from_dict
+        for location_from_dict, distance in lookup_location(location, load_ua_location_index(), max_distance):
+            # return rus location for ukrainian input
+            possible_locations.append((locations_dict[location_from_dict], distance))
     else:
         locations_dict = load_ru_ua_location_names()
         matched_location = locations_dict.get(location)
@@ -123,24 +437,14 @@ def validate_location(location: str) -> Optional[str]:
             return location
 
         # will have to search in both dicts
-        misspelled_location_name_variants_ru = create_misspelled_words_list(location, Languages.RUSSIAN.value)
-        misspelled_location_name_variants_ukr = create_misspelled_words_list(location, Languages.UKRAINIAN.value)
-
-        for misspelled_location in misspelled_location_name_variants_ru:
-            location_from_dict = locations_dict.get(misspelled_location)
-            if location_from_dict:
-                # this adds tuple of (provided location, provided location in rus)
-                possible_locations.append((location, misspelled_location))
+        possible_locations.extend(lookup_location(location, load_ru_location_index(), max_distance))
 
         locations_dict = load_ua_ru_location_names()
-        for misspelled_location in misspelled_location_name_variants_ukr:
-            location_from_dict = locations_dict.get(misspelled_location)
-            if location_from_dict:
-                # this adds tuple of (provided location, rus location)
-                possible_locations.append((location, location_from_dict))
-        locations_pair = None
-        if possible_locations:
-            locations_pair = min(possible_locations, key=calculate_levenshtein_distance)
-        if locations_pair:
-            return locations_pair[1]
+        for location_from_dict, distance in lookup_location(location, load_ua_location_index(), max_distance):
+            possible_locations.append((locations_dict[location_from_dict], distance))
+
+    if len(possible_locations) == 1:
+        return possible_locations[0][0]
+    if possible_locations:
+        return min(possible_locations, key=calculate_weighted_distance)[0]
     return None
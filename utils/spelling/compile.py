@@ -0,0 +1,46 @@
+"""
+Compile location resources (names dictionaries, frequencies and location indexes)
+into a single binary artifact, so scrapper process does not parse JSON resources
+and build indexes on start. Usage:
+
+    python -m scrapper.utils.spelling.compile [--output PATH]
+"""
+import argparse
+import time
+from typing import Optional
+
+from .checker import (
+    LOCATIONS_FREQUENCIES_PATH, LOCATIONS_PATH, _load_json_data, build_location_index, ru_ua_location_names,
+    save_compiled_resources, ua_ru_location_names
+)
+
+
+def compile_resources(path: Optional[str] = None) -> str:
+    """
+    Compile resources from JSON files and return path of the artifact.
+    """
+    locations = _load_json_data(LOCATIONS_PATH)
+    ru_ua = ru_ua_location_names(locations)
+    ua_ru = ua_ru_location_names(locations)
+    resources = {
+        'ru_ua': ru_ua,
+        'ua_ru': ua_ru,
+        'frequencies': _load_json_data(LOCATIONS_FREQUENCIES_PATH),
+        'ru_index': build_location_index(ru_ua),
+        'ua_index': build_location_index(ua_ru),
+    }
+    return save_compiled_resources(resources, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile location resources into binary artifact')
+    parser.add_argument('--output', help='artifact path, resources directory by default')
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    path = compile_resources(args.output)
+    print(f'Location resources compiled to {path} in {time.monotonic() - started:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
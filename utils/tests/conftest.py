@@ -1,19 +1,47 @@
 import asyncio
+import json
 from typing import Optional, Union
 
 import pytest
 
 
+class StreamReader:  # pylint: disable=too-few-public-methods
+
+    def __init__(self, body: bytes, exception=None):
+        self.body = body
+        self.exception = exception
+
+    async def iter_chunked(self, size: int):
+        if self.exception:
+            raise self.exception()
+        for idx in range(0, len(self.body), size):
+            yield self.body[idx:idx + size]
+
+
 class RequestAsyncContextManager:
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
             self, content_type: Optional[str], result: Optional[Union[str, dict]] = None, raise_error: bool = False,
-            exception=asyncio.exceptions.TimeoutError
+            exception=asyncio.exceptions.TimeoutError, status: int = 200, headers: Optional[dict] = None,
+            url: str = 'https://example.com', charset: Optional[str] = 'utf-8'
     ):
         self.content_type = content_type
         self.result = result
         self.raise_error = raise_error
         self.exception = exception
+        self.status = status
+        self.headers = headers if headers else {}
+        self.url = url
+        self.charset = charset
+
+        if result is None:
+            body = b''
+        elif isinstance(result, str):
+            body = result.encode(charset or 'utf-8')
+        else:
+            body = json.dumps(result).encode('utf-8')
+        self.content_length = len(body)
+        self.content = StreamReader(body, exception if raise_error else None)
 
     def __await__(self):
         return iter([self])
@@ -24,19 +52,14 @@ class RequestAsyncContextManager:
     async def __aexit__(self, exc_type, exc, traceback):
         await asyncio.sleep(0)
 
-    async def text(self):
-        if not self.raise_error:
-            return self.result
-        raise self.exception()
-
-    async def json(self):
-        if not self.raise_error:
-            return self.result
-        raise self.exception()
-
 
 @pytest.fixture
 def create_async_request_context_manager():
-    def inner(content_type='html/text', result=None, raise_error=False, exception=asyncio.exceptions.TimeoutError):
-        return RequestAsyncContextManager(content_type, result, raise_error, exception)
+    def inner(  # pylint: disable=too-many-arguments
+            content_type='html/text', result=None, raise_error=False, exception=asyncio.exceptions.TimeoutError,
+            status=200, headers=None, charset='utf-8'
+    ):
+        return RequestAsyncContextManager(
+            content_type, result, raise_error, exception, status, headers, charset=charset
+        )
     return inner
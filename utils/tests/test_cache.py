@@ -0,0 +1,93 @@
+# pylint: disable=no-self-use
+
+import os
+
+from ..cache import CacheEntry, ResponseCache
+
+
+class TestResponseCache:
+
+    def test_make_key(self):
+        key = ResponseCache.make_key('https://example.com', {'f': 26, 'start': 40})
+
+        assert key == ResponseCache.make_key('https://example.com', {'start': 40, 'f': 26})
+        assert key != ResponseCache.make_key('https://example.com', {'f': 26, 'start': 80})
+        assert ResponseCache.make_key('https://example.com') == ResponseCache.make_key('https://example.com', {})
+
+    def test_validators(self):
+        entry = CacheEntry(url='https://example.com', data='', etag='"abc"')
+
+        assert entry.validators == {'If-None-Match': '"abc"'}
+        assert CacheEntry(url='https://example.com', data='').validators == {}
+
+    def test_set_and_get(self, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+        entry = CacheEntry(url='https://example.com', data='Київ', etag='"abc"')
+
+        cache.set('key', entry)
+
+        assert cache.get('key') == entry
+        assert cache.get('other') is None
+
+        # entries are persisted on disk
+        assert ResponseCache(str(tmp_path)).get('key') == entry
+
+    def test_broken_entry_removed(self, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+        cache.set('key', CacheEntry(url='https://example.com', data='data'))
+
+        with open(os.path.join(str(tmp_path), 'key.json'), 'w', encoding='utf-8') as file:
+            file.write('{broken')
+
+        assert cache.get('key') is None
+        assert cache.stats['entries'] == 0
+
+    def test_eviction_least_recently_used(self, tmp_path):
+        entry = CacheEntry(url='https://example.com', data='x' * 100)
+        cache = ResponseCache(str(tmp_path))
+        cache.set('first', entry)
+        entry_size = cache.size
+
+        cache = ResponseCache(str(tmp_path), max_size=entry_size * 3)
+        for key in ('second', 'third'):
+            cache.set(key, entry)
+        # second entry is the least recently used one
+        os.utime(os.path.join(str(tmp_path), 'second.json'), (0, 0))
+        os.utime(os.path.join(str(tmp_path), 'third.json'), (1, 1))
+
+        cache = ResponseCache(str(tmp_path), max_size=entry_size * 3)
+        cache.set('fourth', entry)
+
+        assert cache.size == entry_size * 3
+        assert cache.get('second') is None
+        assert cache.get('first') == entry
+        assert cache.get('third') == entry
+        assert cache.get('fourth') == entry
+
+    def test_size_kept_along_with_entries(self, tmp_path):
+        cache = ResponseCache(str(tmp_path), max_size=1000)
+        cache.set('first', CacheEntry(url='https://example.com', data='x' * 100))
+        cache.set('second', CacheEntry(url='https://example.com', data='x' * 200))
+        # replaced entry is not counted twice
+        cache.set('first', CacheEntry(url='https://example.com', data='x' * 300))
+        cache.delete('second')
+        cache.delete('missing')
+        # first entry is evicted
+        cache.set('third', CacheEntry(url='https://example.com', data='x' * 800))
+
+        file_sizes = sum(entry.stat().st_size for entry in os.scandir(str(tmp_path)))
+        assert cache.size == file_sizes
+        assert cache.size == ResponseCache(str(tmp_path)).size
+        assert cache.stats['entries'] == 1
+
+    def test_entry_bigger_than_cache_not_stored(self, tmp_path):
+        cache = ResponseCache(str(tmp_path), max_size=10)
+        cache.set('key', CacheEntry(url='https://example.com', data='x' * 100))
+
+        assert cache.get('key') is None
+
+    def test_stats(self, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+        cache.hits, cache.misses = 3, 1
+
+        assert cache.stats == {'hits': 3, 'misses': 1, 'hit_rate': 0.75, 'entries': 0, 'size': 0}
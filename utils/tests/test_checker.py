@@ -4,11 +4,31 @@ from unittest import mock
 
 import pytest
 
+from scrapper.utils.spelling import checker
 from scrapper.utils.spelling.checker import (
-    _load_json_data, load_ru_ua_location_names, load_ua_ru_location_names, load_locations_frequencies,
-    create_misspelled_words_list, validate_location, check_known_location_second_name
+    _load_json_data, load_compiled_resources, load_locations, save_compiled_resources, load_ru_ua_location_names,
+    load_ua_ru_location_names, load_locations_frequencies, load_ru_location_index, load_ua_location_index,
+    create_deletes, build_location_index, lookup_location, validate_location,
+    check_known_location_second_name, LocationCache, location_cache, preload_location_resources, init_location_worker
 )
-from scrapper.utils.spelling.constants import Languages
+from scrapper.utils.spelling.compile import compile_resources
+
+
+LOADERS = (
+    load_compiled_resources, load_locations, load_ru_ua_location_names, load_ua_ru_location_names,
+    load_locations_frequencies, load_ru_location_index, load_ua_location_index
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_location_resources(tmp_path, monkeypatch):
+    # compiled resources are not used unless test creates them
+    monkeypatch.setattr(checker, 'COMPILED_RESOURCES_PATH', str(tmp_path / 'locations.bin'))
+    for loader in LOADERS:
+        loader.cache_clear()
+    yield
+    for loader in LOADERS:
+        loader.cache_clear()
 
 
 class TestChecker:
@@ -43,28 +63,29 @@ class TestChecker:
 
         assert data == {"киев": 1}
 
-    def test_create_misspelled_words_list(self):
-        location = 'киев'
-        misspelled_words = create_misspelled_words_list(location, Languages.RUSSIAN.value)
-        assert len(misspelled_words) == 297
-
-        assert location in misspelled_words
+    def test_create_deletes(self):
+        assert create_deletes('киев', 0) == {'киев'}
+        assert create_deletes('киев', 1) == {'киев', 'иев', 'кев', 'кив', 'кие'}
 
-        # len(word) -+ 1 for deletes & inserts
-        assert len(min(misspelled_words, key=len)) == 3
-        assert len(max(misspelled_words, key=len)) == 5
+        deletes = create_deletes('киев', 2)
+        assert len(deletes) == 11
+        assert {'ев', 'ки', 'кв'} <= deletes
 
-        # replaced chars in word
-        assert 'кеив' in misspelled_words
+    def test_build_location_index(self):
+        index = build_location_index(['киев', 'киев'], max_distance=1)
 
-        # transpose chars in word
-        assert 'икев' in misspelled_words
+        assert index['киев'] == ['киев', 'киев']
+        assert index['кие'] == ['киев', 'киев']
+        assert 'ев' not in index
 
-    def test_create_misspelled_words_list_other_lang(self):
-        with pytest.raises(NotImplementedError) as err:
-            create_misspelled_words_list('kyiv', 'eng')
+    def test_lookup_location(self):
+        index = build_location_index(['харьков', 'киев', 'днипро'])
 
-        assert str(err.value) == 'Unsupported language: eng'
+        assert lookup_location('харьков', index) == [('харьков', 0)]
+        # transposition and replace
+        assert lookup_location('хаьркав', index) == [('харьков', 2)]
+        assert lookup_location('хаьркав', index, max_distance=1) == []
+        assert lookup_location('йцукен', index) == []
 
     def test_check_known_location_second_name(self):
         assert check_known_location_second_name('днепр') == 'днипро'
@@ -109,3 +130,216 @@ class TestChecker:
                     result = validate_location('днепро')
 
         assert result == 'днипро'
+
+    def test_validate_location_two_edits_ru(self):
+        locations_data = '[{"name": {"ru": "Харьков", "uk": "Харків"}}]'
+        load_ru_ua_location_names.cache_clear()
+        load_ua_ru_location_names.cache_clear()
+        with mock.patch('builtins.open', mock.mock_open(read_data=locations_data), create=True) as _:
+            with mock.patch('scrapper.utils.spelling.checker.load_locations_frequencies') as freq_mock:
+                freq_mock.return_value = {}
+                result = validate_location('хрьсков')
+
+        assert result == 'харьков'
+
+    def test_validate_location_short_name_one_edit(self):
+        locations_data = '[{"name": {"ru": "Киев", "uk": "Київ"}}]'
+        load_ru_ua_location_names.cache_clear()
+        load_ua_ru_location_names.cache_clear()
+        with mock.patch('builtins.open', mock.mock_open(read_data=locations_data), create=True) as _:
+            with mock.patch('scrapper.utils.spelling.checker.load_locations_frequencies') as freq_mock:
+                freq_mock.return_value = {}
+                assert validate_location('кеев') == 'киев'
+                assert validate_location('кеер') is None
+
+    def test_validate_location_most_frequent_wins(self):
+        locations_data = '[{"name": {"ru": "Ровно", "uk": "Рівне"}}, {"name": {"ru": "Ровеньки", "uk": "Ровеньки"}}]'
+        load_ru_ua_location_names.cache_clear()
+        load_ua_ru_location_names.cache_clear()
+        with mock.patch('builtins.open', mock.mock_open(read_data=locations_data), create=True) as _:
+            with mock.patch('scrapper.utils.spelling.checker.load_locations_frequencies') as freq_mock:
+                freq_mock.return_value = {'ровно': 0.5}
+                result = validate_location('ровна')
+
+        assert result == 'ровно'
+
+
+class TestLocationCache:
+
+    def test_lookup(self):
+        cache = LocationCache()
+        cache.set('киев', 'киев')
+        cache.set('йцукен', None)
+
+        assert cache.lookup('киев') == (True, 'киев')
+        assert cache.lookup('йцукен') == (True, None)
+        assert cache.lookup('харьков') == (False, None)
+        assert cache.stats == {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3, 'entries': 2}
+
+    def test_least_recently_used_evicted(self):
+        cache = LocationCache(max_size=2)
+        cache.set('киев', 'киев')
+        cache.set('днепр', 'днипро')
+        cache.lookup('киев')
+        cache.set('харьков', 'харьков')
+
+        assert len(cache) == 2
+        assert cache.lookup('днепр') == (False, None)
+        assert cache.lookup('киев') == (True, 'киев')
+
+    def test_save_and_load(self, tmp_path):
+        path = str(tmp_path / 'locations.json')
+        cache = LocationCache()
+        cache.set('киев', 'киев')
+        cache.set('йцукен', None)
+        cache.save(path)
+
+        other_cache = LocationCache(max_size=1)
+        assert other_cache.load(path) == 1
+        # the most recently used entry is kept
+        assert other_cache.lookup('йцукен') == (True, None)
+
+    def test_load_other_resources_version(self, tmp_path):
+        path = str(tmp_path / 'locations.json')
+        cache = LocationCache()
+        cache.set('киев', 'киев')
+        cache.save(path)
+
+        with mock.patch('scrapper.utils.spelling.checker.resources_version', return_value='other'):
+            assert LocationCache().load(path) == 0
+
+    def test_load_missing_or_broken_snapshot(self, tmp_path):
+        path = tmp_path / 'locations.json'
+        assert LocationCache().load(str(path)) == 0
+
+        path.write_text('[1, 2')
+        assert LocationCache().load(str(path)) == 0
+
+    def test_updates_not_tracked(self):
+        cache = LocationCache()
+        cache.set('киев', 'киев')
+
+        assert cache.pop_updates() == ([], 0, 0)
+
+    def test_pop_updates(self):
+        cache = LocationCache()
+        cache.set('киев', 'киев')
+        cache.lookup('киев')
+        cache.track_updates()
+        cache.set('йцукен', None)
+        cache.lookup('киев')
+        cache.lookup('харьков')
+
+        assert cache.pop_updates() == ([('йцукен', None)], 1, 1)
+        assert cache.pop_updates() == ([], 0, 0)
+
+    def test_merge(self):
+        worker_cache = LocationCache()
+        worker_cache.track_updates()
+        worker_cache.lookup('киев')
+        worker_cache.set('киев', 'киев')
+        worker_cache.lookup('киев')
+
+        cache = LocationCache()
+        cache.merge(*worker_cache.pop_updates())
+
+        assert cache.lookup('киев') == (True, 'киев')
+        assert cache.stats == {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3, 'entries': 1}
+
+    def test_init_location_worker(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(location_cache, 'max_size', location_cache.max_size)
+        path = str(tmp_path / 'locations.json')
+        cache = LocationCache()
+        cache.set('киев', 'киев')
+        cache.save(path)
+
+        with mock.patch('scrapper.utils.spelling.checker.preload_location_resources') as preload_mock:
+            init_location_worker(path, max_size=10)
+
+        preload_mock.assert_called_once_with()
+        assert location_cache.max_size == 10
+        # snapshot entries are not updates of worker
+        assert location_cache.lookup('киев') == (True, 'киев')
+        assert location_cache.pop_updates() == ([], 1, 0)
+
+    def test_validate_location_memoized(self):
+        with mock.patch('scrapper.utils.spelling.checker.correct_location', return_value='киев') as correct_mock:
+            assert validate_location('Киев') == 'киев'
+            assert validate_location('киев') == 'киев'
+
+        correct_mock.assert_called_once_with('киев')
+        assert location_cache.stats['hits'] == 1
+
+
+class TestCompiledResources:
+
+    RESOURCES = {
+        'ru_ua': {'киев': 'київ'},
+        'ua_ru': {'київ': 'киев'},
+        'frequencies': {'киев': 0.5},
+        'ru_index': {'киев': ['киев']},
+        'ua_index': {'київ': ['київ']}
+    }
+
+    def test_no_compiled_resources(self):
+        assert load_compiled_resources() is None
+
+    def test_load_compiled_resources(self):
+        save_compiled_resources(self.RESOURCES, checker.COMPILED_RESOURCES_PATH)
+
+        with mock.patch('scrapper.utils.spelling.checker._load_json_data') as json_mock:
+            assert load_compiled_resources() == self.RESOURCES
+            assert load_ru_ua_location_names() == {'киев': 'київ'}
+            assert load_ua_ru_location_names() == {'київ': 'киев'}
+            assert load_locations_frequencies() == {'киев': 0.5}
+            assert load_ru_location_index() == {'киев': ['киев']}
+            assert load_ua_location_index() == {'київ': ['київ']}
+
+        json_mock.assert_not_called()
+
+    def test_preload_location_resources(self):
+        save_compiled_resources(self.RESOURCES, checker.COMPILED_RESOURCES_PATH)
+
+        preload_location_resources()
+
+        # neither artifact nor JSON resources are read on lookup
+        with mock.patch('scrapper.utils.spelling.checker.open', create=True) as open_mock:
+            assert load_ru_ua_location_names() == {'киев': 'київ'}
+            assert load_ua_ru_location_names() == {'київ': 'киев'}
+            assert load_locations_frequencies() == {'киев': 0.5}
+            assert load_ru_location_index() == {'киев': ['киев']}
+            assert load_ua_location_index() == {'київ': ['київ']}
+        open_mock.assert_not_called()
+
+    def test_compiled_by_other_format(self):
+        with mock.patch('scrapper.utils.spelling.checker.COMPILED_RESOURCES_FORMAT', 0):
+            save_compiled_resources(self.RESOURCES, checker.COMPILED_RESOURCES_PATH)
+
+        assert load_compiled_resources() is None
+
+    def test_compiled_from_other_resources(self):
+        with mock.patch('scrapper.utils.spelling.checker.resources_version', return_value='1:1'):
+            save_compiled_resources(self.RESOURCES, checker.COMPILED_RESOURCES_PATH)
+
+        with mock.patch('scrapper.utils.spelling.checker.resources_version', return_value='2:2'):
+            assert load_compiled_resources() is None
+
+    def test_broken_compiled_resources(self):
+        with open(checker.COMPILED_RESOURCES_PATH, 'wb') as file:
+            file.write(b'broken')
+
+        assert load_compiled_resources() is None
+
+    def test_compile_resources(self):
+        locations = [{'name': {'ru': 'Киев', 'uk': 'Київ'}}]
+        with mock.patch(
+                'scrapper.utils.spelling.compile._load_json_data', side_effect=[locations, {'киев': 0.5}]
+        ) as _:
+            path = compile_resources(checker.COMPILED_RESOURCES_PATH)
+
+        assert path == checker.COMPILED_RESOURCES_PATH
+        resources = load_compiled_resources()
+        assert resources['ru_ua'] == {'киев': 'київ'}
+        assert resources['frequencies'] == {'киев': 0.5}
+        assert resources['ua_index']['їв'] == ['київ']
+        assert validate_location('кеев') == 'киев'
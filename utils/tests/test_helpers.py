@@ -5,7 +5,7 @@ from unittest import mock
 
 import pytest
 
-from ..helpers import fake_semaphore
+from ..helpers import content_fingerprint, fake_semaphore
 
 
 class TestUtils:
@@ -18,3 +18,14 @@ class TestUtils:
 
         assert semaphore is None
         assert sleep_mock.await_count == 1
+
+    def test_content_fingerprint(self):
+        fingerprint = content_fingerprint('<a href="./viewtopic.php?f=26&t=1">Київ</a>')
+
+        assert len(fingerprint) == 32
+        assert fingerprint == content_fingerprint('<a href="./viewtopic.php?f=26&t=1">Київ</a>')
+        assert fingerprint != content_fingerprint('<a href="./viewtopic.php?f=26&t=2">Київ</a>')
+
+    def test_content_fingerprint_ignores_session_id(self):
+        assert content_fingerprint('<a href="./viewtopic.php?f=26&t=1&sid=0123abcdef">') == \
+            content_fingerprint('<a href="./viewtopic.php?f=26&t=1&sid=fedcba3210">')
@@ -0,0 +1,120 @@
+# pylint: disable=no-self-use
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest import mock
+
+import pytest
+
+from ..limiter import AdaptiveLimiter, parse_retry_after
+
+
+class TestParseRetryAfter:
+
+    def test_seconds(self):
+        assert parse_retry_after('120') == 120.0
+
+    def test_http_date(self):
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=60)
+
+        assert 58 <= parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 60
+
+    def test_date_in_past(self):
+        assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+    def test_empty_or_invalid(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('') is None
+        assert parse_retry_after('soon') is None
+
+
+class TestAdaptiveLimiter:
+
+    def test_invalid_initial_limit(self):
+        with pytest.raises(ValueError) as err:
+            AdaptiveLimiter(initial_limit=20, max_limit=10)
+
+        assert str(err.value) == 'Initial limit should be between min and max limits'
+
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=3)
+
+        # limit grows by one after limit of successes
+        limiter.on_success(0.1)
+        limiter.on_success(0.1)
+        assert limiter.stats['limit'] == 2
+        limiter.on_success(0.1)
+        assert limiter.stats['limit'] == 3
+
+        for _ in range(10):
+            limiter.on_success(0.1)
+        assert limiter.limit == 3
+        assert limiter.peak_limit == 3
+
+    def test_multiplicative_decrease_once_per_cooldown(self):
+        clock = mock.Mock(return_value=100)
+        limiter = AdaptiveLimiter(initial_limit=40, cooldown=1, clock=clock)
+
+        limiter.on_failure()
+        limiter.on_failure()
+        assert limiter.limit == 20
+        assert limiter.backoffs == 1
+
+        clock.return_value = 101
+        limiter.on_failure()
+        assert limiter.limit == 10
+
+    def test_decrease_stops_on_min_limit(self):
+        limiter = AdaptiveLimiter(initial_limit=2, min_limit=2, cooldown=0)
+
+        limiter.on_failure()
+
+        assert limiter.limit == 2
+
+    def test_slow_response_decreases_limit(self):
+        limiter = AdaptiveLimiter(initial_limit=10, max_latency=1)
+
+        limiter.on_success(0.5)
+        limiter.on_success(2)
+
+        assert limiter.stats['limit'] == 5
+
+    def test_throttled_pauses_acquisitions(self):
+        clock = mock.Mock(return_value=100)
+        limiter = AdaptiveLimiter(initial_limit=10, clock=clock)
+
+        limiter.on_throttled(30)
+        limiter.on_throttled(None)
+
+        assert limiter.paused_until == 130
+        assert limiter.limit == 5
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrency(self):
+        limiter = AdaptiveLimiter(initial_limit=2)
+        running, peak = 0, 0
+
+        async def request():
+            nonlocal running, peak
+            async with limiter:
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*[request() for _ in range(6)])
+
+        assert peak == 2
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_for_pause(self):
+        limiter = AdaptiveLimiter()
+        limiter.on_throttled(0.05)
+
+        started = asyncio.get_event_loop().time()
+        async with limiter:
+            waited = asyncio.get_event_loop().time() - started
+
+        assert waited >= 0.04
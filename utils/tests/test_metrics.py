@@ -0,0 +1,135 @@
+# pylint: disable=no-self-use
+
+import json
+
+import pytest
+
+from ..metrics import Histogram, JsonSink, Metrics, PrometheusFileSink, create_sinks
+
+
+class TestHistogram:
+
+    def test_observe(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+
+        for value in (0.05, 0.5, 0.5, 2.0):
+            histogram.observe(value)
+
+        assert histogram.counts == [1, 2, 1]
+        assert histogram.count == 4
+        assert histogram.sum == 3.05
+        assert histogram.max == 2.0
+
+    def test_quantile(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+
+        for _ in range(98):
+            histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(3.0)
+
+        assert histogram.quantile(0.5) == 0.1
+        assert histogram.quantile(0.99) == 1.0
+        assert histogram.quantile(1.0) == 3.0
+
+    def test_empty_summary(self):
+        assert Histogram().summary == {'count': 0, 'sum': 0.0, 'mean': 0.0, 'max': 0.0, 'p50': 0.0, 'p99': 0.0}
+
+
+class TestMetrics:
+
+    def test_disabled(self):
+        registry = Metrics()
+
+        registry.inc('counter')
+        registry.observe('histogram', 1.0)
+        with registry.timer('timer'):
+            pass
+
+        assert registry.summary == {'counters': {}, 'histograms': {}}
+
+    def test_timer(self):
+        registry = Metrics(enabled=True)
+
+        with registry.timer('timer'):
+            pass
+        with pytest.raises(ValueError):
+            with registry.timer('timer'):
+                raise ValueError()
+
+        assert registry.histograms['timer'].count == 2
+        assert registry.counters == {'timer_failures_total': 1}
+
+    def test_timed(self):
+        registry = Metrics()
+
+        @registry.timed('function_seconds')
+        def function(value):
+            return value * 2
+
+        assert function(1) == 2
+        registry.enabled = True
+        assert function(2) == 4
+        assert function.__name__ == 'function'
+        assert registry.histograms['function_seconds'].count == 1
+
+    @pytest.mark.asyncio
+    async def test_timed_coroutine_function(self):
+        registry = Metrics(enabled=True)
+
+        @registry.timed('coroutine_seconds')
+        async def coroutine(value):
+            return value * 2
+
+        assert await coroutine(2) == 4
+        assert registry.histograms['coroutine_seconds'].count == 1
+
+    def test_reset(self):
+        registry = Metrics(enabled=True)
+        registry.inc('counter')
+        registry.observe('histogram', 1.0)
+
+        registry.reset()
+
+        assert registry.summary == {'counters': {}, 'histograms': {}}
+
+    def test_prometheus_text(self):
+        registry = Metrics(enabled=True, buckets=(0.1, 1.0))
+        registry.inc('topics_total', 3)
+        registry.observe('request_seconds', 0.05)
+        registry.observe('request_seconds', 2.0)
+
+        assert registry.prometheus_text() == (
+            '# TYPE topics_total counter\n'
+            'topics_total 3\n'
+            '# TYPE request_seconds histogram\n'
+            'request_seconds_bucket{le="0.1"} 1\n'
+            'request_seconds_bucket{le="1.0"} 1\n'
+            'request_seconds_bucket{le="+Inf"} 2\n'
+            'request_seconds_sum 2.05\n'
+            'request_seconds_count 2\n'
+        )
+
+
+class TestSinks:
+
+    def test_create_sinks(self, tmp_path):
+        assert not create_sinks()
+
+        sinks = create_sinks(prometheus_path=str(tmp_path / 'metrics.prom'), json_path=str(tmp_path / 'metrics.json'))
+
+        assert [type(sink) for sink in sinks] == [PrometheusFileSink, JsonSink]
+
+    def test_write(self, tmp_path):
+        registry = Metrics(enabled=True)
+        registry.inc('topics_total')
+        registry.observe('request_seconds', 0.05)
+
+        PrometheusFileSink(str(tmp_path / 'metrics.prom')).write(registry)
+        JsonSink(str(tmp_path / 'metrics.json')).write(registry)
+
+        assert (tmp_path / 'metrics.prom').read_text(encoding='utf-8') == registry.prometheus_text()
+        summary = json.loads((tmp_path / 'metrics.json').read_text(encoding='utf-8'))
+        assert summary['counters'] == {'topics_total': 1}
+        assert summary['histograms']['request_seconds']['count'] == 1
+        assert sorted(path.name for path in tmp_path.iterdir()) == ['metrics.json', 'metrics.prom']
@@ -0,0 +1,78 @@
+# pylint: disable=no-self-use
+
+from unittest import mock
+
+import pytest
+
+from ..retry import (
+    SERVER_ERROR, THROTTLED, TIMEOUT, RetryBudget, RetryPolicy, RetryStats, classify_status, constant_retry_policies
+)
+
+
+class TestRetryPolicy:
+
+    @pytest.mark.parametrize('status, expected', [
+        (200, None), (304, None), (404, None), (429, THROTTLED), (503, THROTTLED), (500, SERVER_ERROR),
+        (502, SERVER_ERROR)
+    ])
+    def test_classify_status(self, status, expected):
+        assert classify_status(status) == expected
+
+    def test_exponential_delay(self):
+        policy = RetryPolicy(base_delay=1, max_delay=5, multiplier=2, jitter=False)
+
+        assert [policy.delay(retry) for retry in range(1, 5)] == [1, 2, 4, 5]
+
+    def test_full_jitter(self):
+        policy = RetryPolicy(base_delay=1, multiplier=2)
+
+        with mock.patch('scrapper.utils.retry.random.uniform', return_value=0.5) as uniform_mock:
+            assert policy.delay(3) == 0.5
+
+        uniform_mock.assert_called_once_with(0, 4)
+
+    def test_constant_retry_policies(self):
+        policies = constant_retry_policies(3, 15)
+
+        assert {policy.delay(retry) for policy in policies.values() for retry in range(1, 3)} == {15}
+        assert policies[TIMEOUT].max_attempts == 3
+        assert constant_retry_policies(3)[TIMEOUT].delay(1) == 0
+
+
+class TestRetryBudget:
+
+    def test_min_retries(self):
+        budget = RetryBudget(ratio=0, min_retries=2)
+
+        assert budget.try_spend() is True
+        assert budget.try_spend() is True
+        assert budget.try_spend() is False
+        assert budget.rejected == 1
+
+    def test_ratio_of_requests(self):
+        budget = RetryBudget(ratio=0.1, min_retries=0)
+        assert budget.available == 0
+
+        for _ in range(20):
+            budget.on_request()
+
+        assert budget.available == 2
+        assert budget.try_spend() is True
+        assert budget.available == 1
+
+
+class TestRetryStats:  # pylint: disable=too-few-public-methods
+
+    def test_record(self):
+        stats = RetryStats()
+        stats.record(TIMEOUT, 5.0, 1)
+        stats.record(RetryStats.SUCCESS, 1.0, 2)
+
+        assert stats.stats == {
+            'attempts': 2,
+            'retries': 1,
+            'outcomes': {TIMEOUT: 1, RetryStats.SUCCESS: 1},
+            'latency_avg': 3.0,
+            'latency_max': 5.0,
+            'coalesced': 0
+        }
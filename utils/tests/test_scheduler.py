@@ -0,0 +1,71 @@
+# pylint: disable=no-self-use
+
+from unittest import mock
+
+import pytest
+
+from scrapper.utils.scheduler import IntervalScheduler
+
+
+class TestIntervalScheduler:
+
+    def test_jitter_greater_than_interval(self):
+        with pytest.raises(ValueError) as err:
+            IntervalScheduler(lambda: None, interval=1, jitter=2)
+
+        assert str(err.value) == 'Jitter could not be greater than interval'
+
+    def test_run_until_stopped(self):
+        calls = []
+
+        def job():
+            calls.append(1)
+            if len(calls) == 3:
+                scheduler.stop()
+
+        scheduler = IntervalScheduler(job, interval=0)
+
+        assert scheduler.run() == 3
+        assert scheduler.stopped is True
+
+    def test_failed_run_does_not_stop_scheduler(self):
+        def job():
+            if scheduler.runs == 1:
+                scheduler.stop()
+            raise RuntimeError('Database is not available')
+
+        scheduler = IntervalScheduler(job, interval=0)
+
+        assert scheduler.run() == 2
+        assert scheduler.failures == 2
+
+    def test_stop_as_signal_handler(self):
+        scheduler = IntervalScheduler(lambda: None, interval=60)
+        scheduler.stop(15, None)
+
+        assert scheduler.run() == 0
+
+    def test_stop_interrupts_waiting(self):
+        scheduler = IntervalScheduler(lambda: None, interval=60)
+
+        with mock.patch.object(scheduler._stop_event, 'wait', side_effect=scheduler.stop) as wait_mock:  # pylint: disable=protected-access
+            assert scheduler.run() == 1
+
+        wait_mock.assert_called_once()
+
+    def test_next_delay(self):
+        clock = mock.Mock(return_value=100)
+        scheduler = IntervalScheduler(lambda: None, interval=60, jitter=10, clock=clock)
+
+        with mock.patch('scrapper.utils.scheduler.random.uniform', return_value=-10) as uniform_mock:
+            # run took 20 seconds
+            assert scheduler.next_delay(80) == 30
+
+        uniform_mock.assert_called_once_with(-10, 10)
+
+    def test_next_delay_long_run(self):
+        clock = mock.Mock(return_value=200)
+        scheduler = IntervalScheduler(lambda: None, interval=60, clock=clock)
+
+        # run took longer than interval, so the next one starts right away
+        assert scheduler.next_delay(100) == 0
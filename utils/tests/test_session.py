@@ -1,12 +1,17 @@
 # pylint: disable=no-self-use
 
+import asyncio
 import logging
 from unittest import mock
 
+import aiohttp
 import pytest
 
+from ..cache import ResponseCache
+from ..limiter import AdaptiveLimiter
+from ..retry import SERVER_ERROR, TIMEOUT, RetryBudget, RetryPolicy, constant_retry_policies
 from ..session import GSession
-from ..exceptions import RetriesExceeded
+from ..exceptions import ResponseTooLarge, RetriesExceeded, RetryBudgetExceeded
 
 
 LOGGER = logging.getLogger(__name__)
@@ -47,6 +52,44 @@ class TestGSession:
             assert req.called is True
             assert result.data == expected_response
 
+    @pytest.mark.asyncio
+    async def test_get_data_user_agent_per_request(self, create_async_request_context_manager):
+        user_agents = mock.Mock()
+        user_agents.random.side_effect = ['Agent/1', 'Agent/2']
+
+        session = GSession(user_agents=user_agents)
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.side_effect = lambda *args, **kwargs: create_async_request_context_manager(result='some_response')
+
+            await session.get_data('https://example.com', headers={'Accept': 'text/html'})
+            await session.get_data('https://example.com')
+
+        assert req.call_args_list[0].kwargs['headers'] == {'Accept': 'text/html', 'User-Agent': 'Agent/1'}
+        assert req.call_args_list[1].kwargs['headers'] == {'User-Agent': 'Agent/2'}
+
+    @pytest.mark.asyncio
+    async def test_get_data_coalesced(self, create_async_request_context_manager):
+        session = GSession()
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.return_value = create_async_request_context_manager(result='some_response')
+
+            results = await asyncio.gather(
+                session.get_data('https://example.com', params={'a': 1, 'b': 2}),
+                session.get_data('https://example.com?b=2', params={'a': 1})
+            )
+
+        assert req.call_count == 1
+        assert [result.data for result in results] == ['some_response', 'some_response']
+        assert session.retry_stats.coalesced == 1
+        assert not session._in_flight  # pylint: disable=protected-access
+
+    def test_request_key(self):
+        assert GSession.request_key('https://example.com?b=2', {'a': 1}) == \
+            GSession.request_key('https://example.com', {'b': '2', 'a': '1'})
+        assert GSession.request_key('https://example.com', {'a': 1}) != GSession.request_key('https://example.com')
+
     @pytest.mark.asyncio
     async def test_get_data_retries_exceeded(self, create_async_request_context_manager):
         url = 'https://example.com'
@@ -151,3 +194,276 @@ class TestGSession:
         assert caplog.messages[0] == f'Exception raised during processing of GET {url} request'
 
         await session.close()
+
+    @pytest.mark.asyncio
+    async def test_get_data_cache_miss_stores_response(self, create_async_request_context_manager, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+        session = GSession(cache=cache)
+
+        waiting = create_async_request_context_manager(result='some_response', headers={'ETag': '"abc"'})
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.return_value = waiting
+
+            result = await session.get_data('https://example.com', params={'t': 1})
+
+        assert result.data == 'some_response'
+        assert result.not_modified is False
+        assert 'If-None-Match' not in req.call_args.kwargs.get('headers', {})
+        assert cache.stats['misses'] == 1
+        assert cache.get(cache.make_key('https://example.com', {'t': 1})).etag == '"abc"'
+
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_get_data_not_modified(self, create_async_request_context_manager, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+        session = GSession(cache=cache)
+
+        first_response = create_async_request_context_manager(
+            result='some_response', headers={'ETag': '"abc"', 'Last-Modified': 'Sun, 29 Aug 2021 15:17:40 GMT'}
+        )
+        not_modified_response = create_async_request_context_manager(status=304)
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.side_effect = [first_response, not_modified_response]
+
+            _ = await session.get_data('https://example.com')
+            result = await session.get_data('https://example.com')
+
+        assert req.call_args.kwargs['headers'] == {
+            'If-None-Match': '"abc"',
+            'If-Modified-Since': 'Sun, 29 Aug 2021 15:17:40 GMT'
+        }
+        assert result.data == 'some_response'
+        assert result.not_modified is True
+        assert cache.stats['hits'] == 1
+        assert cache.stats['misses'] == 1
+
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_get_data_no_validators_not_cached(self, create_async_request_context_manager, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+        session = GSession(cache=cache)
+
+        waiting = create_async_request_context_manager(result='some_response')
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.return_value = waiting
+
+            result = await session.get_data('https://example.com')
+
+        assert result.not_modified is False
+        assert cache.stats['entries'] == 0
+
+        await session.close()
+
+
+class TestGSessionThrottling:
+
+    @pytest.mark.asyncio
+    async def test_get_data_retry_after_throttling(self, create_async_request_context_manager, caplog):
+        caplog.set_level(logging.INFO)
+        session = GSession()
+
+        throttled = create_async_request_context_manager(status=429, headers={'Retry-After': '0'})
+        waiting = create_async_request_context_manager(result='some_response')
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.side_effect = [throttled, waiting]
+
+            result = await session.get_data('https://example.com', retry_num=2)
+
+        assert req.call_count == 2
+        assert result.data == 'some_response'
+        assert caplog.messages[0] == 'GET https://example.com request failed (throttled), retry (1 of 2)'
+
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_get_data_throttled_retries_exceeded(self, create_async_request_context_manager):
+        url = 'https://example.com'
+        session = GSession()
+
+        throttled = create_async_request_context_manager(status=503)
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.side_effect = [throttled, throttled]
+
+            with pytest.raises(RetriesExceeded) as err:
+                _ = await session.get_data(url, retry_num=2)
+
+        assert str(err.value) == f'Retry limit exceeded (2 of 2) for GET {url}'
+
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_get_data_feeds_limiter(self, create_async_request_context_manager):
+        session = GSession()
+        limiter = AdaptiveLimiter(initial_limit=10, cooldown=0)
+
+        throttled = create_async_request_context_manager(status=429, headers={'Retry-After': '0'})
+        failed = create_async_request_context_manager(status=500, result='error')
+        waiting = create_async_request_context_manager(result='some_response')
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.side_effect = [throttled, failed, waiting]
+            result = await session.get_data('https://example.com', semaphore=limiter)
+
+        assert result.data == 'some_response'
+        # halved twice and increased by 1/limit once
+        assert limiter.limit == pytest.approx(2.9)
+        assert limiter.in_flight == 0
+
+        await session.close()
+
+
+class TestGSessionRetryPolicies:
+
+    @pytest.mark.asyncio
+    async def test_get_data_connection_error_retried(self, create_async_request_context_manager):
+        session = GSession()
+
+        reset = create_async_request_context_manager(raise_error=True, exception=aiohttp.ServerDisconnectedError)
+        waiting = create_async_request_context_manager(result='some_response')
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.side_effect = [reset, waiting]
+            result = await session.get_data('https://example.com')
+
+        assert result.data == 'some_response'
+        assert session.retry_stats.stats['outcomes'] == {'connection_error': 1, 'success': 1}
+        assert session.retry_stats.retries == 1
+
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_get_data_policy_per_failure_kind(self, create_async_request_context_manager):
+        url = 'https://example.com'
+        policies = {
+            **constant_retry_policies(5),
+            SERVER_ERROR: RetryPolicy(max_attempts=2, base_delay=0)
+        }
+        session = GSession(retry_policies=policies)
+
+        failed = create_async_request_context_manager(status=502)
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.side_effect = [failed, failed, failed]
+
+            with pytest.raises(RetriesExceeded) as err:
+                _ = await session.get_data(url)
+
+        assert req.call_count == 2
+        assert str(err.value) == f'Retry limit exceeded (2 of 2) for GET {url}'
+
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_get_data_exponential_backoff(self, create_async_request_context_manager):
+        policies = constant_retry_policies(5)
+        policies[TIMEOUT] = RetryPolicy(max_attempts=3, base_delay=1, multiplier=3, jitter=False)
+        session = GSession(retry_policies=policies)
+
+        timeout = create_async_request_context_manager(raise_error=True)
+        waiting = create_async_request_context_manager(result='some_response')
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            with mock.patch('scrapper.utils.session.asyncio.sleep') as sleep_mock:
+                req.side_effect = [timeout, timeout, waiting]
+                result = await session.get_data('https://example.com')
+
+        assert result.data == 'some_response'
+        # zero sleeps come from request context manager mocks
+        assert [call.args[0] for call in sleep_mock.call_args_list if call.args[0]] == [1, 3]
+
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_get_data_retry_budget_exhausted(self, create_async_request_context_manager, caplog):
+        url = 'https://example.com'
+        session = GSession(retry_budget=RetryBudget(ratio=0, min_retries=1))
+
+        timeout = create_async_request_context_manager(raise_error=True)
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.side_effect = [timeout, timeout]
+
+            with pytest.raises(RetryBudgetExceeded) as err:
+                _ = await session.get_data(url, retry_num=5)
+
+        assert req.call_count == 2
+        assert str(err.value) == f'Retry budget exhausted for GET {url}'
+        assert session.retry_budget.rejected == 1
+        assert caplog.messages[-1] == 'Request aborted due to retry budget exhausted (timeout)'
+
+        await session.close()
+
+
+class TestGSessionBody:
+
+    @pytest.mark.asyncio
+    async def test_get_data_declared_charset(self, create_async_request_context_manager):
+        session = GSession()
+
+        waiting = create_async_request_context_manager(result='Киев', charset='cp1251')
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.return_value = waiting
+            result = await session.get_data('https://example.com')
+
+        assert result.data == 'Киев'
+
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_get_data_read_by_chunks(self, create_async_request_context_manager):
+        session = GSession()
+        content = 'x' * 150 * 1024
+
+        waiting = create_async_request_context_manager(result=content, charset=None)
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.return_value = waiting
+            result = await session.get_data('https://example.com')
+
+        assert result.data == content
+
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_get_data_content_length_too_large(self, create_async_request_context_manager):
+        session = GSession(max_body_size=10)
+
+        waiting = create_async_request_context_manager(result='x' * 11)
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.return_value = waiting
+
+            with pytest.raises(ResponseTooLarge) as err:
+                _ = await session.get_data('https://example.com')
+
+        # too large response is not retried
+        assert req.call_count == 1
+        assert str(err.value) == 'Response of GET https://example.com is 11 bytes (limit is 10)'
+
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_get_data_body_too_large(self, create_async_request_context_manager):
+        session = GSession(max_body_size=10)
+
+        # server did not tell body size
+        waiting = create_async_request_context_manager(result='x' * 11)
+        waiting.content_length = None
+
+        with mock.patch('scrapper.utils.session.aiohttp.ClientSession.get') as req:
+            req.return_value = waiting
+
+            with pytest.raises(ResponseTooLarge) as err:
+                _ = await session.get_data('https://example.com')
+
+        assert str(err.value) == 'Response of GET https://example.com exceeds 10 bytes'
+
+        await session.close()
@@ -0,0 +1,46 @@
+# pylint: disable=no-self-use
+
+import random
+from unittest import mock
+
+import pytest
+
+from ..user_agents import UserAgentPool
+
+
+class TestUserAgentPool:
+
+    def test_bundled_user_agents(self):
+        pool = UserAgentPool()
+
+        assert len(pool.user_agents) > 1
+        assert all(user_agent.startswith('Mozilla/5.0') for user_agent in pool.user_agents)
+
+    def test_lazy_load(self, tmp_path):
+        path = tmp_path / 'user_agents.txt'
+        path.write_text('# comment\nAgent/1\n\nAgent/2\n', encoding='utf-8')
+
+        with mock.patch('builtins.open', wraps=open) as open_mock:
+            pool = UserAgentPool(str(path))
+            assert open_mock.called is False
+
+            assert pool.user_agents == ['Agent/1', 'Agent/2']
+            _ = pool.random()
+            assert open_mock.call_count == 1
+
+    def test_random(self, tmp_path):
+        path = tmp_path / 'user_agents.txt'
+        path.write_text('Agent/1\nAgent/2\nAgent/3\n', encoding='utf-8')
+
+        pool = UserAgentPool(str(path), rng=random.Random(1))
+
+        user_agents = {pool.random() for _ in range(50)}
+
+        assert user_agents == {'Agent/1', 'Agent/2', 'Agent/3'}
+
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / 'user_agents.txt'
+        path.write_text('# comment\n', encoding='utf-8')
+
+        with pytest.raises(ValueError):
+            _ = UserAgentPool(str(path)).random()
@@ -0,0 +1,32 @@
+import os
+import random
+from typing import List, Optional
+
+# User-Agent strings bundled with scrapper, so no browsers database is fetched
+USER_AGENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', 'user_agents.txt')
+
+
+class UserAgentPool:
+    """
+    Pool of User-Agent strings read from a local file (one per line, lines
+    starting with # are skipped). File is read on the first access.
+    """
+
+    def __init__(self, path: str = USER_AGENTS_PATH, rng: Optional[random.Random] = None):
+        self.path = path
+        self._random = rng if rng else random.Random()
+        self._user_agents: Optional[List[str]] = None
+
+    @property
+    def user_agents(self) -> List[str]:
+        if self._user_agents is None:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                user_agents = [line.strip() for line in file]
+            user_agents = [line for line in user_agents if line and not line.startswith('#')]
+            if not user_agents:
+                raise ValueError(f'No User-Agent strings found in {self.path}')
+            self._user_agents = user_agents
+        return self._user_agents
+
+    def random(self) -> str:
+        return self._random.choice(self.user_agents)